@@ -1,160 +1,175 @@
+import json
 import logging
-from functools import lru_cache
+from dataclasses import replace
 from pathlib import Path
+from typing import List
 
-from fastapi import Depends, Request
-
-from config import settings
-from domain.memo import Memo
-from interfaces.repositories.index_repo import IndexRepository
-from interfaces.repositories.memo_repo import MemoRepository, MemoNotFoundError
-from interfaces.repositories.search_repo import SearchRepository
+from config import Settings, settings as default_settings
+from infrastructure.persistence.embedding_store import EmbeddingStore
 from infrastructure.persistence.fs_memo_repo import FileSystemMemoRepository
 from infrastructure.persistence.faiss_chunk_repo import FaissChunkRepository
+from infrastructure.persistence.faiss_factory import IndexPolicy
 from infrastructure.persistence.faiss_index_repo import FaissIndexRepository
 from infrastructure.persistence.elasticsearch_repo import ElasticsearchMemoRepository
 from infrastructure.services.embedder import EmbedderService
+from infrastructure.services.inference_backends import create_backend
+from infrastructure.services.memo_indexer import MemoIndexer
+from infrastructure.services.search_cache import SearchResultCache
+from infrastructure.services.search_pool import SearchPool
 from infrastructure.utils.datetime_jst import DateTimeJST
 from interfaces.utils.datetime import DateTimeProvider
-from usecases.create_memo import CreateMemoUseCase
-from usecases.search_memos import SearchMemosUseCase
-from usecases.hybrid_search import HybridSearchUseCase
-from usecases.incremental_vectorize import IncrementalVectorizeUseCase
-from usecases.get_progress import GetVectorizeProgressUseCase
 
 logger = logging.getLogger(__name__)
 
 
-@lru_cache()
-def get_memo_repo() -> MemoRepository:
-    return FileSystemMemoRepository(Path(settings.memos_root))
-
-
-@lru_cache()
-def get_faiss_chunk_repo() -> FaissChunkRepository:
-    index_dir = Path(settings.index_data_root)
-    logger.debug(f"🔧 FaissChunkRepository をインスタンス化します (index_dir={index_dir})")
-    return FaissChunkRepository(
-        index_dir=index_dir,
-        dimension=settings.embedding_dim,
-    )
-
-
-@lru_cache()
-def get_faiss_index_repo() -> FaissIndexRepository:
-    index_dir = Path(settings.index_data_root)
-    logger.debug(f"🔧 FaissIndexRepository をインスタンス化します (index_dir={index_dir})")
-    return FaissIndexRepository(
-        index_dir=index_dir,
-        memo_repo=get_memo_repo(),
-    )
-
-
-@lru_cache()
-def get_index_repo(
-    chunk_repo: FaissChunkRepository = Depends(get_faiss_chunk_repo),
-) -> IndexRepository:
-    return chunk_repo
-
-
-@lru_cache()
-def get_elastic_repo() -> ElasticsearchMemoRepository:
-    raw = settings.elasticsearch_hosts
+def parse_elasticsearch_hosts(raw) -> List[str]:
+    """
+    設定値 (カンマ区切り文字列 / JSON 配列文字列 / リスト) をホスト一覧に正規化する
+    """
     if isinstance(raw, str) and raw.startswith("["):
-        hosts_list = __import__("json").loads(raw)
-    elif isinstance(raw, str):
-        hosts_list = [h.strip() for h in raw.split(",") if h.strip()]
-    else:
-        hosts_list = raw
-
-    return ElasticsearchMemoRepository(
-        hosts=hosts_list,
-        index_name=settings.elasticsearch_index,
-    )
-
-
-@lru_cache()
-def get_embedder_service() -> EmbedderService:
-    return EmbedderService(model_name=settings.model_name)
-
-
-@lru_cache()
-def get_datetime_provider() -> DateTimeProvider:
-    logger.debug("🔧 DateTimeProvider をインスタンス化します")
-    return DateTimeJST()
-
-
-@lru_cache()
-def get_create_uc(
-    memo_repo: MemoRepository = Depends(get_memo_repo),
-    datetime_provider: DateTimeProvider = Depends(get_datetime_provider),
-    faiss_index_repo: FaissIndexRepository = Depends(get_faiss_index_repo),
-    faiss_chunk_repo: FaissChunkRepository = Depends(get_faiss_chunk_repo),
-    elastic_repo: ElasticsearchMemoRepository = Depends(get_elastic_repo),
-) -> CreateMemoUseCase:
-    logger.debug("🔧 CreateMemoUseCase をインスタンス化します")
-
-    class CompositeIndexRepo:
-        async def add_to_index(self, uuid: str, memo: Memo) -> None:
-            faiss_index_repo.incremental_update([memo])
-            chunks = EmbedderService(model_name=settings.model_name).encode_chunks(
-                memo.body or memo.title or ""
-            )
-            items = [(f"{memo.uuid}_{i}", vec) for i, (_, vec) in enumerate(chunks)]
-            faiss_chunk_repo.add_chunks_batch(items)
-            await elastic_repo.index(memo)
-
-    return CreateMemoUseCase(
-        memo_repo,
-        datetime_provider,
-        CompositeIndexRepo(),
-    )
-
-
-@lru_cache()
-def get_search_uc(
-    faiss_repo: FaissIndexRepository = Depends(get_faiss_index_repo),
-    memo_repo: MemoRepository = Depends(get_memo_repo),
-) -> SearchMemosUseCase:
-    logger.debug("🔧 SearchMemosUseCase をインスタンス化します")
-    return SearchMemosUseCase(index_repo=faiss_repo, memo_repo=memo_repo)
-
-
-@lru_cache()
-def get_hybrid_uc(
-    chunk_repo: IndexRepository = Depends(get_index_repo),
-    elastic_repo: SearchRepository = Depends(get_elastic_repo),
-    embedder: EmbedderService = Depends(get_embedder_service),
-) -> HybridSearchUseCase:
-    logger.debug("🔧 HybridSearchUseCase をインスタンス化します")
-    return HybridSearchUseCase(
-        chunk_repo=chunk_repo,
-        elastic_repo=elastic_repo,
-        embedder=embedder,
-        semantic_weight=settings.hybrid_semantic_weight,
-        elastic_weight=settings.hybrid_elastic_weight,
-    )
-
-
-@lru_cache()
-def get_incremental_uc(
-    request: Request,
-    memo_repo: MemoRepository = Depends(get_memo_repo),
-    chunk_repo: FaissChunkRepository = Depends(get_faiss_chunk_repo),
-    embedder: EmbedderService = Depends(get_embedder_service),
-) -> IncrementalVectorizeUseCase:
-    logger.debug("🔧 IncrementalVectorizeUseCase をインスタンス化します")
-    return IncrementalVectorizeUseCase(
-        chunk_repo,
-        memo_repo,
-        request.app,
-        embedder,
-    )
-
-
-@lru_cache()
-def get_progress_uc(
-    request: Request,
-) -> GetVectorizeProgressUseCase:
-    logger.debug("🔧 GetVectorizeProgressUseCase をインスタンス化します")
-    return GetVectorizeProgressUseCase(request.app)
+        return json.loads(raw)
+    if isinstance(raw, str):
+        return [h.strip() for h in raw.split(",") if h.strip()]
+    return [str(h) for h in raw]
+
+
+class Container:
+    """
+    アプリケーション寿命で共有するリソースを保持するコンテナ。
+    - リポジトリ・Executor・モデル・ES クライアントを一度だけ生成
+    - lifespan 終了時に close() で Executor / 接続を解放
+    """
+
+    def __init__(self, settings: Settings = default_settings):
+        self.settings = settings
+
+        memos_root = Path(settings.memos_root)
+        index_dir = Path(settings.index_data_root)
+
+        logger.debug(f"🔧 FileSystemMemoRepository をインスタンス化します (root={memos_root})")
+        self.memo_repo = FileSystemMemoRepository(
+            root=memos_root,
+            metadata_path=index_dir / "memo_meta.sqlite3",
+            embedding_store=EmbeddingStore(
+                index_dir / "embeddings",
+                dim=settings.embedding_dim,
+                dtype=settings.embedding_store_dtype,
+            ),
+        )
+
+        index_policy = IndexPolicy(
+            flat_max=settings.faiss_flat_max_vectors,
+            memory_budget_mb=settings.faiss_memory_budget_mb,
+            nprobe=settings.faiss_nprobe,
+            hnsw_m=settings.faiss_hnsw_m,
+            hnsw_ef_construction=settings.faiss_hnsw_ef_construction,
+            hnsw_ef_search=settings.faiss_hnsw_ef_search,
+            pq_m=settings.faiss_pq_m,
+            pq_nbits=settings.faiss_pq_nbits,
+            opq=settings.faiss_opq,
+        )
+
+        # FAISS 検索は両リポジトリで共有する専用プールで実行する
+        self.search_pool = SearchPool(
+            workers=settings.faiss_search_workers,
+            omp_threads=settings.faiss_omp_threads,
+            max_pending=settings.faiss_search_max_pending,
+        )
+        # 検索結果キャッシュ（メモの変更・索引の再構築で世代を進めて無効化する）
+        self.search_cache = SearchResultCache(
+            max_entries=settings.search_cache_max_entries,
+            ttl_s=settings.search_cache_ttl_s,
+            max_bytes=settings.search_cache_max_mb * 1024 * 1024,
+        )
+
+        logger.debug(f"🔧 FaissIndexRepository をインスタンス化します (index_dir={index_dir})")
+        self.faiss_index_repo = FaissIndexRepository(
+            index_dir=index_dir,
+            memo_repo=self.memo_repo,
+            dim=settings.embedding_dim,
+            policy=index_policy,
+            compact_ratio=settings.faiss_compact_tombstone_ratio,
+            mmap=settings.faiss_mmap,
+            snapshot_delay=settings.faiss_snapshot_delay_s,
+            snapshot_wal_bytes=settings.faiss_snapshot_wal_mb * 1024 * 1024,
+            wal_fsync=settings.faiss_wal_fsync,
+            search_batch_size=settings.faiss_search_batch_max_size,
+            search_batch_wait_ms=settings.faiss_search_batch_max_wait_ms,
+            search_pool=self.search_pool,
+            filter_exact_max=settings.faiss_filter_exact_max,
+        )
+
+        logger.debug(f"🔧 FaissChunkRepository をインスタンス化します (index_dir={index_dir})")
+        self.faiss_chunk_repo = FaissChunkRepository(
+            index_dir=index_dir,
+            dimension=settings.embedding_dim,
+            policy=replace(index_policy, kind=settings.chunk_index_type),
+            compact_ratio=settings.faiss_compact_tombstone_ratio,
+            rerank_factor=settings.faiss_pq_rerank_factor,
+            memo_oversample=settings.faiss_memo_oversample,
+            mmap=settings.faiss_mmap,
+            snapshot_delay=settings.faiss_snapshot_delay_s,
+            snapshot_wal_bytes=settings.faiss_snapshot_wal_mb * 1024 * 1024,
+            wal_fsync=settings.faiss_wal_fsync,
+            search_batch_size=settings.faiss_search_batch_max_size,
+            search_batch_wait_ms=settings.faiss_search_batch_max_wait_ms,
+            search_pool=self.search_pool,
+            filter_exact_max=settings.faiss_filter_exact_max,
+        )
+
+        logger.debug(
+            f"🔧 EmbedderService をインスタンス化します "
+            f"(model={settings.model_name}, backend={settings.embedding_backend})"
+        )
+        backend = create_backend(
+            settings.embedding_backend,
+            settings.model_name,
+            onnx_dir=index_dir / "onnx" / settings.model_name.replace("/", "__"),
+            quantize=settings.onnx_quantize,
+            intra_op_threads=settings.onnx_intra_op_threads,
+            inter_op_threads=settings.onnx_inter_op_threads,
+            torch_threads=settings.torch_num_threads,
+        )
+        self.embedder = EmbedderService(
+            model_name=settings.model_name,
+            backend=backend,
+            cache_dir=index_dir / "embedding_cache" if settings.embedding_cache_enabled else None,
+            query_cache_bytes=settings.query_cache_max_bytes,
+            batch_max_size=settings.query_batch_max_size,
+            batch_max_wait_ms=settings.query_batch_max_wait_ms,
+            bulk_batch_size=settings.bulk_encode_batch_size,
+            bulk_workers=settings.bulk_encode_workers,
+            chunk_size=settings.chunk_size,
+            chunk_overlap=settings.chunk_overlap,
+        )
+
+        hosts = parse_elasticsearch_hosts(settings.elasticsearch_hosts)
+        logger.debug(f"🔧 ElasticsearchMemoRepository をインスタンス化します (hosts={hosts})")
+        self.elastic_repo = ElasticsearchMemoRepository(
+            hosts=hosts,
+            index_name=settings.elasticsearch_index,
+        )
+
+        self.datetime_provider: DateTimeProvider = DateTimeJST()
+
+        # メモの作成・更新・削除を各インデックスへ反映する
+        self.memo_indexer = MemoIndexer(
+            memo_repo=self.memo_repo,
+            faiss_index_repo=self.faiss_index_repo,
+            faiss_chunk_repo=self.faiss_chunk_repo,
+            elastic_repo=self.elastic_repo,
+            embedder=self.embedder,
+        )
+
+    async def close(self) -> None:
+        """保持しているリソースを生成と逆順に解放する"""
+        await self.embedder.aclose()
+        try:
+            await self.elastic_repo.close()
+        except Exception as e:
+            logger.warning("Failed to close Elasticsearch client: %s", e)
+        await self.faiss_chunk_repo.aclose()
+        await self.faiss_index_repo.aclose()
+        self.search_pool.shutdown()
+        self.memo_repo.close()
+        logger.debug("Container resources released")
@@ -46,16 +46,91 @@ class Settings(BaseSettings):
         "sentence-transformers/LaBSE",
         description="SentenceTransformer モデル名"
     )
+    model_warmup: bool = Field(
+        True,
+        description="起動時にモデルをロードしてダミー推論を 1 回行うか"
+    )
+
+    # ── 推論バックエンド設定 ──
+    embedding_backend: str = Field(
+        "torch",
+        pattern="^(torch|onnx)$",
+        description="埋め込みの推論バックエンド (torch / onnx)"
+    )
+    onnx_quantize: bool = Field(
+        True,
+        description="ONNX バックエンドで動的 int8 量子化モデルを使うか"
+    )
+    torch_num_threads: int = Field(
+        0,
+        ge=0,
+        description="PyTorch バックエンドの intra-op スレッド数（torch.set_num_threads。0 はランタイム既定）"
+    )
+    onnx_intra_op_threads: int = Field(
+        0,
+        ge=0,
+        description="ONNX Runtime の intra-op スレッド数（0 はランタイム既定）"
+    )
+    onnx_inter_op_threads: int = Field(
+        0,
+        ge=0,
+        description="ONNX Runtime の inter-op スレッド数（0 はランタイム既定）"
+    )
     chunk_size: int = Field(
         300,
         ge=1,
-        description="テキスト分割チャンクサイズ"
+        description="テキスト分割チャンクサイズ（トークン数。モデルの最大系列長で頭打ち）"
+    )
+    chunk_overlap: int = Field(
+        32,
+        ge=0,
+        description="隣接チャンク間で重ねるトークン数（文単位で重ねる）"
     )
     embedding_dim: int = Field(
         768,
         ge=1,
         description="埋め込みモデルの次元数"
     )
+    embedding_store_dtype: str = Field(
+        "float32",
+        pattern="^(float32|float16)$",
+        description="埋め込み行列ストアの保存精度 (float32 / float16)"
+    )
+
+    # ── 埋め込みキャッシュ設定 ──
+    embedding_cache_enabled: bool = Field(
+        True,
+        description="チャンク埋め込みのディスクキャッシュを有効にするか"
+    )
+    query_cache_max_bytes: int = Field(
+        64 * 1024 * 1024,
+        ge=0,
+        description="クエリ埋め込み LRU キャッシュの最大バイト数"
+    )
+
+    # ── クエリ埋め込みのマイクロバッチ設定 ──
+    query_batch_max_size: int = Field(
+        32,
+        ge=1,
+        description="1 回の forward にまとめるクエリの最大件数"
+    )
+    query_batch_max_wait_ms: float = Field(
+        5.0,
+        ge=0.0,
+        description="バッチを集めるために待つ最大時間（ミリ秒）"
+    )
+
+    # ── 一括エンコード（再構築・一括ベクトル化）設定 ──
+    bulk_encode_batch_size: int = Field(
+        128,
+        ge=1,
+        description="一括エンコード時の 1 バッチあたりのチャンク数"
+    )
+    bulk_encode_workers: int = Field(
+        0,
+        ge=0,
+        description="一括エンコードを分散するワーカープロセス数（0/1 はプロセス内で実行）"
+    )
 
     # ── ハイブリッド検索の重み設定 ──
     hybrid_semantic_weight: float = Field(
@@ -68,6 +143,165 @@ class Settings(BaseSettings):
         ge=0.0, le=1.0,
         description="ハイブリッド検索での全文検索スコアの重み"
     )
+    search_cache_max_entries: int = Field(
+        1024,
+        ge=0,
+        description="検索結果キャッシュの最大件数（0 で無効）"
+    )
+    search_cache_ttl_s: float = Field(
+        60.0,
+        gt=0.0,
+        description="検索結果キャッシュの有効期間（秒）。メモの変更時は期限を待たずに無効化される"
+    )
+    search_cache_max_mb: int = Field(
+        64,
+        ge=1,
+        description="検索結果キャッシュのメモリ上限（推定 MB）"
+    )
+    hybrid_fusion: str = Field(
+        "minmax",
+        pattern="^(minmax|zscore|rrf)$",
+        description="ハイブリッド検索の既定の融合方式（minmax: Min-Max 正規化の重み付き和 / zscore: 標準化の重み付き和 / rrf: 順位融合）"
+    )
+    hybrid_rrf_k: int = Field(
+        60,
+        ge=1,
+        description="RRF の定数 k（1 / (k + 順位)。大きいほど下位の順位も効く）"
+    )
+    search_max_results: int = Field(
+        1000,
+        ge=1,
+        description="top_k 未指定のハイブリッド検索で返す最大件数（全件取得の代わりの上限）"
+    )
+
+    faiss_compact_tombstone_ratio: float = Field(
+        0.2,
+        ge=0.0, le=1.0,
+        description="FAISS の墓標（削除済みベクトル）比率がこれを超えたらバックグラウンドでコンパクション"
+    )
+
+    faiss_mmap: bool = Field(
+        True,
+        description="保存済み FAISS インデックスを mmap で開く（起動を速くし、ワーカー間でページキャッシュを共有）"
+    )
+
+    # ── FAISS の永続化（WAL＋スナップショット） ──
+    faiss_snapshot_delay_s: float = Field(
+        2.0,
+        ge=0.0,
+        description="変更が途切れてから FAISS インデックス全体のスナップショットを書き出すまでの秒数（変更自体は WAL に即時追記）"
+    )
+    faiss_snapshot_wal_mb: int = Field(
+        64,
+        ge=1,
+        description="WAL がこのサイズ（MB）を超えたら待たずにスナップショットを取る"
+    )
+    faiss_wal_fsync: bool = Field(
+        True,
+        description="WAL への追記ごとに fsync する（無効にすると OS クラッシュ時に直近の変更を失い得る）"
+    )
+
+    # ── FAISS 検索のまとめ処理 ──
+    faiss_search_batch_max_size: int = Field(
+        64,
+        ge=1,
+        description="同時に届いたベクトル検索を 1 回の行列検索にまとめる最大件数"
+    )
+    faiss_search_batch_max_wait_ms: float = Field(
+        0.0,
+        ge=0.0,
+        description="検索をまとめるために最初の要求から待つ時間（ms）。0 なら処理中に溜まった分だけまとめる"
+    )
+    faiss_search_workers: int = Field(
+        0,
+        ge=0,
+        description="FAISS 検索専用スレッド数（0 でコア数の半分）。永続化・埋め込みとは別のプールで動く"
+    )
+    faiss_omp_threads: int = Field(
+        0,
+        ge=0,
+        description="検索スレッドごとの FAISS OpenMP スレッド数（0 でコア数 ÷ 検索スレッド数）"
+    )
+    faiss_search_max_pending: int = Field(
+        1024,
+        ge=1,
+        description="待ち＋実行中の検索要求の上限。超えた要求は 503 で即座に断る"
+    )
+    search_batch_max_queries: int = Field(
+        10_000,
+        ge=1,
+        description="バッチ検索 API が 1 リクエストで受け付ける最大クエリ数"
+    )
+
+    # ── FAISS インデックス種別の自動選択 ──
+    faiss_flat_max_vectors: int = Field(
+        20_000,
+        ge=0,
+        description="この件数以下は Flat（厳密な全件検索）。超えたら HNSW / IVF に移行"
+    )
+    faiss_memory_budget_mb: int = Field(
+        1024,
+        ge=0,
+        description="HNSW を選ぶかどうかのメモリ予算（MB）。超える規模では IVF を使う"
+    )
+    faiss_nprobe: int = Field(
+        0,
+        ge=0,
+        description="IVF 検索時に調べるセル数（0 でセル数から自動決定）"
+    )
+
+    # ── HNSW 設定 ──
+    chunk_index_type: str = Field(
+        "auto",
+        pattern="^(auto|flat|hnsw|ivf|ivfpq)$",
+        description="チャンク索引の種別 (auto は件数とメモリ予算から自動選択。ivfpq は圧縮＋再ランク)"
+    )
+    faiss_hnsw_m: int = Field(
+        32,
+        ge=4, le=128,
+        description="HNSW の各ノードのリンク数 M（大きいほど再現率↑・メモリ↑）"
+    )
+    faiss_hnsw_ef_construction: int = Field(
+        80,
+        ge=8,
+        description="HNSW 構築時の探索幅 efConstruction"
+    )
+    faiss_hnsw_ef_search: int = Field(
+        64,
+        ge=1,
+        description="HNSW 検索時の既定の探索幅 efSearch（リクエストごとに上書き可）"
+    )
+
+    # ── IVFPQ（圧縮索引）設定 ──
+    faiss_pq_m: int = Field(
+        96,
+        ge=1,
+        description="PQ のサブ量子化器数（1 ベクトルあたり約 pq_m バイト。次元を割り切れる値に切り下げ）"
+    )
+    faiss_pq_nbits: int = Field(
+        8,
+        ge=4, le=12,
+        description="PQ のサブ量子化器あたりのビット数"
+    )
+    faiss_opq: bool = Field(
+        True,
+        description="PQ の前に OPQ 回転を学習する（再現率↑・学習時間↑）"
+    )
+    faiss_pq_rerank_factor: int = Field(
+        8,
+        ge=1,
+        description="IVFPQ 検索で top_k の何倍の候補を拾い、原精度ベクトルで再ランクするか"
+    )
+    faiss_memo_oversample: float = Field(
+        1.5,
+        ge=1.0,
+        description="メモ単位検索で最初に「メモあたり平均チャンク数 × top_k」の何倍を拾うか（不足すれば倍々に広げる）"
+    )
+    faiss_filter_exact_max: int = Field(
+        4096,
+        ge=0,
+        description="絞り込み検索で対象ベクトルがこれ以下なら索引を使わず総当たりで採点する（超えたら IDSelector で索引探索）"
+    )
 
     faiss_index_path: Path = Field(
         default=REPO_ROOT / ".index_data" / "chunks.index",
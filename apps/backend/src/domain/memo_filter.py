@@ -0,0 +1,39 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True)
+class MemoFilter:
+    """
+    検索対象を絞り込むメタデータ条件（指定した条件はすべて AND）
+    - category: カテゴリ完全一致
+    - tags: すべてのタグを持つメモ
+    - created_from / created_to: created_at の範囲（両端を含む）
+    """
+    category: Optional[str] = None
+    tags: Tuple[str, ...] = ()
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.category or self.tags or self.created_from or self.created_to)
+
+    def matches(self, memo) -> bool:
+        """メモ 1 件が条件を満たすか（インデックスを持たない実装向け）"""
+        if self.category and memo.category != self.category:
+            return False
+        if self.tags:
+            have = {t.strip() for t in memo.tags}
+            if not all(t in have for t in self.tags):
+                return False
+        if self.created_from or self.created_to:
+            created = memo.created_at
+            if not isinstance(created, datetime):
+                return False
+            if self.created_from and created.timestamp() < self.created_from.timestamp():
+                return False
+            if self.created_to and created.timestamp() > self.created_to.timestamp():
+                return False
+        return True
@@ -1,6 +1,6 @@
 import logging
 import asyncio
-from typing import List, Tuple, Optional, Union
+from typing import Dict, Iterable, List, Tuple, Optional, Union
 from pathlib import Path
 
 from elasticsearch import AsyncElasticsearch
@@ -9,6 +9,7 @@ from elasticsearch.helpers import async_bulk
 from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
 
 from domain.memo import Memo
+from domain.memo_filter import MemoFilter
 from interfaces.repositories.search_repo import SearchRepository
 
 logger = logging.getLogger(__name__)
@@ -20,6 +21,7 @@ class OptimizedElasticsearchMemoRepository(SearchRepository):
     - async_bulk で高速バルク投入＋リトライ
     - background_index の失敗検知
     - search/mget は TransportError/APIError をキャッチ
+    - 絞り込み条件は bool クエリの filter 句で渡す（スコア計算の対象外・キャッシュされる）
     """
 
     def __init__(
@@ -60,18 +62,21 @@ class OptimizedElasticsearchMemoRepository(SearchRepository):
         self,
         query: str,
         top_k: int = 10,
+        filters: Optional[MemoFilter] = None,
     ) -> List[Tuple[Memo, float]]:
+        match = {
+            "multi_match": {
+                "query": query,
+                "fields": ["title^2", "body"],
+                "fuzziness": "AUTO",
+            }
+        }
+        clauses = self._filter_clauses(filters)
         try:
             resp = await self._es.search(
                 index=self._index,
                 size=top_k,
-                query={
-                    "multi_match": {
-                        "query": query,
-                        "fields": ["title^2", "body"],
-                        "fuzziness": "AUTO",
-                    }
-                },
+                query={"bool": {"must": [match], "filter": clauses}} if clauses else match,
             )
         except (TransportError, ApiError) as e:
             logger.error("Elasticsearch search error: %s", e, exc_info=True)
@@ -83,6 +88,25 @@ class OptimizedElasticsearchMemoRepository(SearchRepository):
             for hit in hits
         ]
 
+    @staticmethod
+    def _filter_clauses(filters: Optional[MemoFilter]) -> List[dict]:
+        """MemoFilter → filter 句（category / tags は動的マッピングの keyword サブフィールドで完全一致）"""
+        if filters is None or filters.is_empty:
+            return []
+        clauses: List[dict] = []
+        if filters.category:
+            clauses.append({"term": {"category.keyword": filters.category}})
+        for tag in filters.tags:
+            clauses.append({"term": {"tags.keyword": tag}})
+        if filters.created_from or filters.created_to:
+            bounds = {}
+            if filters.created_from:
+                bounds["gte"] = filters.created_from.isoformat()
+            if filters.created_to:
+                bounds["lte"] = filters.created_to.isoformat()
+            clauses.append({"range": {"created_at": bounds}})
+        return clauses
+
     async def mget(
         self,
         uuids: List[str],
@@ -104,6 +128,14 @@ class OptimizedElasticsearchMemoRepository(SearchRepository):
         result = await self.mget([uuid])
         return result[0] if result else None
 
+    async def get_many(self, uuids: Iterable[str]) -> Dict[str, Memo]:
+        """
+        mget 一回で複数 UUID を取得し {uuid: Memo} を返す（未検出は含めない）
+        """
+        unique = list(dict.fromkeys(u for u in uuids if u))
+        docs = await self.mget(unique)
+        return {u: m for u, m in zip(unique, docs) if m is not None}
+
     async def bulk_index(self, memos: List[Memo]) -> None:
         """
         async_bulk + tenacity でリトライ付き高速一括登録
@@ -141,6 +173,19 @@ class OptimizedElasticsearchMemoRepository(SearchRepository):
                 if failed:
                     logger.warning("Failed bulk items: %s", failed)
 
+    async def delete(self, uuid: str) -> bool:
+        """
+        UUID のドキュメントを削除（存在しなければ False）
+        """
+        try:
+            await self._es.delete(index=self._index, id=uuid, refresh="wait_for")
+            return True
+        except ApiError as e:
+            if getattr(e, "status_code", None) == 404:
+                return False
+            logger.error("ES delete failed (uuid=%s): %s", uuid, e)
+            raise
+
     def background_index(self, memos: List[Memo]) -> None:
         """
         バルク登録をバックグラウンドで実行し、例外をログ出力
@@ -0,0 +1,172 @@
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingStore:
+    """
+    メモ埋め込みを 1 本の行列ファイルにまとめた追記型ストア
+    - embeddings.bin : dtype 固定長の行を追記するだけの生行列（np.memmap で参照）
+    - embedding_ids.log : "<row>\\t<uuid>" / "-\\t<uuid>" を追記する UUID→行 のログ
+    - 同じ UUID の再登録は新しい行を追記して参照を差し替え、古い行は compact() で回収
+    """
+
+    MATRIX_FILE = "embeddings.bin"
+    LOG_FILE = "embedding_ids.log"
+    _DTYPES = {"float32": np.float32, "float16": np.float16}
+
+    def __init__(self, store_dir: Union[str, Path], dim: int, dtype: str = "float32"):
+        if dtype not in self._DTYPES:
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.dtype = np.dtype(self._DTYPES[dtype])
+        self.matrix_path = self.store_dir / self.MATRIX_FILE
+        self.log_path = self.store_dir / self.LOG_FILE
+
+        self._lock = threading.RLock()
+        self._rows: Dict[str, int] = {}
+        self._n_rows = 0
+        self._mmap: Optional[np.memmap] = None
+        self._load()
+
+    # ── 読み込み ──
+
+    def _load(self) -> None:
+        row_bytes = self.dim * self.dtype.itemsize
+        size = self.matrix_path.stat().st_size if self.matrix_path.exists() else 0
+        # 書き込み途中で落ちた半端な行は切り捨てる
+        self._n_rows = size // row_bytes
+        if size % row_bytes:
+            with open(self.matrix_path, "r+b") as f:
+                f.truncate(self._n_rows * row_bytes)
+
+        rows: Dict[str, int] = {}
+        if self.log_path.exists():
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    row, sep, uuid = line.rstrip("\n").partition("\t")
+                    if not sep or not uuid:
+                        continue
+                    if row == "-":
+                        rows.pop(uuid, None)
+                    elif row.isdigit() and int(row) < self._n_rows:
+                        rows[uuid] = int(row)
+        self._rows = rows
+        logger.debug("Loaded EmbeddingStore %s (%d live / %d rows)", self.store_dir, len(rows), self._n_rows)
+
+    def _matrix(self) -> np.ndarray:
+        """現在の行数に合わせた読み取り専用 memmap（追記後に開き直す）"""
+        if self._n_rows == 0:
+            return np.empty((0, self.dim), dtype=self.dtype)
+        if self._mmap is None or self._mmap.shape[0] != self._n_rows:
+            self._mmap = np.memmap(
+                self.matrix_path, dtype=self.dtype, mode="r", shape=(self._n_rows, self.dim)
+            )
+        return self._mmap
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, uuid: str) -> bool:
+        return uuid in self._rows
+
+    def uuids(self) -> List[str]:
+        with self._lock:
+            return list(self._rows)
+
+    def get(self, uuid: str) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._rows.get(uuid)
+            if row is None:
+                return None
+            return np.asarray(self._matrix()[row], dtype=np.float32).copy()
+
+    def get_many(self, uuids: Iterable[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            hits = [(u, self._rows[u]) for u in dict.fromkeys(uuids) if u in self._rows]
+            if not hits:
+                return {}
+            block = np.asarray(self._matrix()[[r for _, r in hits]], dtype=np.float32)
+        return {u: block[i] for i, (u, _) in enumerate(hits)}
+
+    def matrix(self, uuids: Optional[List[str]] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        (UUID リスト, 行列) を返す。
+        全行が生存していて float32 の場合は memmap をそのまま返す（ゼロコピー）。
+        """
+        with self._lock:
+            if uuids is None:
+                items = sorted(self._rows.items(), key=lambda kv: kv[1])
+            else:
+                items = [(u, self._rows[u]) for u in uuids if u in self._rows]
+            ids = [u for u, _ in items]
+            rows = [r for _, r in items]
+            mat = self._matrix()
+            if rows == list(range(self._n_rows)) and self.dtype == np.float32:
+                return ids, mat
+            return ids, np.asarray(mat[rows], dtype=np.float32)
+
+    # ── 書き込み ──
+
+    def put(self, uuid: str, vec: np.ndarray) -> None:
+        self.put_many([(uuid, vec)])
+
+    def put_many(self, items: Iterable[Tuple[str, np.ndarray]]) -> None:
+        items = [(u, v) for u, v in items if v is not None]
+        if not items:
+            return
+        block = np.stack([np.asarray(v).reshape(-1) for _, v in items]).astype(self.dtype)
+        if block.shape[1] != self.dim:
+            raise ValueError(f"Embedding dim mismatch: expected {self.dim}, got {block.shape[1]}")
+
+        with self._lock:
+            start = self._n_rows
+            with open(self.matrix_path, "ab") as f:
+                f.write(block.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            lines = "".join(f"{start + i}\t{u}\n" for i, (u, _) in enumerate(items))
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            self._n_rows += len(items)
+            for i, (u, _) in enumerate(items):
+                self._rows[u] = start + i
+
+    def remove(self, uuid: str) -> None:
+        self.remove_many([uuid])
+
+    def remove_many(self, uuids: Iterable[str]) -> None:
+        with self._lock:
+            gone = [u for u in dict.fromkeys(uuids) if self._rows.pop(u, None) is not None]
+            if not gone:
+                return
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"-\t{u}\n" for u in gone))
+
+    @property
+    def dead_rows(self) -> int:
+        """参照されなくなった行数（compact の目安）"""
+        return self._n_rows - len(self._rows)
+
+    def compact(self) -> None:
+        """生存行だけを詰め直して行列とログを作り直す（tmp→rename で置換）"""
+        with self._lock:
+            ids, mat = self.matrix()
+            tmp_matrix = self.matrix_path.with_suffix(".bin.tmp")
+            tmp_log = self.log_path.with_suffix(".log.tmp")
+            np.ascontiguousarray(mat, dtype=self.dtype).tofile(tmp_matrix)
+            tmp_log.write_text("".join(f"{i}\t{u}\n" for i, u in enumerate(ids)), encoding="utf-8")
+            self._mmap = None
+            os.replace(tmp_matrix, self.matrix_path)
+            os.replace(tmp_log, self.log_path)
+            self._rows = {u: i for i, u in enumerate(ids)}
+            self._n_rows = len(ids)
+            logger.debug("Compacted EmbeddingStore to %d rows", self._n_rows)
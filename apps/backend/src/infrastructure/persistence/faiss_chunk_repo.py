@@ -1,147 +1,810 @@
 import json
 import logging
+import os
 import asyncio
+import threading
 from pathlib import Path
-from typing import List, Tuple, Optional, Set, Union
+from typing import Dict, Iterable, List, Tuple, Optional, Set, Union
 from concurrent.futures import ThreadPoolExecutor
 
 import faiss
 import numpy as np
 from domain.memo import Memo
+from infrastructure.persistence import faiss_factory, faiss_ids
+from infrastructure.persistence.embedding_store import EmbeddingStore
+from infrastructure.persistence.faiss_factory import IVFPQ, IndexPolicy
+from infrastructure.persistence.faiss_idmap import IdMapFile
+from infrastructure.persistence.faiss_wal import OP_ADD, SnapshotScheduler, WriteAheadLog
+from infrastructure.services.chunker import Chunk
+from infrastructure.services.search_coalescer import SearchCoalescer
+from infrastructure.services.search_pool import SearchPool
+from infrastructure.utils.rw_lock import ReadWriteLock
 
 logger = logging.getLogger(__name__)
 
+
+def _best_per_memo(hits: List[Tuple[str, float]], top_k: int) -> List[Tuple[str, float]]:
+    """
+    スコア降順の候補をメモごとに先頭（＝最大スコア）の 1 件へ畳み、上位 top_k 件を返す
+    チャンクIDは "{メモUUID}_{連番}"
+    """
+    if not hits:
+        return []
+    memo_ids = np.array([cid.split("_", 1)[0] for cid, _ in hits])
+    _, first = np.unique(memo_ids, return_index=True)
+    first.sort()
+    return [hits[i] for i in first[:top_k].tolist()]
+
+
+def _passage_line(chunk_id: str, chunk: Optional[Chunk]) -> str:
+    """chunk_passages.jsonl の 1 行（chunk が None なら削除記録）"""
+    if chunk is None:
+        return json.dumps({"id": chunk_id, "removed": True}) + "\n"
+    return json.dumps({"id": chunk_id, **chunk.to_dict()}, ensure_ascii=False) + "\n"
+
+
 class AsyncFaissChunkRepository:
     """
     チャンク単位の FAISS インデックス管理リポジトリ（非同期永続化対応）
-    - チャンクIDリストでインデックス⇔ID逆引きをO(1)に
+    - チャンクごとに安定した int64 ID を振り、ID⇔チャンクID の逆引きをO(1)に
+    - メモ単位でチャンクを削除・置換（物理削除できない索引は墓標＋コンパクション）
     - ThreadPoolExecutorでディスクI/Oをオフロード
-    - 大規模向けIVF Flat IPインデックスに切り替え可能
+    - 件数に応じて Flat / HNSW / IVF（いずれも内積）を選び、閾値をまたいだら作り直す
+      （policy.kind で HNSW などに固定も可。HNSW の efSearch は検索ごとに指定できる）
+    - 保存済みインデックスは mmap で開き、最初の変更時にだけメモリへ読み込む
+    - IVFPQ 指定時は原精度ベクトルを chunk_vectors/（memmap）にも保存し、
+      圧縮索引で多めに拾った候補を原精度の内積で再ランクする
+    - チャンク本文とオフセットを chunk_passages.jsonl に追記保存（検索時に再分割しない）
+      削除記録が生存件数を上回ったらスナップショット時に詰め直す
+    - 同時に届いた検索はまとめて 1 回の行列検索で処理する（search_batch で直接渡すことも可）
+    - search_memos はメモ単位で異なるメモ top_k 件を返す（足りなければ拾う件数を広げて再検索）
+    - search_memos に memo_uuids を渡すとそのメモのチャンクだけを探索する
+      （少数なら総当たり、多ければ IDSelector で索引の探索中に絞り込む）
+    - 変更は WAL（chunk.wal）に追記するだけにし、インデックス全体は間引いたスナップショットで書き出す
     """
     def __init__(
         self,
         index_dir: Union[str, Path],
         dimension: int,
-        use_ivf: bool = False,
-        nlist: int = 128,
+        policy: Optional[IndexPolicy] = None,
         io_workers: int = 2,
+        compact_ratio: float = 0.2,
+        rerank_factor: int = 8,        # IVFPQ で再ランク用に top_k の何倍を拾うか
+        memo_oversample: float = 1.5,  # メモ単位検索で「平均チャンク数 × top_k」の何倍を最初に拾うか
+        filter_exact_max: int = 4096,  # 絞り込み後のチャンク数がこれ以下なら索引を使わず総当たりで採点
+        mmap: bool = True,             # 保存済みインデックスを mmap で開く
+        snapshot_delay: float = 2.0,   # 変更が途切れてからスナップショットを取るまでの秒数
+        snapshot_wal_bytes: int = 64 * 1024 * 1024,  # WAL がこれを超えたら即スナップショット
+        wal_fsync: bool = True,        # WAL への追記ごとに fsync する
+        search_batch_size: int = 64,   # 同時検索をまとめる最大件数
+        search_batch_wait_ms: float = 0.0,  # まとめるために最初の要求から待つ時間
+        search_pool: Optional[SearchPool] = None,  # 検索専用プール（未指定なら専用に 1 つ作る）
+        passage_compact_min: int = 1024,  # 本文ログの行数がこれ未満なら詰め直さない
     ):
         self.index_dir = Path(index_dir)
         self.index_dir.mkdir(parents=True, exist_ok=True)
 
         self.dimension = dimension
-        self.use_ivf = use_ivf
-        self.nlist = nlist
+        self.policy = policy or IndexPolicy()
+        self.compact_ratio = compact_ratio
+        self.rerank_factor = max(1, rerank_factor)
+        self.memo_oversample = max(1.0, memo_oversample)
+        self.filter_exact_max = filter_exact_max
+        self.passage_compact_min = passage_compact_min
+        self.mmap = mmap
+        # True の間は self.index がファイルの読み取り専用ビュー
+        self._mapped = False
+        # スナップショットに未反映の変更があるか
+        self._dirty = False
 
         # 永続化用スレッドプール
         self._io_executor = ThreadPoolExecutor(max_workers=io_workers)
-        # チャンクID の順序付きマッピング
-        self._chunk_ids: List[str] = []
+        # 変更・書き出し・保守を直列化する（検索はこのロックを取らない）
+        self._lock = threading.RLock()
+        # インデックスと ID マップの参照・書き換え。検索は読み取り側で並行に走り、
+        # 書き換えはメモリ上の反映だけを短く排他にする（WAL の fsync やスナップショットは含めない）
+        self._index_lock = ReadWriteLock()
+        self._maintain_task: Optional[asyncio.Task] = None
+        # 検索は永続化スレッドとも既定の executor とも別の専用プールで実行する
+        self._owns_search_pool = search_pool is None
+        self._search_pool = search_pool or SearchPool()
+        # 同時に届いた search() を 1 回の行列検索にまとめる
+        self._coalescer = SearchCoalescer(
+            self._sync_search_batch, search_batch_size, search_batch_wait_ms, self._search_pool
+        )
+        self._memo_coalescer = SearchCoalescer(
+            self._sync_search_memos_batch, search_batch_size, search_batch_wait_ms, self._search_pool
+        )
+        # 最後のスナップショット以降の変更ログ
+        self._wal = WriteAheadLog(self.index_dir / "chunk.wal", fsync=wal_fsync)
+        self._snapshots = SnapshotScheduler(
+            self._io_executor, self._sync_persist, self._wal, snapshot_delay, snapshot_wal_bytes
+        )
+        # int64 ID ⇔ チャンクID、メモ UUID → そのチャンクの ID 群
+        self._id_to_chunk: Dict[int, str] = {}
+        self._chunk_to_id: Dict[str, int] = {}
+        self._memo_chunks: Dict[str, List[int]] = {}
+        # 永続化は追記型のバイナリマップ（旧形式の chunk_ids.json は初回読み込み時に移行）
+        self._id_map = IdMapFile(self.index_dir / "chunk_ids.idmap")
+        self._next_id = 0
+        self._tombstones: Set[int] = set()
+        # チャンクID → 本文中の該当箇所
+        self._passages: Dict[str, Chunk] = {}
+        # 追記待ちのチャンク本文（None は削除記録）
+        self._pending_passages: List[Tuple[str, Optional[Chunk]]] = []
+        self._passage_lock = threading.Lock()
+        # chunk_passages.jsonl への追記と書き直しを直列化する
+        self._passage_file_lock = threading.Lock()
+        # chunk_passages.jsonl の行数（削除記録・上書き前の記録を含む）
+        self._passage_records = 0
 
         # FAISS インデックスをロード or 作成
         self.index = self._load_or_create_index()
 
-        # チャンクIDリストをロード
+        # チャンクIDマップをロード
         self._load_chunk_ids()
+        self._load_passages()
+
+        # 再ランク用の原精度ベクトル（IVFPQ のときだけ保持）
+        self._vectors: Optional[EmbeddingStore] = None
+        if self.policy.kind == IVFPQ:
+            self._vectors = EmbeddingStore(self.index_dir / "chunk_vectors", dim=dimension)
+
+        # 前回のスナップショット以降の変更を適用
+        self._replay_wal()
+
+        stored = faiss_ids.stored_ids(self.index)
+        self._tombstones = set(stored.tolist()) - set(self._id_to_chunk)
+        self._next_id = max(self._id_to_chunk, default=-1) + 1
+        if stored.size:
+            self._next_id = max(self._next_id, int(stored.max()) + 1)
+
+        if self._vectors is not None:
+            self._sync_vector_store()
+
+    def _sync_vector_store(self) -> None:
+        """原精度ストアをチャンクIDマップに合わせる（不足分はインデックスから復元）"""
+        live = set(self._chunk_to_id)
+        self._vectors.remove_many([cid for cid in self._vectors.uuids() if cid not in live])
+        missing = [cid for cid in self._chunk_to_id if cid not in self._vectors]
+        if not missing:
+            return
+        if faiss_factory.describe(self.index).kind == IVFPQ:
+            logger.warning("Backfilling %d chunk vectors from a compressed index (lossy)", len(missing))
+        vecs = faiss_ids.reconstruct(self.index, [self._chunk_to_id[c] for c in missing], self.dimension)
+        self._vectors.put_many(zip(missing, vecs))
+        logger.info("Backfilled %d chunk vectors into the full-precision store", len(missing))
+
+    def _fetch_vectors(self, ids: List[int]) -> np.ndarray:
+        """ID 列のベクトル。原精度ストアがあればそちらから読む（圧縮索引の復元は近似のため）"""
+        if self._vectors is None:
+            return faiss_ids.reconstruct(self.index, ids, self.dimension)
+        if not ids:
+            return np.empty((0, self.dimension), dtype="float32")
+        cids = [self._id_to_chunk[i] for i in ids]
+        found = self._vectors.get_many(cids)
+        return np.stack([found[c] for c in cids])
+
+    def close(self) -> None:
+        """永続化用スレッドプールを停止し、未反映の変更をスナップショットに書き出す"""
+        self._snapshots.cancel()
+        self._io_executor.shutdown(wait=True)
+        if self._owns_search_pool:
+            self._search_pool.shutdown()
+        if self._dirty:
+            self._sync_persist()
+
+    async def aclose(self) -> None:
+        """検索コアレッサを止めてから close する"""
+        await self._coalescer.close()
+        await self._memo_coalescer.close()
+        self.close()
+
+    def _replay_wal(self) -> None:
+        """前回のスナップショット以降の変更を WAL から適用する（何度適用しても同じ結果になる）"""
+        stored = set(faiss_ids.stored_ids(self.index).tolist())
+        replayed = 0
+        for op, ids, keys, vecs in self._wal.replay():
+            self._ensure_writable()
+            if op == OP_ADD:
+                # スナップショットに書き出し済みの ID は追加し直さない
+                fresh = np.array([i not in stored for i in ids.tolist()])
+                if fresh.any():
+                    self.index.add_with_ids(np.ascontiguousarray(vecs[fresh]), ids[fresh])
+                    stored.update(ids[fresh].tolist())
+                if self._vectors is not None:
+                    self._vectors.put_many((c, v) for c, v in zip(keys, vecs) if c not in self._vectors)
+                for i, cid in zip(ids.tolist(), keys):
+                    self._id_to_chunk[i] = cid
+                    self._chunk_to_id[cid] = i
+                    chunks = self._memo_chunks.setdefault(cid.split("_", 1)[0], [])
+                    if i not in chunks:
+                        chunks.append(i)
+                self._id_map.add(zip(ids.tolist(), keys))
+            else:
+                self._unregister(ids.tolist())
+                self._id_map.remove(ids.tolist())
+                _, supported = faiss_ids.remove(self.index, ids.tolist())
+                if supported:
+                    stored.difference_update(ids.tolist())
+            replayed += len(ids)
+        if replayed:
+            self._dirty = True
+            logger.info("Replayed %d WAL records into chunk index", replayed)
 
     def _load_or_create_index(self) -> faiss.Index:
         idx_path = self.index_dir / "chunk.index"
         if idx_path.exists():
-            idx = faiss.read_index(str(idx_path))
+            idx, self._mapped = faiss_factory.read(idx_path, self.mmap)
+            if self._mapped and faiss_ids.is_sequential(idx):
+                idx, self._mapped = faiss_factory.to_memory(idx), False
+            # 旧形式（追加順の連番）はそのまま連番 ID として引き継ぐ
+            idx = faiss_ids.migrate_sequential(idx)
+            faiss_factory.configure(idx, self.policy)
             logger.debug("Loaded FAISS index: %s (ntotal=%d)", idx_path, idx.ntotal)
         else:
-            if self.use_ivf:
-                quantizer = faiss.IndexFlatIP(self.dimension)
-                idx = faiss.IndexIVFFlat(quantizer, self.dimension, self.nlist, faiss.METRIC_INNER_PRODUCT)
-                idx.train(np.zeros((1, self.dimension), dtype="float32"))  # train 必須
-                logger.debug("Created IVF FlatIP index (dim=%d, nlist=%d)", self.dimension, self.nlist)
-            else:
-                idx = faiss.IndexFlatIP(self.dimension)
-                logger.debug("Created FlatIP index (dim=%d)", self.dimension)
+            # 空のうちは Flat。件数が増えたら _maybe_maintain で HNSW / IVF に移行する
+            idx = faiss_factory.build(
+                self.policy.plan(0, self.dimension),
+                self.dimension,
+                faiss.METRIC_INNER_PRODUCT,
+                self.policy,
+            )
         return idx
 
     def _load_chunk_ids(self) -> None:
-        path = self.index_dir / "chunk_ids.json"
-        if path.exists():
-            try:
-                raw = path.read_text(encoding="utf-8")
-                self._chunk_ids = json.loads(raw)
-                logger.debug("Loaded %d chunk IDs", len(self._chunk_ids))
-            except Exception as e:
-                logger.error("Failed to load chunk_ids.json: %s", e)
-                self._chunk_ids = []
-        else:
-            self._chunk_ids = []
+        legacy = self.index_dir / "chunk_ids.json"
+        try:
+            if self._id_map.exists():
+                loaded = self._id_map.load()
+            elif legacy.exists():
+                raw = json.loads(legacy.read_text(encoding="utf-8"))
+                # 旧形式はリスト（位置 = 連番 ID）
+                if isinstance(raw, list):
+                    raw = {str(i): cid for i, cid in enumerate(raw)}
+                loaded = {int(key): cid for key, cid in raw.items()}
+                # 一度だけバイナリに書き直し、以降は追記のみ
+                self._id_map.reset()
+                self._id_map.flush(loaded)
+                legacy.unlink()
+                logger.info("Migrated chunk_ids.json to %s (%d entries)", self._id_map.path.name, len(loaded))
+            else:
+                return
+            for faiss_id, cid in loaded.items():
+                self._register(faiss_id, cid)
+            logger.debug("Loaded %d chunk IDs", len(self._id_to_chunk))
+        except Exception as e:
+            logger.error("Failed to load chunk ID map: %s", e)
+
+    def _register(self, faiss_id: int, chunk_id: str) -> None:
+        self._id_to_chunk[faiss_id] = chunk_id
+        self._chunk_to_id[chunk_id] = faiss_id
+        self._memo_chunks.setdefault(chunk_id.split("_", 1)[0], []).append(faiss_id)
+
+    def _unregister(self, ids: Iterable[int]) -> List[str]:
+        """ID 群の登録を外し、外したチャンクIDを返す"""
+        removed = []
+        for i in ids:
+            cid = self._id_to_chunk.pop(i, None)
+            if cid is None:
+                continue
+            # 同じチャンクIDが新しい ID で登録し直されていればそちらは残す
+            if self._chunk_to_id.get(cid) == i:
+                del self._chunk_to_id[cid]
+            memo = cid.split("_", 1)[0]
+            remaining = [j for j in self._memo_chunks.get(memo, []) if j != i]
+            if remaining:
+                self._memo_chunks[memo] = remaining
+            else:
+                self._memo_chunks.pop(memo, None)
+            removed.append(cid)
+        return removed
+
+    def _load_passages(self) -> None:
+        path = self.index_dir / "chunk_passages.jsonl"
+        if not path.exists():
+            return
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                self._passage_records += 1
+                try:
+                    rec = json.loads(line)
+                    if rec.get("removed"):
+                        self._passages.pop(rec["id"], None)
+                        continue
+                    self._passages[rec["id"]] = Chunk(rec["text"], rec["start"], rec["end"])
+                except (ValueError, KeyError):
+                    # 書き込み途中で落ちた末尾行などは読み飛ばす
+                    continue
+        logger.debug("Loaded %d chunk passages", len(self._passages))
+
+    def get_passage(self, chunk_id: str) -> Optional[Chunk]:
+        return self._passages.get(chunk_id)
+
+    def get_passages(self, chunk_ids: Iterable[str]) -> Dict[str, Chunk]:
+        return {cid: self._passages[cid] for cid in chunk_ids if cid in self._passages}
 
     async def _persist(self) -> None:
-        """FAISSインデックスとチャンクIDリストを非同期で永続化"""
+        """すぐにスナップショットを取る（バックグラウンドスレッドで実行）"""
         loop = asyncio.get_running_loop()
         await loop.run_in_executor(self._io_executor, self._sync_persist)
 
+    async def _committed(self) -> None:
+        """
+        変更直後に呼ぶ。チャンク本文だけはすぐ追記し、
+        インデックスのスナップショットは SnapshotScheduler に任せる（変更自体は WAL に記録済み）
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._io_executor, self._sync_flush_passages)
+        self._snapshots.touch()
+
     def _sync_persist(self) -> None:
+        """
+        スナップショット: インデックス → ID マップ → WAL を空に、の順で書く
+        途中で落ちても WAL が残るので、起動時の再適用で追いつける
+        """
         try:
-            # インデックス書き出し
-            faiss.write_index(self.index, str(self.index_dir / "chunk.index"))
-            # チャンクIDリスト書き出し
-            (self.index_dir / "chunk_ids.json").write_text(
-                json.dumps(self._chunk_ids, ensure_ascii=False, indent=2),
-                encoding="utf-8",
-            )
-            logger.debug("Persisted index and %d chunk IDs", len(self._chunk_ids))
+            with self._lock:
+                if self._dirty:
+                    faiss_factory.write(self.index, self.index_dir / "chunk.index")
+                    # チャンクIDマップは前回からの差分だけ追記
+                    self._id_map.flush(self._id_to_chunk)
+                    self._wal.reset()
+                    self._dirty = False
+            self._sync_flush_passages()
+            self._sync_compact_passages()
+            logger.debug("Persisted index and %d chunk IDs", len(self._id_to_chunk))
         except Exception as e:
             logger.error("Persistence error: %s", e)
 
-    async def add_chunks_batch(self, items: List[Tuple[str, np.ndarray]]) -> None:
+    def _sync_flush_passages(self) -> None:
+        try:
+            # チャンク本文は追記のみ
+            with self._passage_file_lock:
+                with self._passage_lock:
+                    pending, self._pending_passages = self._pending_passages, []
+                if pending:
+                    with (self.index_dir / "chunk_passages.jsonl").open("a", encoding="utf-8") as f:
+                        for cid, chunk in pending:
+                            f.write(_passage_line(cid, chunk))
+                    self._passage_records += len(pending)
+        except Exception as e:
+            logger.error("Failed to append chunk passages: %s", e)
+
+    def _sync_compact_passages(self) -> None:
+        """削除記録・上書き前の記録が生存件数を上回ったら、生きている本文だけで書き直す（tmp→rename）"""
+        try:
+            with self._passage_file_lock:
+                with self._passage_lock:
+                    live = len(self._passages)
+                    if (
+                        self._passage_records < self.passage_compact_min
+                        or self._passage_records - live <= live
+                    ):
+                        return
+                    # 追記待ちの分も self._passages に反映済みなので、書き直しに含まれる
+                    self._pending_passages = []
+                    snapshot = list(self._passages.items())
+                path = self.index_dir / "chunk_passages.jsonl"
+                tmp = path.with_name(path.name + ".tmp")
+                with tmp.open("w", encoding="utf-8") as f:
+                    for cid, chunk in snapshot:
+                        f.write(_passage_line(cid, chunk))
+                os.replace(tmp, path)
+                dropped, self._passage_records = self._passage_records - len(snapshot), len(snapshot)
+            logger.debug("Compacted chunk passages: dropped %d records", dropped)
+        except Exception as e:
+            logger.error("Failed to compact chunk passages: %s", e)
+
+    async def add_chunks_batch(
+        self,
+        items: List[Tuple[str, np.ndarray]],
+        passages: Optional[List[Chunk]] = None,
+    ) -> None:
         """
         バッチ単位でチャンクを追加し、非同期で一度だけ永続化
+        passages を渡すと items と同じ並びでチャンク本文・オフセットも保存する
         """
-        # 新規チャンクのみフィルタ
-        new = [(cid, vec) for cid, vec in items if cid not in self._chunk_ids]
-        if not new:
+        # WAL の fsync・mmap の実体化があるので、ロックを取るのも含めてバックグラウンドで行う
+        loop = asyncio.get_running_loop()
+        new_ids = await loop.run_in_executor(self._io_executor, self._sync_add_new, items)
+        if not new_ids:
             logger.debug("No new chunks to add")
             return
 
+        if passages is not None:
+            with self._passage_lock:
+                for (cid, _), chunk in zip(items, passages):
+                    if cid in new_ids:
+                        self._passages[cid] = chunk
+                        self._pending_passages.append((cid, chunk))
+
+        await self._committed()
+        self._maybe_maintain()
+
+    async def replace_memo_chunks(
+        self,
+        memo_uuid: str,
+        items: List[Tuple[str, np.ndarray]],
+        passages: Optional[List[Chunk]] = None,
+    ) -> None:
+        """メモのチャンクを入れ替える（古いチャンクを削除してから追加）"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._io_executor, self._sync_remove_memos, [memo_uuid])
+        if items:
+            await self.add_chunks_batch(items, passages)
+        else:
+            await self._committed()
+        self._maybe_maintain()
+
+    async def remove_memos(self, memo_uuids: Iterable[str]) -> int:
+        """メモに属するチャンクをすべて削除する。削除したチャンク数を返す"""
+        loop = asyncio.get_running_loop()
+        removed = await loop.run_in_executor(self._io_executor, self._sync_remove_memos, list(memo_uuids))
+        if removed:
+            await self._committed()
+            self._maybe_maintain()
+        return removed
+
+    def _sync_add_new(self, items: List[Tuple[str, np.ndarray]]) -> Set[str]:
+        """未登録のチャンクだけを追加し、追加したチャンクIDを返す"""
+        with self._lock:
+            new = [(cid, vec) for cid, vec in items if cid not in self._chunk_to_id]
+            if new:
+                self._add(new)
+        return {cid for cid, _ in new}
+
+    def _sync_remove_memos(self, memo_uuids: List[str]) -> int:
+        with self._lock:
+            return self._remove_memos(memo_uuids)
+
+    def _ensure_writable(self) -> None:
+        """mmap ビューを変更する前にメモリへ実体化する（self._lock 内で呼ぶ。コピー中も検索は止めない）"""
+        if not self._mapped:
+            return
+        index = faiss_factory.to_memory(self.index)
+        faiss_ids.with_ids(index)
+        faiss_factory.configure(index, self.policy)
+        with self._index_lock.write():
+            self.index = index
+            self._mapped = False
+        logger.info("Loaded memory-mapped chunk index into memory for writing (%d vectors)", self.index.ntotal)
+
+    def _add(self, new: List[Tuple[str, np.ndarray]]) -> None:
+        self._ensure_writable()
         vecs = np.stack([vec for _, vec in new]).astype("float32")
-        self.index.add(vecs)
+        ids = np.arange(self._next_id, self._next_id + len(new), dtype="int64")
+        self._next_id += len(new)
+        self._wal.append_add(ids, [cid for cid, _ in new], vecs)
+        if self._vectors is not None:
+            self._vectors.put_many((cid, v) for (cid, _), v in zip(new, vecs))
+        with self._index_lock.write():
+            self.index.add_with_ids(vecs, ids)
+            for i, (cid, _) in zip(ids.tolist(), new):
+                self._register(i, cid)
+        self._dirty = True
+        self._id_map.add((i, cid) for i, (cid, _) in zip(ids.tolist(), new))
+
+    def _remove_memos(self, memo_uuids: Iterable[str]) -> int:
+        ids = [i for uuid in set(memo_uuids) for i in self._memo_chunks.get(uuid, [])]
+        if not ids:
+            return 0
+        self._wal.append_remove(ids)
+        self._ensure_writable()
+        with self._index_lock.write():
+            removed_chunks = self._unregister(ids)
+            _, supported = faiss_ids.remove(self.index, ids)
+            if not supported:
+                # 物理削除できないインデックスは墓標として検索結果から除外する
+                self._tombstones.update(ids)
+        self._id_map.remove(ids)
+        self._dirty = True
+        if self._vectors is not None:
+            self._vectors.remove_many(removed_chunks)
+        with self._passage_lock:
+            for cid in removed_chunks:
+                if self._passages.pop(cid, None) is not None:
+                    self._pending_passages.append((cid, None))
+        return len(ids)
+
+    # ── 墓標・インデックス種別の保守 ──
+
+    @property
+    def tombstone_ratio(self) -> float:
+        total = self.index.ntotal
+        return len(self._tombstones) / total if total else 0.0
+
+    def stats(self) -> dict:
+        plan = faiss_factory.describe(self.index)
+        return {
+            "index_type": plan.kind,
+            "nlist": plan.nlist,
+            "ntotal": self.index.ntotal,
+            "live": len(self._id_to_chunk),
+            "memos": len(self._memo_chunks),
+            "tombstones": len(self._tombstones),
+            "tombstone_ratio": self.tombstone_ratio,
+            "mmap": self._mapped,
+            "wal_bytes": self._wal.size,
+            "rerank": self._reranks(plan),
+            "maintaining": self._maintain_task is not None and not self._maintain_task.done(),
+        }
+
+    def _reranks(self, plan: faiss_factory.IndexPlan) -> bool:
+        return self._vectors is not None and plan.kind == IVFPQ
+
+    def _pending_migration(self) -> Optional[faiss_factory.IndexPlan]:
+        return self.policy.needs_migration(
+            faiss_factory.describe(self.index), len(self._id_to_chunk), self.dimension
+        )
 
-        # ID リストを伸張
-        self._chunk_ids.extend([cid for cid, _ in new])
+    def _vector_store_bloated(self) -> bool:
+        return self._vectors is not None and self._vectors.dead_rows > len(self._vectors) * self.compact_ratio
+
+    def _maybe_maintain(self) -> None:
+        if (
+            self.tombstone_ratio <= self.compact_ratio
+            and self._pending_migration() is None
+            and not self._vector_store_bloated()
+        ):
+            return
+        if self._maintain_task is not None and not self._maintain_task.done():
+            return
+        self._maintain_task = asyncio.get_running_loop().create_task(self.maintain())
 
-        # 非同期永続化
+    async def maintain(self) -> None:
+        """墓標の除去・インデックス種別の移行を行ってから永続化する"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._io_executor, self._sync_maintain)
         await self._persist()
 
-    async def add_chunks(self, items: List[Tuple[str, np.ndarray]]) -> None:
+    def _sync_maintain(self) -> None:
+        # 生きているベクトルだけをロック内で取り出し、学習・追加はロックの外で行う
+        if self._vector_store_bloated():
+            self._vectors.compact()
+        with self._lock:
+            plan = self._pending_migration()
+            if plan is None and not self._tombstones:
+                return
+            ids = np.fromiter(self._id_to_chunk, dtype="int64", count=len(self._id_to_chunk))
+            vecs = self._fetch_vectors(ids.tolist())
+            if plan is None:
+                # 同じ種別のまま墓標だけ落とす（IVF は学習済みの重心を引き継ぐ）
+                self._ensure_writable()
+                fresh = faiss.clone_index(self.index)
+                fresh.reset()
+            dropped = len(self._tombstones)
+
+        if plan is not None:
+            train = faiss_factory.training_rows(plan, self.policy, vecs)
+            fresh = faiss_factory.build(
+                plan, self.dimension, faiss.METRIC_INNER_PRODUCT, self.policy, train
+            )
+        if len(ids):
+            fresh.add_with_ids(vecs, ids)
+
+        with self._lock:
+            # 作り直している間の追加・削除を反映してから差し替える
+            tombstones = faiss_factory.catch_up(
+                fresh, self._fetch_vectors, ids, list(self._id_to_chunk)
+            )
+            with self._index_lock.write():
+                self.index = fresh
+                self._tombstones = tombstones
+                self._mapped = False
+            self._dirty = True
+        if plan is not None:
+            logger.info("Migrated chunk index to %s (%d vectors)", plan, len(ids))
+        else:
+            logger.info("Compacted chunk index: dropped %d tombstones", dropped)
+
+    async def add_chunks(
+        self,
+        items: List[Tuple[str, np.ndarray]],
+        passages: Optional[List[Chunk]] = None,
+    ) -> None:
         """単体追加もバッチ関数に委譲"""
-        await self.add_chunks_batch(items)
+        await self.add_chunks_batch(items, passages)
 
-    def _sync_search(self, query: np.ndarray, top_k: int) -> List[Tuple[str, float]]:
-        total = self.index.ntotal
-        if total == 0:
-            return []
-
-        k = min(top_k, total)
-        # IVF 時は nprobe を調整可能
-        if self.use_ivf and isinstance(self.index, faiss.IndexIVFFlat):
-            self.index.nprobe = min(10, self.nlist // 10)
-
-        D, I = self.index.search(query.reshape(1, -1).astype("float32"), k)
-        results: List[Tuple[str, float]] = []
-        for idx, score in zip(I[0], D[0]):
-            if idx < 0 or idx >= len(self._chunk_ids):
-                continue
-            results.append((self._chunk_ids[idx], float(score)))
+    def _sync_search(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        ef_search: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        return self._sync_search_batch(query.reshape(1, -1), top_k, ef_search)[0]
+
+    def _sync_search_batch(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        ef_search: Optional[int] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        q = np.ascontiguousarray(queries, dtype="float32").reshape(-1, self.dimension)
+        rows, _ = self._candidates(q, top_k, ef_search)
+        return [hits[:top_k] for hits in rows]
+
+    def _candidates(
+        self,
+        q: np.ndarray,
+        wanted: int,
+        ef_search: Optional[int] = None,
+        ids: Optional[np.ndarray] = None,
+    ) -> Tuple[List[List[Tuple[str, float]]], bool]:
+        """
+        上位 wanted 件ぶんの候補チャンクをスコア降順で返す（切り詰めはしない）
+        ids を渡すとその ID だけが対象。2 つ目の戻り値は対象の全件を見たかどうか
+        """
+        if ids is not None and ids.size <= self.filter_exact_max:
+            return self._exact_candidates(q, wanted, ids)
+        with self._index_lock.read():
+            total = self.index.ntotal if ids is None else int(ids.size)
+            if total == 0:
+                return [[] for _ in range(len(q))], True
+
+            # 圧縮索引は再ランク用に多めに、墓標が混ざる分もさらに多めに取る
+            # （絞り込み時の ids は生きている ID だけなので墓標は混ざらない）
+            rerank = self._reranks(faiss_factory.describe(self.index))
+            if rerank:
+                wanted *= self.rerank_factor
+            k = min(wanted + (len(self._tombstones) if ids is None else 0), total)
+            # nprobe / efSearch の既定値は構築・読み込み時に設定済み。HNSW はクエリ単位で上書き可
+            sel = faiss.IDSelectorBatch(ids) if ids is not None else None
+            params = faiss_factory.search_params(self.index, k, ef_search, sel)
+            D, I = self.index.search(q, k, params=params)
+            rows: List[List[Tuple[str, float]]] = []
+            for row_ids, row_scores in zip(I.tolist(), D.tolist()):
+                rows.append([
+                    (self._id_to_chunk[i], score)
+                    for i, score in zip(row_ids, row_scores)
+                    if i in self._id_to_chunk
+                ])
+        if rerank:
+            rows = [self._rerank(qv, hits) if hits else hits for qv, hits in zip(q, rows)]
+        return rows, k >= total
+
+    def _exact_candidates(
+        self,
+        q: np.ndarray,
+        wanted: int,
+        ids: np.ndarray,
+    ) -> Tuple[List[List[Tuple[str, float]]], bool]:
+        """絞り込んだ ID のベクトルだけを総当たりで採点する（対象が少なければ索引探索より安い）"""
+        with self._index_lock.read():
+            ids = np.asarray([i for i in ids.tolist() if i in self._id_to_chunk], dtype="int64")
+            if not ids.size:
+                return [[] for _ in range(len(q))], True
+            vecs = np.ascontiguousarray(self._fetch_vectors(ids.tolist()), dtype="float32")
+            cids = [self._id_to_chunk[i] for i in ids.tolist()]
+        k = min(wanted, len(cids))
+        D, I = faiss.knn(q, vecs, k, metric=faiss.METRIC_INNER_PRODUCT)
+        rows = [
+            [(cids[i], score) for i, score in zip(row_ids, row_scores) if i >= 0]
+            for row_ids, row_scores in zip(I.tolist(), D.tolist())
+        ]
+        return rows, k >= len(cids)
+
+    def _sync_search_memos_batch(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        ef_search: Optional[int] = None,
+        memo_uuids: Optional[List[str]] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        行ごとに異なるメモ top_k 件の [(最も近いチャンクID, スコア)] を返す
+        memo_uuids を渡すとそのメモのチャンクだけを対象にする
+        - 初回はメモあたりの平均チャンク数 × memo_oversample 倍を拾う
+        - 異なるメモが top_k 件に満たない行だけ、拾う件数を倍にして検索し直す
+        """
+        q = np.ascontiguousarray(queries, dtype="float32").reshape(-1, self.dimension)
+        with self._index_lock.read():
+            if memo_uuids is None:
+                ids = None
+                per_memo = len(self._id_to_chunk) / max(1, len(self._memo_chunks))
+            else:
+                groups = [self._memo_chunks[u] for u in memo_uuids if u in self._memo_chunks]
+                ids = np.fromiter((i for g in groups for i in g), dtype="int64")
+                per_memo = ids.size / max(1, len(groups))
+        if ids is not None and not ids.size:
+            return [[] for _ in range(len(q))]
+        wanted = max(top_k, int(np.ceil(top_k * max(1.0, per_memo) * self.memo_oversample)))
+
+        results: List[List[Tuple[str, float]]] = [[] for _ in range(len(q))]
+        pending = np.arange(len(q))
+        rounds = 0
+        while pending.size:
+            rounds += 1
+            rows, exhausted = self._candidates(q[pending], wanted, ef_search, ids)
+            short = []
+            for row, hits in zip(pending.tolist(), rows):
+                results[row] = _best_per_memo(hits, top_k)
+                if len(results[row]) < top_k and not exhausted:
+                    short.append(row)
+            pending = np.asarray(short, dtype="int64")
+            wanted *= 2
+        if rounds > 1:
+            logger.debug("Memo search widened %d times (top_k=%d)", rounds - 1, top_k)
         return results
 
-    async def search(self, query_vec: np.ndarray, top_k: int) -> List[Tuple[str, float]]:
-        """非同期ラッパー"""
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self._sync_search, query_vec, top_k)
+    def _rerank(self, query: np.ndarray, hits: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        """候補を原精度ベクトルとの内積で並べ直す（ストアに無い候補は近似スコアのまま）"""
+        exact = self._vectors.get_many(cid for cid, _ in hits)
+        if not exact:
+            return hits
+        cids = list(exact)
+        scores = np.stack([exact[c] for c in cids]) @ query
+        rescored = dict(zip(cids, scores.tolist()))
+        return sorted(
+            ((cid, rescored.get(cid, score)) for cid, score in hits),
+            key=lambda x: x[1],
+            reverse=True,
+        )
+
+    async def search(
+        self,
+        query_vec: np.ndarray,
+        top_k: int,
+        ef_search: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        同時に届いた検索とまとめて 1 回の行列検索で処理する（ef_search は HNSW のときだけ効く）
+        """
+        return await self._coalescer.submit(query_vec, top_k, ef_search)
+
+    async def search_batch(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        ef_search: Optional[int] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """クエリ行列 (n, dim) を 1 回で検索し、行ごとに [(チャンクID, スコア)] を返す"""
+        return await self._search_pool.run(self._sync_search_batch, queries, top_k, ef_search)
+
+    async def search_memos(
+        self,
+        query_vec: np.ndarray,
+        top_k: int,
+        ef_search: Optional[int] = None,
+        memo_uuids: Optional[Iterable[str]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        メモ単位の検索。1 メモが多数のチャンクを持っていても異なるメモを top_k 件返す
+        （各メモは最も近いチャンクの ID とスコアで代表させる。スコア降順）
+        memo_uuids を渡すとそのメモだけを探索する（絞り込み条件ごとに対象が違うのでまとめない）
+        """
+        if memo_uuids is not None:
+            rows = await self._search_pool.run(
+                self._sync_search_memos_batch, query_vec, top_k, ef_search, list(memo_uuids)
+            )
+            return rows[0]
+        return await self._memo_coalescer.submit(query_vec, top_k, ef_search)
+
+    async def search_memos_batch(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        ef_search: Optional[int] = None,
+        memo_uuids: Optional[Iterable[str]] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """search_memos の行列版（memo_uuids は全クエリ共通）"""
+        if memo_uuids is not None:
+            memo_uuids = list(memo_uuids)
+        return await self._search_pool.run(
+            self._sync_search_memos_batch, queries, top_k, ef_search, memo_uuids
+        )
+
+    def search_stats(self) -> dict:
+        stats = self._coalescer.stats()
+        stats["memo"] = self._memo_coalescer.stats()
+        if self._owns_search_pool:
+            stats["pool"] = self._search_pool.stats()
+        return stats
 
     async def filter_new(self, memos: List[Memo]) -> List[Memo]:
         """
         まだベクトル化されていないメモだけを返す
         """
-        existing = {cid.split("_", 1)[0] for cid in self._chunk_ids}
-        return [m for m in memos if m.uuid not in existing]
+        return [m for m in memos if m.uuid not in self._memo_chunks]
 
 FaissChunkRepository = AsyncFaissChunkRepository
@@ -0,0 +1,254 @@
+import argparse
+import logging
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from infrastructure.persistence import faiss_factory, faiss_ids
+from infrastructure.persistence.embedding_store import EmbeddingStore
+from infrastructure.persistence.faiss_factory import HNSW, IVFPQ, IndexPlan, IndexPolicy
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EvalRow:
+    """1 設定分の計測結果"""
+    label: str
+    recall: float
+    p50_ms: float
+    p95_ms: float
+    build_seconds: float = 0.0
+    bytes_per_vector: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def load_vectors(index_path: Path) -> np.ndarray:
+    """保存済みインデックスから全ベクトルを復元する（墓標も含む）"""
+    index = faiss_ids.migrate_sequential(faiss.read_index(str(index_path)))
+    ids = faiss_ids.stored_ids(index)
+    return faiss_ids.reconstruct(index, ids.tolist(), index.d)
+
+
+def split_queries(
+    vectors: np.ndarray,
+    n_queries: int,
+    seed: int = 1234,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    手元のベクトルからクエリを抜き出す → (索引側, クエリ側)
+    クエリは索引から除く（自分自身がヒットして再現率が水増しされないように）
+    """
+    n_queries = min(n_queries, len(vectors) // 2)
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(vectors), size=n_queries, replace=False)
+    mask = np.ones(len(vectors), dtype=bool)
+    mask[picked] = False
+    return np.ascontiguousarray(vectors[mask]), np.ascontiguousarray(vectors[picked])
+
+
+def exact_topk(base: np.ndarray, queries: np.ndarray, k: int, metric: int) -> np.ndarray:
+    flat = faiss.IndexFlatIP(base.shape[1]) if metric == faiss.METRIC_INNER_PRODUCT else faiss.IndexFlatL2(base.shape[1])
+    flat.add(base)
+    return flat.search(queries, k)[1]
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """各クエリの厳密 top-k のうち、近似検索で見つかった割合の平均"""
+    hits = sum(len(set(f.tolist()) & set(t.tolist())) for f, t in zip(found, truth))
+    return hits / truth.size if truth.size else 0.0
+
+
+def measure(
+    index: faiss.Index,
+    queries: np.ndarray,
+    k: int,
+    params=None,
+) -> Tuple[np.ndarray, float, float]:
+    """1 クエリずつ検索し → (結果 ID, p50 ms, p95 ms)"""
+    found = np.empty((len(queries), k), dtype="int64")
+    latencies = np.empty(len(queries))
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        found[i] = index.search(q.reshape(1, -1), k, params=params)[1][0]
+        latencies[i] = (time.perf_counter() - start) * 1000
+    return found, float(np.percentile(latencies, 50)), float(np.percentile(latencies, 95))
+
+
+def bytes_per_vector(index: faiss.Index) -> float:
+    """シリアライズ後のサイズ ÷ 件数（学習済みの重心・回転行列も含む）"""
+    return len(faiss.serialize_index(index)) / index.ntotal if index.ntotal else 0.0
+
+
+def _flat_row(base: np.ndarray, queries: np.ndarray, k: int, metric: int, truth: np.ndarray) -> EvalRow:
+    flat = faiss_factory.build(IndexPlan(faiss_factory.FLAT), base.shape[1], metric, IndexPolicy())
+    flat.add_with_ids(base, np.arange(len(base), dtype="int64"))
+    found, p50, p95 = measure(flat, queries, k)
+    return EvalRow("flat", recall_at_k(found, truth), p50, p95, 0.0, bytes_per_vector(flat))
+
+
+def hnsw_report(
+    base: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    m: int = 32,
+    ef_construction: int = 80,
+    ef_searches: Sequence[int] = (16, 32, 64, 128, 256),
+    metric: int = faiss.METRIC_INNER_PRODUCT,
+) -> List[EvalRow]:
+    """
+    厳密検索（Flat）を基準に、HNSW の efSearch ごとの再現率・レイテンシを測る
+    """
+    truth = exact_topk(base, queries, k, metric)
+    dim = base.shape[1]
+    ids = np.arange(len(base), dtype="int64")
+    rows = [_flat_row(base, queries, k, metric, truth)]
+
+    policy = IndexPolicy(hnsw_m=m, hnsw_ef_construction=ef_construction)
+    start = time.perf_counter()
+    hnsw = faiss_factory.build(IndexPlan(HNSW), dim, metric, policy)
+    hnsw.add_with_ids(base, ids)
+    build_seconds = time.perf_counter() - start
+    size = bytes_per_vector(hnsw)
+    for ef in ef_searches:
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = max(ef, k)
+        found, p50, p95 = measure(hnsw, queries, k, params)
+        rows.append(EvalRow(
+            f"hnsw M={m} efC={ef_construction} efS={params.efSearch}",
+            recall_at_k(found, truth), p50, p95, build_seconds, size,
+        ))
+    return rows
+
+
+def pq_report(
+    base: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    policy: Optional[IndexPolicy] = None,
+    rerank_factors: Sequence[int] = (1, 4, 8, 16),
+    metric: int = faiss.METRIC_INNER_PRODUCT,
+) -> List[EvalRow]:
+    """
+    厳密検索（Flat）を基準に、IVFPQ の再ランク倍率ごとの再現率・レイテンシ・1 件あたりのサイズを測る
+    再ランクは k × 倍率 件を拾い、原精度ベクトル（base）との内積で並べ直す。倍率 1 は再ランクなし。
+    """
+    policy = policy or IndexPolicy(kind=IVFPQ)
+    truth = exact_topk(base, queries, k, metric)
+    dim = base.shape[1]
+    rows = [_flat_row(base, queries, k, metric, truth)]
+
+    plan = policy.plan(len(base), dim)
+    if plan.kind != IVFPQ:
+        logger.warning("Not enough vectors to train IVFPQ (n=%d); skipped", len(base))
+        return rows
+    start = time.perf_counter()
+    index = faiss_factory.build(plan, dim, metric, policy, faiss_factory.training_rows(plan, policy, base))
+    index.add_with_ids(base, np.arange(len(base), dtype="int64"))
+    build_seconds = time.perf_counter() - start
+    size = bytes_per_vector(index)
+    nprobe = faiss.extract_index_ivf(index).nprobe
+    label = (
+        f"{'opq+' if policy.opq else ''}ivfpq nlist={plan.nlist} "
+        f"m={policy.pq_m_for(dim)}x{policy.pq_nbits} nprobe={nprobe}"
+    )
+
+    for factor in rerank_factors:
+        fetch = min(k * factor, len(base))
+        found = np.empty((len(queries), k), dtype="int64")
+        latencies = np.empty(len(queries))
+        for i, q in enumerate(queries):
+            t0 = time.perf_counter()
+            cand = index.search(q.reshape(1, -1), fetch)[1][0]
+            cand = cand[cand >= 0]
+            if factor > 1:
+                cand = cand[np.argsort(-(base[cand] @ q), kind="stable")]
+            found[i] = np.pad(cand[:k], (0, max(0, k - len(cand))), constant_values=-1)
+            latencies[i] = (time.perf_counter() - t0) * 1000
+        rows.append(EvalRow(
+            f"{label} rerank={factor}x",
+            recall_at_k(found, truth),
+            float(np.percentile(latencies, 50)),
+            float(np.percentile(latencies, 95)),
+            build_seconds,
+            size,
+        ))
+    return rows
+
+
+def print_report(rows: List[EvalRow], n_base: int, n_queries: int, k: int) -> None:
+    print(f"base={n_base} queries={n_queries} k={k}")
+    print(f"{'index':<56} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8} {'build s':>8} {'B/vec':>8}")
+    for r in rows:
+        print(
+            f"{r.label:<56} {r.recall:>9.4f} {r.p50_ms:>8.3f} {r.p95_ms:>8.3f} "
+            f"{r.build_seconds:>8.1f} {r.bytes_per_vector:>8.1f}"
+        )
+
+
+def _main(argv: Optional[List[str]] = None) -> None:
+    """
+    保存済みチャンクのベクトルで、近似索引と厳密検索の再現率・レイテンシ・サイズを比較する
+    例: python -m infrastructure.persistence.faiss_eval --index .index_data/chunk.index
+        python -m infrastructure.persistence.faiss_eval --mode pq --vectors .index_data/chunk_vectors
+    """
+    parser = argparse.ArgumentParser(description=_main.__doc__)
+    parser.add_argument("--mode", choices=("hnsw", "pq"), default="hnsw")
+    parser.add_argument("--index", help="chunk.index のパス")
+    parser.add_argument("--vectors", help="原精度ストア（chunk_vectors/）のパス。--index より優先")
+    parser.add_argument("--dim", type=int, default=768, help="--vectors の次元")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--m", type=int, default=32)
+    parser.add_argument("--ef-construction", type=int, default=80)
+    parser.add_argument("--ef-search", default="16,32,64,128,256")
+    parser.add_argument("--pq-m", type=int, default=96)
+    parser.add_argument("--pq-nbits", type=int, default=8)
+    parser.add_argument("--no-opq", action="store_true")
+    parser.add_argument("--nprobe", type=int, default=0)
+    parser.add_argument("--rerank", default="1,4,8,16")
+    args = parser.parse_args(argv)
+
+    if args.vectors:
+        vectors = np.asarray(EmbeddingStore(args.vectors, dim=args.dim).matrix()[1], dtype="float32")
+    elif args.index:
+        vectors = load_vectors(Path(args.index))
+    else:
+        parser.error("--index or --vectors is required")
+    base, queries = split_queries(vectors, args.queries)
+    if args.mode == "pq":
+        policy = IndexPolicy(
+            kind=IVFPQ,
+            pq_m=args.pq_m,
+            pq_nbits=args.pq_nbits,
+            opq=not args.no_opq,
+            nprobe=args.nprobe,
+        )
+        rows = pq_report(
+            base,
+            queries,
+            k=args.k,
+            policy=policy,
+            rerank_factors=[int(x) for x in args.rerank.split(",")],
+        )
+    else:
+        rows = hnsw_report(
+            base,
+            queries,
+            k=args.k,
+            m=args.m,
+            ef_construction=args.ef_construction,
+            ef_searches=[int(x) for x in args.ef_search.split(",")],
+        )
+    print_report(rows, len(base), len(queries), args.k)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    _main()
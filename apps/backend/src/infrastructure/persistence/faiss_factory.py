@@ -0,0 +1,301 @@
+import logging
+import math
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+import faiss
+import numpy as np
+
+from infrastructure.persistence import faiss_ids
+
+logger = logging.getLogger(__name__)
+
+AUTO = "auto"
+FLAT = "flat"
+IVF = "ivf"
+HNSW = "hnsw"
+IVFPQ = "ivfpq"
+KINDS = (AUTO, FLAT, IVF, HNSW, IVFPQ)
+
+# k-means が安定するセルあたりの最小学習点数（FAISS の推奨値）
+MIN_POINTS_PER_CENTROID = 39
+# 学習に使うセルあたりの最大点数（超える分はサンプリング）
+MAX_POINTS_PER_CENTROID = 256
+# コード配列（Flat / HNSW のベクトル、IVF の転置リスト）をファイルの mmap ビューとして開く
+MMAP_FLAGS = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+
+@dataclass(frozen=True)
+class IndexPlan:
+    kind: str
+    nlist: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass(frozen=True)
+class IndexPolicy:
+    """
+    ベクトル件数とメモリ予算からインデックス種別を選ぶ
+    - flat_max 件以下: Flat（全件走査・厳密）
+    - それ以上: HNSW が memory_budget_mb に収まれば HNSW、収まらなければ IVF
+    Flat ⇔ ANN の切り替えには幅を持たせ、境界付近で作り直しを繰り返さない。
+    kind を auto 以外にすると件数によらずその種別に固定する（IVF / IVFPQ は学習点が揃うまで Flat）。
+    IVFPQ（任意で OPQ 回転つき）は 1 ベクトルを pq_m バイト程度に圧縮する。
+    距離は近似になるため、呼び出し側で原精度ベクトルによる再ランクを行う前提。
+    """
+    kind: str = AUTO
+    flat_max: int = 20_000
+    memory_budget_mb: int = 1024
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 80
+    hnsw_ef_search: int = 64
+    nprobe: int = 0  # 0 で nlist から自動決定
+    pq_m: int = 96  # PQ のサブ量子化器数（次元を割り切れる値に切り下げる）
+    pq_nbits: int = 8  # サブ量子化器あたりのビット数
+    opq: bool = True  # PQ の前に OPQ 回転を学習する
+
+    def __post_init__(self):
+        if self.kind not in KINDS:
+            raise ValueError(f"unknown index kind: {self.kind} (expected one of {KINDS})")
+
+    def plan(self, n: int, dim: int) -> IndexPlan:
+        if self.kind == IVF:
+            return IndexPlan(IVF, nlist_for(n)) if n >= MIN_POINTS_PER_CENTROID else IndexPlan(FLAT)
+        if self.kind == IVFPQ:
+            # PQ のコードブック（2^nbits 個の重心）を学習できるだけの点が揃うまでは Flat
+            if n < MIN_POINTS_PER_CENTROID * (1 << self.pq_nbits):
+                return IndexPlan(FLAT)
+            return IndexPlan(IVFPQ, nlist_for(n))
+        if self.kind != AUTO:
+            return IndexPlan(self.kind)
+        if n <= self.flat_max:
+            return IndexPlan(FLAT)
+        if self.hnsw_bytes(n, dim) <= self.memory_budget_mb * 1024 * 1024:
+            return IndexPlan(HNSW)
+        return IndexPlan(IVF, nlist_for(n))
+
+    def hnsw_bytes(self, n: int, dim: int) -> int:
+        # ベクトル本体＋レベル 0 のリンク（2M 本 × int32）＋ ID マップ
+        return n * (4 * dim + 2 * self.hnsw_m * 4 + 8)
+
+    def needs_migration(self, current: IndexPlan, n: int, dim: int) -> Optional[IndexPlan]:
+        """現在のインデックスを作り直すべきなら新しいプランを返す"""
+        target = self.plan(n, dim)
+        # ANN → Flat に戻すのは flat_max の半分を下回ってから
+        if current.kind != FLAT and target.kind == FLAT and self.kind == AUTO and n > self.flat_max // 2:
+            return None
+        if current.kind != target.kind:
+            return target
+        # セル数が適正値から 2 倍以上ずれたら学習し直す
+        if current.kind in (IVF, IVFPQ) and not (target.nlist / 2 <= current.nlist <= target.nlist * 2):
+            return target
+        return None
+
+    def pq_m_for(self, dim: int) -> int:
+        """dim を割り切れる pq_m 以下の最大のサブ量子化器数"""
+        m = max(1, min(self.pq_m, dim))
+        while dim % m:
+            m -= 1
+        return m
+
+    def train_centroids(self, plan: IndexPlan) -> int:
+        """学習で求める重心数の最大値（サンプル数の目安）"""
+        if plan.kind == IVFPQ:
+            return max(plan.nlist, 1 << self.pq_nbits)
+        return plan.nlist
+
+    def nprobe_for(self, nlist: int) -> int:
+        if self.nprobe:
+            return min(self.nprobe, nlist)
+        return min(nlist, max(8, nlist // 16))
+
+
+def nlist_for(n: int) -> int:
+    """セル数の目安は 4√n。各セルに最低限の学習点が入るよう上限を掛ける"""
+    return max(1, min(int(4 * math.sqrt(n)), n // MIN_POINTS_PER_CENTROID))
+
+
+def describe(index: faiss.Index) -> IndexPlan:
+    ivf = faiss_ids._as_ivf(index)
+    if ivf is not None:
+        kind = IVFPQ if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else IVF
+        return IndexPlan(kind, ivf.nlist)
+    if isinstance(_inner(index), faiss.IndexHNSW):
+        return IndexPlan(HNSW)
+    return IndexPlan(FLAT)
+
+
+def build(
+    plan: IndexPlan,
+    dim: int,
+    metric: int,
+    policy: IndexPolicy,
+    train: Optional[np.ndarray] = None,
+) -> faiss.Index:
+    """
+    空の（ID 付き）インデックスを作る。IVF は train のベクトルで学習する
+    """
+    if plan.kind in (IVF, IVFPQ):
+        needed = policy.train_centroids(plan)
+        if train is None or len(train) < needed:
+            raise ValueError(
+                f"{plan.kind} needs at least {needed} training vectors, got "
+                f"{0 if train is None else len(train)}"
+            )
+    if plan.kind == IVF:
+        quantizer = faiss.IndexFlatIP(dim) if metric == faiss.METRIC_INNER_PRODUCT else faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, plan.nlist, metric)
+        index.train(np.ascontiguousarray(train, dtype="float32"))
+    elif plan.kind == IVFPQ:
+        m = policy.pq_m_for(dim)
+        spec = f"IVF{plan.nlist},PQ{m}x{policy.pq_nbits}"
+        if policy.opq:
+            spec = f"OPQ{m},{spec}"
+        index = faiss.index_factory(dim, spec, metric)
+        index.train(np.ascontiguousarray(train, dtype="float32"))
+    elif plan.kind == HNSW:
+        index = faiss.IndexHNSWFlat(dim, policy.hnsw_m, metric)
+        index.hnsw.efConstruction = policy.hnsw_ef_construction
+    else:
+        index = faiss.IndexFlatIP(dim) if metric == faiss.METRIC_INNER_PRODUCT else faiss.IndexFlatL2(dim)
+    index = faiss_ids.with_ids(index)
+    configure(index, policy)
+    logger.info("Built %s index (dim=%d, nlist=%d)", plan.kind, dim, plan.nlist)
+    return index
+
+
+def configure(index: faiss.Index, policy: IndexPolicy) -> None:
+    """検索時パラメータ（IVF の nprobe / HNSW の efSearch）を設定する"""
+    ivf = faiss_ids._as_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = policy.nprobe_for(ivf.nlist)
+        return
+    inner = _inner(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = policy.hnsw_ef_search
+
+
+def search_params(
+    index: faiss.Index,
+    k: int,
+    ef_search: Optional[int] = None,
+    sel: Optional[faiss.IDSelector] = None,
+):
+    """
+    クエリ単位の検索パラメータ。HNSW なら efSearch を k 以上に引き上げて渡す
+    （インデックス側の既定値は書き換えない）
+    sel を渡すとその ID だけを対象に探索する（nprobe / efSearch はインデックスの値を引き継ぐ）
+    """
+    ivf = faiss_ids._as_ivf(index)
+    if ivf is not None:
+        if sel is None:
+            return None
+        params = faiss.SearchParametersIVF()
+        params.nprobe = ivf.nprobe
+        params.sel = sel
+        return params
+    inner = _inner(index)
+    if not isinstance(inner, faiss.IndexHNSW):
+        if sel is None:
+            return None
+        params = faiss.SearchParameters()
+        params.sel = sel
+        return params
+    ef = max(ef_search or inner.hnsw.efSearch, k)
+    if ef == inner.hnsw.efSearch and sel is None:
+        return None
+    params = faiss.SearchParametersHNSW()
+    params.efSearch = ef
+    if sel is not None:
+        params.sel = sel
+    return params
+
+
+def training_rows(plan: IndexPlan, policy: IndexPolicy, matrix: np.ndarray) -> Optional[np.ndarray]:
+    """プランが学習を要するときだけ学習用サンプルを返す"""
+    if plan.kind not in (IVF, IVFPQ):
+        return None
+    return train_sample(matrix, policy.train_centroids(plan))
+
+
+def train_sample(
+    matrix: np.ndarray,
+    nlist: int,
+    seed: int = 1234,
+) -> np.ndarray:
+    """
+    学習用に行をサンプリングする（最大 nlist × MAX_POINTS_PER_CENTROID 行）
+    memmap から読む場合に備え、行番号は昇順で取り出す
+    """
+    n = len(matrix)
+    k = min(n, nlist * MAX_POINTS_PER_CENTROID)
+    if k == n:
+        return np.ascontiguousarray(matrix, dtype="float32")
+    rows = np.sort(np.random.default_rng(seed).choice(n, size=k, replace=False))
+    return np.ascontiguousarray(matrix[rows], dtype="float32")
+
+
+def catch_up(
+    fresh: faiss.Index,
+    fetch: Callable[[List[int]], np.ndarray],
+    snapshot_ids: np.ndarray,
+    live_ids: Iterable[int],
+) -> Set[int]:
+    """
+    スナップショットから作り直した fresh に、作り直し中の変更を反映する
+    fetch は ID 列に対応するベクトルを返す関数
+    → fresh に残る墓標 ID を返す（物理削除できないインデックスの場合）
+    """
+    snap = set(snapshot_ids.tolist())
+    live = list(live_ids)
+    added = [i for i in live if i not in snap]
+    if added:
+        fresh.add_with_ids(fetch(added), np.asarray(added, dtype="int64"))
+    gone = snap - set(live)
+    _, supported = faiss_ids.remove(fresh, gone)
+    return set() if supported else gone
+
+
+# ── 読み書き ──
+
+def read(path: Path, mmap: bool = True) -> Tuple[faiss.Index, bool]:
+    """
+    インデックスを開く → (index, mmap で開けたか)
+    mmap の場合はページキャッシュを共有し、起動時にファイル全体をコピーしない。
+    ビューは書き換えられない（FAISS が abort する）ため、変更前に to_memory() すること。
+    """
+    if mmap:
+        try:
+            return faiss.read_index(str(path), MMAP_FLAGS), True
+        except RuntimeError as e:
+            logger.warning("mmap read failed for %s, loading into memory: %s", path, e)
+    return faiss.read_index(str(path)), False
+
+
+def to_memory(index: faiss.Index) -> faiss.Index:
+    """
+    mmap ビューを自前のメモリにコピーする
+    （clone_index はビューのまま複製するため、シリアライズを経由して実体化する）
+    """
+    return faiss.deserialize_index(faiss.serialize_index(index))
+
+
+def write(index: faiss.Index, path: Path) -> None:
+    """
+    一時ファイルに書いてから置き換える
+    同じファイルを mmap している読み手（他のワーカー）は旧ファイルを見続けるので壊れない
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    faiss.write_index(index, str(tmp))
+    os.replace(tmp, path)
+
+
+def _inner(index: faiss.Index) -> faiss.Index:
+    index = faiss.downcast_index(index)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+import uuid as uuid_lib
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 1 レコード 32 バイト固定長
+#   id      : FAISS の int64 ID
+#   key     : UUID の 16 バイト（fmt=KEY_EXTRA のときは先頭 8 バイトが .keys の行番号）
+#   ordinal : チャンク序数（"{uuid}_{n}" の n。メモ単位のマップでは -1）
+#   op      : OP_ADD / OP_REMOVE
+#   fmt     : キーの表記（KEY_HEX / KEY_DASHED / KEY_EXTRA）
+RECORD = np.dtype({
+    "names": ["id", "key", "ordinal", "op", "fmt"],
+    "formats": ["<i8", ("u1", 16), "<i4", "u1", "u1"],
+    "offsets": [0, 8, 24, 28, 29],
+    "itemsize": 32,
+})
+
+OP_REMOVE = 0
+OP_ADD = 1
+
+KEY_HEX = 0      # uuid4().hex（32 桁の小文字 16 進）
+KEY_DASHED = 1   # ハイフン区切りの UUID 文字列
+KEY_EXTRA = 2    # UUID 形式でない文字列（.keys に追記）
+
+
+class IdMapFile:
+    """
+    FAISS の int64 ID ⇔ キー文字列（メモ UUID / チャンクID）の追記型バイナリマップ
+    - <name>.idmap に 32 バイト固定長レコードを追記する（通常は全体を書き直さない）
+    - "{uuid}_{n}" 形式のチャンクIDは UUID 16 バイト＋int32 序数に分けて格納
+    - UUID 形式でないキーは <name>.keys に 1 行ずつ追記し、行番号だけをレコードに持つ
+    - 起動時は np.memmap で開いて一括処理し、各 ID の最後のレコードで生死を判定
+    - 削除記録が生存件数を上回ったら compact で詰め直す（tmp→rename）
+    """
+
+    def __init__(self, path: Union[str, Path], compact_min_records: int = 1024):
+        self.path = Path(path)
+        self.keys_path = self.path.with_suffix(".keys")
+        self.compact_min_records = compact_min_records
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[int, str, int]] = []  # (id, key, op)
+        self._extra_keys: List[str] = []
+        self._extra_index: Dict[str, int] = {}
+        self._records = 0
+        self._rewrite = False
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    # ── 読み込み ──
+
+    def load(self) -> Dict[int, str]:
+        """生存している ID → キー文字列"""
+        self._load_extra_keys()
+        if not self.path.exists():
+            return {}
+        size = self.path.stat().st_size
+        # 書き込み途中で落ちた半端なレコードは切り捨てる
+        if size % RECORD.itemsize:
+            with open(self.path, "r+b") as f:
+                f.truncate(size - size % RECORD.itemsize)
+        self._records = size // RECORD.itemsize
+        if not self._records:
+            return {}
+        recs = np.memmap(self.path, dtype=RECORD, mode="r", shape=(self._records,))
+
+        # 各 ID の最後のレコードが追加なら生存
+        ids = recs["id"]
+        _, first_from_end = np.unique(ids[::-1], return_index=True)
+        last = len(recs) - 1 - first_from_end
+        live = np.sort(last[recs["op"][last] == OP_ADD])
+        return dict(zip(ids[live].tolist(), self._decode(np.asarray(recs[live]))))
+
+    def _load_extra_keys(self) -> None:
+        self._extra_keys = []
+        if self.keys_path.exists():
+            self._extra_keys = self.keys_path.read_text(encoding="utf-8").split("\n")[:-1]
+        self._extra_index = {k: i for i, k in enumerate(self._extra_keys)}
+
+    def _decode(self, recs: np.ndarray) -> List[str]:
+        hexes = recs["key"].tobytes().hex()
+        keys = []
+        for i, (ordinal, fmt) in enumerate(zip(recs["ordinal"].tolist(), recs["fmt"].tolist())):
+            h = hexes[i * 32:(i + 1) * 32]
+            if fmt == KEY_HEX:
+                base = h
+            elif fmt == KEY_DASHED:
+                base = str(uuid_lib.UUID(hex=h))
+            else:
+                base = self._extra_keys[int.from_bytes(bytes.fromhex(h[:16]), "little")]
+            keys.append(base if ordinal < 0 else f"{base}_{ordinal}")
+        return keys
+
+    # ── 書き込み ──
+
+    def add(self, items: Iterable[Tuple[int, str]]) -> None:
+        with self._lock:
+            self._pending.extend((int(i), key, OP_ADD) for i, key in items)
+
+    def remove(self, ids: Iterable[int]) -> None:
+        with self._lock:
+            self._pending.extend((int(i), "", OP_REMOVE) for i in ids)
+
+    def reset(self) -> None:
+        """次の flush でマップ全体を書き直す（全件再構築時）"""
+        with self._lock:
+            self._pending.clear()
+            self._rewrite = True
+
+    def flush(self, live: Dict[int, str]) -> None:
+        """
+        保留中のレコードを追記する。全件書き直しが必要な場合や
+        削除記録が溜まった場合は live から作り直す
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            dead = self._records + len(pending) - len(live)
+            if self._rewrite or (
+                self._records + len(pending) >= self.compact_min_records and dead > len(live)
+            ):
+                self._write_all(live)
+                self._rewrite = False
+                return
+            # 空でもファイルは作る（保存済みかどうかの判定に使う）
+            if pending or not self.path.exists():
+                self._append(pending)
+
+    def _write_all(self, live: Dict[int, str]) -> None:
+        self._extra_keys, self._extra_index = [], {}
+        recs, _ = self._encode([(i, key, OP_ADD) for i, key in live.items()])
+        tmp_keys = self.keys_path.with_name(self.keys_path.name + ".tmp")
+        tmp_keys.write_text("".join(k + "\n" for k in self._extra_keys), encoding="utf-8")
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        recs.tofile(tmp)
+        os.replace(tmp_keys, self.keys_path)
+        os.replace(tmp, self.path)
+        self._records = len(recs)
+        logger.debug("Rewrote ID map %s (%d records)", self.path, len(recs))
+
+    def _append(self, entries: List[Tuple[int, str, int]]) -> None:
+        recs, new_extra = self._encode(entries)
+        # 行番号を参照するレコードより先に .keys へ書く
+        if new_extra:
+            with open(self.keys_path, "a", encoding="utf-8") as f:
+                f.write("".join(k + "\n" for k in new_extra))
+        with open(self.path, "ab") as f:
+            f.write(recs.tobytes())
+        self._records += len(recs)
+
+    def _encode(self, entries: List[Tuple[int, str, int]]) -> Tuple[np.ndarray, List[str]]:
+        """→ (レコード列, 新しく .keys に載せるキー)"""
+        raws: List[bytes] = []
+        ordinals: List[int] = []
+        fmts: List[int] = []
+        new_extra: List[str] = []
+        for _, key, op in entries:
+            if op == OP_REMOVE:
+                raws.append(bytes(16))
+                ordinals.append(-1)
+                fmts.append(KEY_HEX)
+                continue
+            base, ordinal = _split_ordinal(key)
+            raw, fmt = _encode_uuid(base)
+            if raw is None:
+                if base not in self._extra_index:
+                    self._extra_index[base] = len(self._extra_keys)
+                    self._extra_keys.append(base)
+                    new_extra.append(base)
+                raw = self._extra_index[base].to_bytes(8, "little") + bytes(8)
+            raws.append(raw)
+            ordinals.append(ordinal)
+            fmts.append(fmt)
+
+        recs = np.zeros(len(entries), dtype=RECORD)
+        recs["id"] = [i for i, _, _ in entries]
+        recs["op"] = [op for _, _, op in entries]
+        recs["key"] = np.frombuffer(b"".join(raws), dtype="u1").reshape(-1, 16)
+        recs["ordinal"] = ordinals
+        recs["fmt"] = fmts
+        return recs, new_extra
+
+
+def _split_ordinal(key: str) -> Tuple[str, int]:
+    """"{uuid}_{n}" → (uuid, n)。序数を持たないキーは (key, -1)"""
+    base, sep, tail = key.rpartition("_")
+    if sep and tail.isdigit() and str(int(tail)) == tail and int(tail) < 2 ** 31:
+        return base, int(tail)
+    return key, -1
+
+
+def _encode_uuid(key: str) -> Tuple[Union[bytes, None], int]:
+    """UUID として 16 バイトに詰められればそのバイト列と表記を返す"""
+    if len(key) == 32:
+        try:
+            raw = bytes.fromhex(key)
+        except ValueError:
+            return None, KEY_EXTRA
+        return (raw, KEY_HEX) if raw.hex() == key else (None, KEY_EXTRA)
+    if len(key) == 36:
+        try:
+            parsed = uuid_lib.UUID(key)
+        except ValueError:
+            return None, KEY_EXTRA
+        return (parsed.bytes, KEY_DASHED) if str(parsed) == key else (None, KEY_EXTRA)
+    return None, KEY_EXTRA
@@ -0,0 +1,96 @@
+import logging
+from typing import Iterable, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def with_ids(index: faiss.Index) -> faiss.Index:
+    """
+    int64 の外部 ID で add / remove できる形にする
+    - IVF はネイティブに ID を持てるので、reconstruct / remove 用にハッシュの direct map を張る
+    - それ以外（Flat / HNSW など）は IndexIDMap2 で包む
+    ※ 包む側は渡されたオブジェクトをそのまま参照する（downcast した別の Python
+      プロキシを渡すと、元オブジェクトの解放で C++ 側のインデックスが消えるため）
+    """
+    if _is_id_map(index):
+        return index
+    ivf = _as_ivf(index)
+    if ivf is not None:
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index
+    return faiss.IndexIDMap2(index)
+
+
+def is_sequential(index: faiss.Index) -> bool:
+    """旧形式（ID なし・追加順の連番）で、移行に書き換えが必要か"""
+    return not _is_id_map(index) and _as_ivf(index) is None
+
+
+def migrate_sequential(index: faiss.Index) -> faiss.Index:
+    """
+    旧形式（ID なし・追加順の連番）で保存されたインデックスを、連番 ID のまま ID 付きに移行する
+    """
+    if not is_sequential(index):
+        return with_ids(index)
+    n = index.ntotal
+    vecs = index.reconstruct_n(0, n) if n else None
+    index.reset()
+    migrated = faiss.IndexIDMap2(index)
+    if n:
+        migrated.add_with_ids(vecs, np.arange(n, dtype="int64"))
+        logger.info("Migrated %d vectors to an ID-mapped index", n)
+    return migrated
+
+
+def stored_ids(index: faiss.Index) -> np.ndarray:
+    """インデックスが物理的に保持している ID（墓標を含む）"""
+    if _is_id_map(index):
+        return faiss.vector_to_array(faiss.downcast_index(index).id_map).astype("int64")
+    ivf = _as_ivf(index)
+    if ivf is not None:
+        invlists = ivf.invlists
+        parts = []
+        for lst in range(ivf.nlist):
+            size = invlists.list_size(lst)
+            if size:
+                ids = faiss.rev_swig_ptr(invlists.get_ids(lst), size)
+                parts.append(np.array(ids, dtype="int64"))
+        return np.concatenate(parts) if parts else np.empty(0, dtype="int64")
+    return np.arange(index.ntotal, dtype="int64")
+
+
+def remove(index: faiss.Index, ids: Iterable[int]) -> Tuple[int, bool]:
+    """
+    ID を物理削除する → (削除件数, 対応していたか)
+    HNSW など remove_ids 非対応のインデックスでは (0, False) を返し、呼び出し側で墓標扱いにする
+    """
+    arr = np.asarray(list(ids), dtype="int64")
+    if arr.size == 0:
+        return 0, True
+    try:
+        # IVF のハッシュ direct map は IDSelectorArray のみ受け付ける
+        return int(index.remove_ids(faiss.IDSelectorArray(arr))), True
+    except RuntimeError:
+        return 0, False
+
+
+def reconstruct(index: faiss.Index, ids: Iterable[int], dim: int) -> np.ndarray:
+    """ID 指定でベクトルを復元する（コンパクション・絞り込み検索用）"""
+    ids = np.fromiter(ids, dtype="int64")
+    if not ids.size:
+        return np.empty((0, dim), dtype="float32")
+    return np.asarray(index.reconstruct_batch(ids), dtype="float32").reshape(-1, dim)
+
+
+def _is_id_map(index: faiss.Index) -> bool:
+    return isinstance(faiss.downcast_index(index), (faiss.IndexIDMap, faiss.IndexIDMap2))
+
+
+def _as_ivf(index: faiss.Index):
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
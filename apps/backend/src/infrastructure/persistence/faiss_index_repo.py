@@ -1,13 +1,21 @@
 import json
 import logging
 import asyncio
+import threading
 from pathlib import Path
-from typing import Dict, List, Tuple, Union
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 from concurrent.futures import ThreadPoolExecutor
 
 import faiss
 import numpy as np
 from domain.memo import Memo
+from infrastructure.persistence import faiss_factory, faiss_ids
+from infrastructure.persistence.faiss_factory import IndexPolicy
+from infrastructure.persistence.faiss_idmap import IdMapFile
+from infrastructure.persistence.faiss_wal import OP_ADD, SnapshotScheduler, WriteAheadLog
+from infrastructure.services.search_coalescer import SearchCoalescer
+from infrastructure.services.search_pool import SearchPool
+from infrastructure.utils.rw_lock import ReadWriteLock
 from interfaces.repositories.index_repo import IndexRepository
 
 logger = logging.getLogger(__name__)
@@ -15,7 +23,15 @@ logger = logging.getLogger(__name__)
 
 class AsyncFaissIndexRepository(IndexRepository):
     """
-    非同期 I/O＋バックグラウンド永続化＋IVF Flatインデックス対応のFAISSリポジトリ
+    非同期 I/O＋バックグラウンド永続化対応のFAISSリポジトリ
+    - メモごとに安定した int64 ID を振り、更新・削除はその ID で置換／削除する
+    - 物理削除できないインデックスでは墓標として残し、比率が閾値を超えたらコンパクション
+    - 件数に応じて Flat / HNSW / IVF を選び、閾値をまたいだらバックグラウンドで作り直す
+    - 保存済みインデックスは mmap で開き、最初の変更時にだけメモリへ読み込む
+    - 同時に届いた検索はまとめて 1 回の行列検索で処理する（search_batch で直接渡すことも可）
+    - 変更は WAL に追記するだけにし、インデックス全体の書き出しは間引いたスナップショットで行う
+      （起動時にスナップショット以降の WAL を再適用する）
+    - search に memo_uuids を渡すとそのメモだけを探索する（少数なら総当たり、多ければ IDSelector）
     """
 
     def __init__(
@@ -23,122 +39,464 @@ class AsyncFaissIndexRepository(IndexRepository):
         index_dir: Union[str, Path],
         memo_repo,
         dim: int = 768,
-        nlist: int = 100,              # IVF セル数
+        policy: Optional[IndexPolicy] = None,  # インデックス種別の選択方針
         use_gpu: bool = False,         # GPU有効化フラグ
         persist_workers: int = 2,      # 永続化スレッド数
+        compact_ratio: float = 0.2,    # 墓標比率がこれを超えたらコンパクション
+        mmap: bool = True,             # 保存済みインデックスを mmap で開く
+        snapshot_delay: float = 2.0,   # 変更が途切れてからスナップショットを取るまでの秒数
+        snapshot_wal_bytes: int = 64 * 1024 * 1024,  # WAL がこれを超えたら即スナップショット
+        wal_fsync: bool = True,        # WAL への追記ごとに fsync する
+        search_batch_size: int = 64,   # 同時検索をまとめる最大件数
+        search_batch_wait_ms: float = 0.0,  # まとめるために最初の要求から待つ時間
+        search_pool: Optional[SearchPool] = None,  # 検索専用プール（未指定なら専用に 1 つ作る）
+        filter_exact_max: int = 4096,  # 絞り込み後の件数がこれ以下なら索引を使わず総当たりで採点
     ):
         self.index_dir = Path(index_dir)
         self.index_dir.mkdir(parents=True, exist_ok=True)
         self.index_path = self.index_dir / "faiss.index"
-        self.map_path = self.index_dir / "id_to_uuid.json"
+        # ID → UUID は追記型のバイナリマップ（旧形式の JSON は初回読み込み時に移行）
+        self.id_map = IdMapFile(self.index_dir / "faiss.idmap")
+        self.legacy_map_path = self.index_dir / "id_to_uuid.json"
         self.dim = dim
         self.memo_repo = memo_repo
+        self.policy = policy or IndexPolicy()
+        self.compact_ratio = compact_ratio
+        self.filter_exact_max = filter_exact_max
 
         # ThreadPoolExecutor for disk I/O
         self._io_executor = ThreadPoolExecutor(max_workers=persist_workers)
+        # 変更・書き出し・保守を直列化する（検索はこのロックを取らない）
+        self._lock = threading.RLock()
+        # インデックスと ID マップの参照・書き換え。検索は読み取り側で並行に走り、
+        # 書き換えはメモリ上の反映だけを短く排他にする（WAL の fsync やスナップショットは含めない）
+        self._index_lock = ReadWriteLock()
+        self._maintain_task: Optional[asyncio.Task] = None
+        # 検索は永続化スレッドとも既定の executor とも別の専用プールで実行する
+        self._owns_search_pool = search_pool is None
+        self._search_pool = search_pool or SearchPool()
+        # 同時に届いた search() を 1 回の行列検索にまとめる
+        self._coalescer = SearchCoalescer(
+            lambda q, k, _ef: self._sync_search_batch(q, k),
+            search_batch_size,
+            search_batch_wait_ms,
+            self._search_pool,
+        )
+        # 最後のスナップショット以降の変更ログ
+        self._wal = WriteAheadLog(self.index_dir / "faiss.wal", fsync=wal_fsync)
+        self._snapshots = SnapshotScheduler(
+            self._io_executor, self._sync_persist, self._wal, snapshot_delay, snapshot_wal_bytes
+        )
 
         # --- インデックスの読み込み／新規作成 ---
-        if self.index_path.exists() and self.map_path.exists():
-            self.index: faiss.Index = faiss.read_index(str(self.index_path))
+        # True の間は self.index がファイルの読み取り専用ビュー
+        self._mapped = False
+        # スナップショットに未反映の変更があるか
+        self._dirty = False
+        if self.index_path.exists() and (self.id_map.exists() or self.legacy_map_path.exists()):
+            index, self._mapped = faiss_factory.read(self.index_path, mmap)
+            if self._mapped and faiss_ids.is_sequential(index):
+                index, self._mapped = faiss_factory.to_memory(index), False
+            # 旧形式（追加順の連番）はそのまま連番 ID として引き継ぐ
+            self.index: faiss.Index = faiss_ids.migrate_sequential(index)
+            faiss_factory.configure(self.index, self.policy)
             self.id_to_uuid = self._load_id_map()
             logger.debug("Loaded FAISS index (%d entries)", self.index.ntotal)
         else:
-            # IVF Flat Index: 検索速度向上（nlistはデータ量に応じて調整）
-            quantizer = faiss.IndexFlatL2(self.dim)
-            ivf_index = faiss.IndexIVFFlat(quantizer, self.dim, nlist, faiss.METRIC_L2)
-            ivf_index.train(np.zeros((1, self.dim), dtype="float32"))  # 空でも train 必須
-            self.index = ivf_index
+            # 空のうちは Flat。件数が増えたら _maybe_maintain で HNSW / IVF に移行する
+            self.index = faiss_factory.build(
+                self.policy.plan(0, self.dim), self.dim, faiss.METRIC_L2, self.policy
+            )
             self.id_to_uuid: Dict[int, str] = {}
-            logger.debug("Created new IVF Flat index (dim=%d, nlist=%d)", self.dim, nlist)
+        self._replay_wal()
+
+        self.uuid_to_id: Dict[str, int] = {u: i for i, u in self.id_to_uuid.items()}
+        self._next_id = max(self.id_to_uuid, default=-1) + 1
+        # インデックス内に残っているが、どのメモにも対応しない ID（墓標）
+        stored = faiss_ids.stored_ids(self.index)
+        self._tombstones: Set[int] = set(stored.tolist()) - set(self.id_to_uuid)
+        if stored.size:
+            self._next_id = max(self._next_id, int(stored.max()) + 1)
 
-        if self.index.ntotal != len(self.id_to_uuid):
+        if self.index.ntotal - len(self._tombstones) != len(self.id_to_uuid):
             logger.warning(
                 "Index-map mismatch: ntotal=%d, mapped=%d",
                 self.index.ntotal,
                 len(self.id_to_uuid),
             )
 
+    def close(self) -> None:
+        """永続化用スレッドプールを停止し、未反映の変更をスナップショットに書き出す"""
+        self._snapshots.cancel()
+        self._io_executor.shutdown(wait=True)
+        if self._owns_search_pool:
+            self._search_pool.shutdown()
+        if self._dirty:
+            self._sync_persist()
+
+    async def aclose(self) -> None:
+        """検索コアレッサを止めてから close する"""
+        await self._coalescer.close()
+        self.close()
+
+    def _replay_wal(self) -> None:
+        """前回のスナップショット以降の変更を WAL から適用する（何度適用しても同じ結果になる）"""
+        stored = set(faiss_ids.stored_ids(self.index).tolist())
+        replayed = 0
+        for op, ids, keys, vecs in self._wal.replay():
+            self._ensure_writable()
+            if op == OP_ADD:
+                # スナップショットに書き出し済みの ID は追加し直さない
+                fresh = np.array([i not in stored for i in ids.tolist()])
+                if fresh.any():
+                    self.index.add_with_ids(np.ascontiguousarray(vecs[fresh]), ids[fresh])
+                    stored.update(ids[fresh].tolist())
+                self.id_to_uuid.update(zip(ids.tolist(), keys))
+                self.id_map.add(zip(ids.tolist(), keys))
+            else:
+                for i in ids.tolist():
+                    self.id_to_uuid.pop(i, None)
+                self.id_map.remove(ids.tolist())
+                _, supported = faiss_ids.remove(self.index, ids.tolist())
+                if supported:
+                    stored.difference_update(ids.tolist())
+            replayed += len(ids)
+        if replayed:
+            self._dirty = True
+            logger.info("Replayed %d WAL records into FAISS index", replayed)
+
     def _load_id_map(self) -> Dict[int, str]:
-        data = json.loads(self.map_path.read_text(encoding="utf-8"))
-        return {int(k): v for k, v in data.items()}
-
-    def _save_id_map(self) -> None:
-        payload = {str(k): v for k, v in self.id_to_uuid.items()}
-        self.map_path.write_text(
-            json.dumps(payload, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        if self.id_map.exists():
+            return self.id_map.load()
+        # 旧形式の id_to_uuid.json を一度だけバイナリに書き直す
+        data = json.loads(self.legacy_map_path.read_text(encoding="utf-8"))
+        id_to_uuid = {int(k): v for k, v in data.items()}
+        self.id_map.reset()
+        self.id_map.flush(id_to_uuid)
+        self.legacy_map_path.unlink()
+        logger.info("Migrated id_to_uuid.json to %s (%d entries)", self.id_map.path.name, len(id_to_uuid))
+        return id_to_uuid
 
     async def _persist(self) -> None:
-        """バックグラウンドでディスクに書き出す"""
+        """すぐにスナップショットを取る（バックグラウンドスレッドで実行）"""
         loop = asyncio.get_running_loop()
         await loop.run_in_executor(self._io_executor, self._sync_persist)
 
     def _sync_persist(self) -> None:
-        faiss.write_index(self.index, str(self.index_path))
-        self._save_id_map()
+        """
+        スナップショット: インデックス → ID マップ → WAL を空に、の順で書く
+        途中で落ちても WAL が残るので、起動時の再適用で追いつける
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            faiss_factory.write(self.index, self.index_path)
+            self.id_map.flush(self.id_to_uuid)
+            self._wal.reset()
+            self._dirty = False
         logger.debug("Persisted FAISS index & ID map")
 
     async def incremental_update(self, memos: List[Memo]) -> None:
         """
         未登録メモのみを追加登録し、非同期で永続化
         """
-        # まだ未登録のもの
-        new = [m for m in memos if m.uuid not in self.id_to_uuid.values()]
-        if not new:
+        # WAL の fsync・mmap の実体化があるので、ロックを取るのも含めてバックグラウンドで行う
+        loop = asyncio.get_running_loop()
+        added = await loop.run_in_executor(self._io_executor, self._sync_add_new, memos)
+        if not added:
             logger.debug("No new memos to index")
             return
 
+        # WAL には記録済み。インデックス全体の書き出しはまとめて後で
+        self._snapshots.touch()
+        self._maybe_maintain()
+
+    async def upsert(self, memos: List[Memo]) -> None:
+        """
+        メモのベクトルを登録または置換する（既存分は古い ID を削除してから追加）
+        """
+        memos = [m for m in memos if m.embedding is not None]
+        if not memos:
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._io_executor, self._sync_upsert, memos)
+        self._snapshots.touch()
+        self._maybe_maintain()
+
+    async def remove(self, uuids: Iterable[str]) -> int:
+        """
+        メモのベクトルを削除する。削除したメモ数を返す
+        """
+        loop = asyncio.get_running_loop()
+        removed = await loop.run_in_executor(self._io_executor, self._sync_remove, list(uuids))
+        if removed:
+            self._snapshots.touch()
+            self._maybe_maintain()
+        return removed
+
+    def _sync_add_new(self, memos: List[Memo]) -> int:
+        """未登録のメモだけを追加し、追加した件数を返す"""
+        with self._lock:
+            new = [m for m in memos if m.uuid not in self.uuid_to_id]
+            if new:
+                self._add(new)
+        return len(new)
+
+    def _sync_upsert(self, memos: List[Memo]) -> None:
+        with self._lock:
+            self._remove_uuids(m.uuid for m in memos)
+            self._add(memos)
+
+    def _sync_remove(self, uuids: List[str]) -> int:
+        with self._lock:
+            return self._remove_uuids(uuids)
+
+    def _ensure_writable(self) -> None:
+        """mmap ビューを変更する前にメモリへ実体化する（self._lock 内で呼ぶ。コピー中も検索は止めない）"""
+        if not self._mapped:
+            return
+        index = faiss_factory.to_memory(self.index)
+        faiss_ids.with_ids(index)
+        faiss_factory.configure(index, self.policy)
+        with self._index_lock.write():
+            self.index = index
+            self._mapped = False
+        logger.info("Loaded memory-mapped FAISS index into memory for writing (%d vectors)", self.index.ntotal)
+
+    def _add(self, memos: List[Memo]) -> None:
+        self._ensure_writable()
         # ベクトルをまとめて用意
-        vecs = np.stack([m.embedding for m in new]).astype("float32")
+        vecs = np.stack([m.embedding for m in memos]).astype("float32")
+        ids = np.arange(self._next_id, self._next_id + len(memos), dtype="int64")
+        self._next_id += len(memos)
+
+        self._wal.append_add(ids, [m.uuid for m in memos], vecs)
+        with self._index_lock.write():
+            self.index.add_with_ids(vecs, ids)
+            for i, m in zip(ids.tolist(), memos):
+                self.id_to_uuid[i] = m.uuid
+                self.uuid_to_id[m.uuid] = i
+        self._dirty = True
+        self.id_map.add((i, m.uuid) for i, m in zip(ids.tolist(), memos))
 
-        # IndexIVF は add の前に train が必要だが、Flat や既存であればそのまま
-        self.index.add(vecs)
+    def _remove_uuids(self, uuids: Iterable[str]) -> int:
+        gone = [u for u in set(uuids) if u in self.uuid_to_id]
+        if not gone:
+            return 0
+        ids = [self.uuid_to_id[u] for u in gone]
+        self._wal.append_remove(ids)
+        self._ensure_writable()
+        with self._index_lock.write():
+            for u, i in zip(gone, ids):
+                del self.uuid_to_id[u]
+                del self.id_to_uuid[i]
+            _, supported = faiss_ids.remove(self.index, ids)
+            if not supported:
+                # 物理削除できないインデックスは墓標として検索結果から除外する
+                self._tombstones.update(ids)
+        self.id_map.remove(ids)
+        self._dirty = True
+        return len(ids)
 
-        base = self.index.ntotal - len(new)
-        for i, m in enumerate(new):
-            self.id_to_uuid[base + i] = m.uuid
+    # ── 墓標・インデックス種別の保守 ──
 
-        # ディスクへの書き出しを非同期で
+    @property
+    def tombstone_ratio(self) -> float:
+        total = self.index.ntotal
+        return len(self._tombstones) / total if total else 0.0
+
+    def stats(self) -> dict:
+        plan = faiss_factory.describe(self.index)
+        return {
+            "index_type": plan.kind,
+            "nlist": plan.nlist,
+            "ntotal": self.index.ntotal,
+            "live": len(self.id_to_uuid),
+            "tombstones": len(self._tombstones),
+            "tombstone_ratio": self.tombstone_ratio,
+            "mmap": self._mapped,
+            "wal_bytes": self._wal.size,
+            "maintaining": self._maintain_task is not None and not self._maintain_task.done(),
+        }
+
+    def _pending_migration(self) -> Optional[faiss_factory.IndexPlan]:
+        return self.policy.needs_migration(
+            faiss_factory.describe(self.index), len(self.id_to_uuid), self.dim
+        )
+
+    def _maybe_maintain(self) -> None:
+        if self.tombstone_ratio <= self.compact_ratio and self._pending_migration() is None:
+            return
+        if self._maintain_task is not None and not self._maintain_task.done():
+            return
+        self._maintain_task = asyncio.get_running_loop().create_task(self.maintain())
+
+    async def maintain(self) -> None:
+        """墓標の除去・インデックス種別の移行を行ってから永続化する"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._io_executor, self._sync_maintain)
         await self._persist()
 
+    def _sync_maintain(self) -> None:
+        # 生きているベクトルだけをロック内で取り出し、学習・追加はロックの外で行う
+        with self._lock:
+            plan = self._pending_migration()
+            if plan is None and not self._tombstones:
+                return
+            ids = np.fromiter(self.id_to_uuid, dtype="int64", count=len(self.id_to_uuid))
+            vecs = faiss_ids.reconstruct(self.index, ids, self.dim)
+            if plan is None:
+                # 同じ種別のまま墓標だけ落とす（IVF は学習済みの重心を引き継ぐ）
+                self._ensure_writable()
+                fresh = faiss.clone_index(self.index)
+                fresh.reset()
+            dropped = len(self._tombstones)
+
+        if plan is not None:
+            train = faiss_factory.training_rows(plan, self.policy, vecs)
+            fresh = faiss_factory.build(plan, self.dim, faiss.METRIC_L2, self.policy, train)
+        if len(ids):
+            fresh.add_with_ids(vecs, ids)
+
+        with self._lock:
+            # 作り直している間の追加・削除を反映してから差し替える
+            current = self.index
+            tombstones = faiss_factory.catch_up(
+                fresh,
+                lambda added: faiss_ids.reconstruct(current, added, self.dim),
+                ids,
+                list(self.id_to_uuid),
+            )
+            with self._index_lock.write():
+                self.index = fresh
+                self._tombstones = tombstones
+                self._mapped = False
+            self._dirty = True
+        if plan is not None:
+            logger.info("Migrated FAISS index to %s (%d vectors)", plan, len(ids))
+        else:
+            logger.info("Compacted FAISS index: dropped %d tombstones", dropped)
+
     async def rebuild(self, memos: List[Memo]) -> None:
         """
         全件クリアして再構築。非同期で永続化
         """
-        # 新規インデックス
-        quantizer = faiss.IndexFlatL2(self.dim)
-        ivf = faiss.IndexIVFFlat(quantizer, self.dim, self.index.nlist, faiss.METRIC_L2)
-        ivf.train(np.stack([m.embedding for m in memos]).astype("float32"))
-        ivf.add(np.stack([m.embedding for m in memos]).astype("float32"))
+        vecs = np.stack([m.embedding for m in memos]).astype("float32")
+        await self.rebuild_from_matrix([m.uuid for m in memos], vecs)
 
-        self.index = ivf
-        self.id_to_uuid = {i: m.uuid for i, m in enumerate(memos)}
+    async def rebuild_from_matrix(self, uuids: List[str], matrix: np.ndarray) -> None:
+        """
+        (UUID リスト, 埋め込み行列) から再構築する。
+        EmbeddingStore の memmap をそのまま渡せば、メモ単位のロードを介さず学習・追加できる。
+        学習・追加は重いので、差し替えまで含めてバックグラウンドスレッドで行う
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._io_executor, self._sync_rebuild, uuids, matrix)
 
-        await self._persist()
+    def _sync_rebuild(self, uuids: List[str], matrix: np.ndarray) -> None:
+        # 件数に合ったインデックスを作り、IVF なら実データのサンプルで学習する
+        plan = self.policy.plan(len(uuids), self.dim)
+        train = faiss_factory.training_rows(plan, self.policy, matrix)
+        index = faiss_factory.build(plan, self.dim, faiss.METRIC_L2, self.policy, train)
+        if uuids:
+            index.add_with_ids(
+                np.ascontiguousarray(matrix, dtype="float32"),
+                np.arange(len(uuids), dtype="int64"),
+            )
+        self._install(index, uuids)
+
+    def _install(self, index: faiss.Index, uuids: List[str]) -> None:
+        """
+        再構築したインデックスに差し替えて、そのままスナップショットを取る
+        （古い WAL が新しい ID 体系に混ざらないよう、同じロック内で書き切る）
+        """
+        with self._lock:
+            with self._index_lock.write():
+                self.index = index
+                self._mapped = False
+                self.id_to_uuid = {i: u for i, u in enumerate(uuids)}
+                self.uuid_to_id = {u: i for i, u in self.id_to_uuid.items()}
+                self._tombstones = set()
+            self._next_id = len(uuids)
+            self.id_map.reset()
+            self._dirty = True
+            self._sync_persist()
 
     async def search(
-        self, query_vec: np.ndarray, top_k: int = 10
+        self,
+        query_vec: np.ndarray,
+        top_k: int = 10,
+        memo_uuids: Optional[Iterable[str]] = None,
     ) -> Tuple[List[str], np.ndarray]:
         """
-        同期的な search を非同期ラッパーで呼び出し、
         (UUIDリスト, 距離配列) を返却
+        同時に届いた検索とまとめて 1 回の行列検索で処理する
+        memo_uuids を渡すとそのメモだけを探索する（絞り込み条件ごとに対象が違うのでまとめない）
         """
-        loop = asyncio.get_running_loop()
-        uuids, dists = await loop.run_in_executor(
-            None, self._sync_search, query_vec, top_k
-        )
-        return uuids, dists
+        if memo_uuids is not None:
+            return await self._search_pool.run(
+                self._sync_search_filtered, query_vec, top_k, list(memo_uuids)
+            )
+        return await self._coalescer.submit(query_vec, top_k)
+
+    async def search_batch(
+        self, queries: np.ndarray, top_k: int = 10
+    ) -> List[Tuple[List[str], np.ndarray]]:
+        """クエリ行列 (n, dim) を 1 回で検索し、行ごとに (UUIDリスト, 距離配列) を返す"""
+        return await self._search_pool.run(self._sync_search_batch, queries, top_k)
 
     def _sync_search(
         self, query_vec: np.ndarray, top_k: int
     ) -> Tuple[List[str], np.ndarray]:
-        q = query_vec.reshape(1, -1).astype("float32")
-        # IVF は nprobe で検索精度⇔速度調整可能
-        if isinstance(self.index, faiss.IndexIVFFlat):
-            self.index.nprobe = min(10, self.index.nlist // 10)
-        dists, ids = self.index.search(q, top_k)
-        uuids = [self.id_to_uuid.get(int(i)) for i in ids[0]]
-        return uuids, dists[0]
+        return self._sync_search_batch(query_vec.reshape(1, -1), top_k)[0]
+
+    def _sync_search_batch(
+        self, queries: np.ndarray, top_k: int
+    ) -> List[Tuple[List[str], np.ndarray]]:
+        q = np.ascontiguousarray(queries, dtype="float32").reshape(-1, self.dim)
+        with self._index_lock.read():
+            # nprobe / efSearch は構築・読み込み時に設定済み
+            # 墓標が混ざる分だけ多めに取り、生きている ID だけを top_k 件返す
+            k = min(top_k + len(self._tombstones), max(self.index.ntotal, top_k))
+            dists, ids = self.index.search(q, k)
+            rows = []
+            for row_ids, row_dists in zip(ids.tolist(), dists):
+                hits = [
+                    (self.id_to_uuid[i], d)
+                    for i, d in zip(row_ids, row_dists)
+                    if i in self.id_to_uuid
+                ][:top_k]
+                rows.append(([u for u, _ in hits], np.asarray([d for _, d in hits], dtype="float32")))
+        return rows
+
+    def _sync_search_filtered(
+        self, query_vec: np.ndarray, top_k: int, memo_uuids: List[str]
+    ) -> Tuple[List[str], np.ndarray]:
+        q = np.ascontiguousarray(query_vec, dtype="float32").reshape(1, self.dim)
+        with self._index_lock.read():
+            ids = np.asarray(
+                [self.uuid_to_id[u] for u in memo_uuids if u in self.uuid_to_id], dtype="int64"
+            )
+            if not ids.size:
+                return [], np.empty(0, dtype="float32")
+            k = min(top_k, int(ids.size))
+            if ids.size <= self.filter_exact_max:
+                # 対象が少なければ索引を使わず、そのベクトルだけを総当たりで採点する
+                vecs = faiss_ids.reconstruct(self.index, ids, self.dim)
+                dists, pos = faiss.knn(q, vecs, k, metric=faiss.METRIC_L2)
+                found = [int(ids[p]) if p >= 0 else -1 for p in pos[0].tolist()]
+            else:
+                params = faiss_factory.search_params(self.index, k, sel=faiss.IDSelectorBatch(ids))
+                dists, found = self.index.search(q, k, params=params)
+                found = found[0].tolist()
+            hits = [(self.id_to_uuid[i], d) for i, d in zip(found, dists[0]) if i in self.id_to_uuid]
+        return [u for u, _ in hits], np.asarray([d for _, d in hits], dtype="float32")
+
+    def search_stats(self) -> dict:
+        stats = self._coalescer.stats()
+        if self._owns_search_pool:
+            stats["pool"] = self._search_pool.stats()
+        return stats
+
 
 FaissIndexRepository = AsyncFaissIndexRepository
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+OP_ADD = 1
+OP_REMOVE = 2
+
+# フレームヘッダ: op(u8), 件数(u32), 次元(u32), キー部のバイト数(u32), CRC32(u32)
+_HEADER = struct.Struct("<BIIII")
+
+WalEntry = Tuple[int, np.ndarray, List[str], Optional[np.ndarray]]
+
+
+class WriteAheadLog:
+    """
+    FAISS インデックスへの追加・削除を記録する追記型ログ
+    - 変更のたびに 1 フレーム（ID 列＋ベクトル＋キー文字列）を追記するだけなので O(変更量)
+    - スナップショット（インデックス＋ID マップ）を書き終えたら reset() で空にする
+    - 起動時は replay() でスナップショット以降の変更を取り出して適用する
+    - 書き込み途中で落ちた末尾のフレームは CRC で検出して切り捨てる
+    """
+
+    def __init__(self, path: Union[str, Path], fsync: bool = True):
+        self.path = Path(path)
+        self.fsync = fsync
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self.path.stat().st_size if self.path.exists() else 0
+
+    def append_add(self, ids: np.ndarray, keys: List[str], vecs: np.ndarray) -> None:
+        vecs = np.ascontiguousarray(vecs, dtype="float32")
+        self._append(OP_ADD, ids, vecs.shape[1], vecs.tobytes(), "\n".join(keys).encode("utf-8"))
+
+    def append_remove(self, ids: List[int]) -> None:
+        self._append(OP_REMOVE, ids, 0, b"", b"")
+
+    def _append(self, op: int, ids, dim: int, vec_bytes: bytes, key_bytes: bytes) -> None:
+        id_bytes = np.asarray(ids, dtype="<i8").tobytes()
+        count = len(id_bytes) // 8
+        if not count:
+            return
+        body = id_bytes + vec_bytes + key_bytes
+        crc = zlib.crc32(_HEADER.pack(op, count, dim, len(key_bytes), 0) + body)
+        frame = _HEADER.pack(op, count, dim, len(key_bytes), crc) + body
+        with self._lock:
+            with open(self.path, "ab") as f:
+                f.write(frame)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def replay(self) -> Iterator[WalEntry]:
+        """記録順に (op, ID 列, キー列, ベクトル行列 or None) を返す"""
+        if not self.path.exists():
+            return
+        data = self.path.read_bytes()
+        pos = 0
+        while pos + _HEADER.size <= len(data):
+            op, count, dim, key_len, crc = _HEADER.unpack_from(data, pos)
+            end = pos + _HEADER.size + count * 8 + count * dim * 4 + key_len
+            if end > len(data):
+                break
+            body = data[pos + _HEADER.size:end]
+            if zlib.crc32(_HEADER.pack(op, count, dim, key_len, 0) + body) != crc:
+                break
+            ids = np.frombuffer(body, dtype="<i8", count=count).astype("int64")
+            if op == OP_ADD:
+                vecs = np.frombuffer(body, dtype="<f4", count=count * dim, offset=count * 8).reshape(count, dim)
+                keys = body[count * 8 + count * dim * 4:].decode("utf-8").split("\n")
+                yield op, ids, keys, vecs
+            else:
+                yield op, ids, [], None
+            pos = end
+        if pos < len(data):
+            logger.warning("Truncating torn WAL tail in %s (%d bytes)", self.path, len(data) - pos)
+            with open(self.path, "r+b") as f:
+                f.truncate(pos)
+
+    def reset(self) -> None:
+        with self._lock:
+            if self.path.exists():
+                with open(self.path, "r+b") as f:
+                    f.truncate(0)
+
+
+class SnapshotScheduler:
+    """
+    スナップショット（インデックス全体の書き出し）をまとめて間引く
+    - 変更のたびに touch() し、delay 秒変更が途切れたらスナップショットを取る
+    - 変更が途切れなくても max_wait 秒か WAL が max_wal_bytes を超えたら取る
+    - スナップショット中の変更は次回に回す（同時に走るのは 1 本だけ）
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        snapshot: Callable[[], None],
+        wal: WriteAheadLog,
+        delay: float = 2.0,
+        max_wal_bytes: int = 64 * 1024 * 1024,
+        max_wait: float = 30.0,
+    ):
+        self._executor = executor
+        self._snapshot = snapshot
+        self._wal = wal
+        self.delay = delay
+        self.max_wal_bytes = max_wal_bytes
+        self.max_wait = max(max_wait, delay)
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._task: Optional[asyncio.Task] = None
+        self._first_change: Optional[float] = None
+        self._again = False
+
+    def touch(self) -> None:
+        """変更を記録した直後にイベントループ上で呼ぶ"""
+        now = time.monotonic()
+        if self._first_change is None:
+            self._first_change = now
+        if self._wal.size >= self.max_wal_bytes or now - self._first_change >= self.max_wait:
+            self._start()
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        wait = min(self.delay, self._first_change + self.max_wait - now)
+        self._timer = asyncio.get_running_loop().call_later(wait, self._start)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _start(self) -> None:
+        self.cancel()
+        if self.running:
+            self._again = True
+            return
+        self._first_change = None
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._executor, self._snapshot)
+        except Exception as e:
+            logger.error("Snapshot failed: %s", e)
+        if self._again:
+            self._again = False
+            self._task = loop.create_task(self._run())
+
+    def cancel(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
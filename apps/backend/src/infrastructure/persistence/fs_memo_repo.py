@@ -2,17 +2,30 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
 
 import aiofiles
 import numpy as np
 from domain.memo import Memo
-from interfaces.repositories.memo_repo import MemoNotFoundError, MemoRepository
+from domain.memo_filter import MemoFilter
+from interfaces.repositories.memo_repo import (
+    ALL_FIELDS,
+    MemoNotFoundError,
+    MemoRepository,
+    PageKey,
+)
 from infrastructure.utils.datetime_jst import now_jst
 from interfaces.utils.file_lock import FileLock
+from infrastructure.persistence.embedding_store import EmbeddingStore
+from infrastructure.persistence.memo_catalog import CatalogEntry, MemoCatalog
+from infrastructure.persistence.memo_metadata_index import (
+    MemoMetadata,
+    MemoMetadataIndex,
+    content_hash,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -23,15 +36,38 @@ class FileSystemMemoRepository(MemoRepository):
     HEADER_BREAK = "---\n"
     _SEM_LIMIT = 20
     _IO_WORKERS = 20
-    _EMBED_WORKERS = 4
-
-    def __init__(self, root: Path):
+    _DEFAULT_DIM = 768
+
+    def __init__(
+        self,
+        root: Path,
+        metadata_path: Union[str, Path, None] = None,
+        embedding_store: Optional[EmbeddingStore] = None,
+    ):
         self.root = root.expanduser().resolve()
         self.root.mkdir(parents=True, exist_ok=True)
 
         self._io_executor = ThreadPoolExecutor(max_workers=self._IO_WORKERS)
-        self._embed_executor = ProcessPoolExecutor(max_workers=self._EMBED_WORKERS)
-        logger.debug(f"Initialized FileSystemMemoRepository at {self.root}")
+
+        # UUID → パスのカタログ（起動時に一度だけ走査）
+        self._catalog = MemoCatalog(self.root)
+        self._catalog.rescan()
+
+        # ヘッダ情報のみのメタデータ索引（未指定ならインメモリ）
+        self._meta = MemoMetadataIndex(metadata_path or ":memory:")
+        self._sync_metadata()
+
+        # 埋め込みは 1 本の memmap 行列に集約（未指定ならメモ root 配下）
+        if embedding_store is None:
+            embedding_store = EmbeddingStore(self.root / ".embeddings", dim=self._DEFAULT_DIM)
+        self._embeddings = embedding_store
+        logger.debug(f"Initialized FileSystemMemoRepository at {self.root} ({len(self._catalog)} memos)")
+
+    def close(self) -> None:
+        """Executor をシャットダウンする（アプリ終了時に一度だけ呼ぶ）"""
+        self._io_executor.shutdown(wait=True)
+        self._compact_embeddings()
+        self._meta.close()
 
     async def add(self, memo: Memo) -> None:
         path = self._build_path(memo)
@@ -40,15 +76,21 @@ class FileSystemMemoRepository(MemoRepository):
 
         async with aiofiles.open(path, "w", encoding="utf-8") as fp:
             await fp.write(self._serialize(memo))
+        self._record(memo, self._catalog.put(memo.uuid, path))
 
         if memo.embedding is not None:
-            loop = asyncio.get_running_loop()
+            await self.save_embedding(memo)
 
-            await loop.run_in_executor(self._embed_executor, self._save_embedding, memo)
+    async def save_embedding(self, memo: Memo) -> None:
+        """埋め込みだけを行列ストアへ追記保存する"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._io_executor, self._embeddings.put, memo.uuid, memo.embedding)
 
     async def list_all(self) -> list[Memo]:
-        """チャンク＆Semaphore でメモを並列ロード"""
-        paths = list(self.root.rglob("*.txt"))
+        """チャンク＆Semaphore でメモを並列ロード（全件走査のついでにカタログも同期）"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._io_executor, self._refresh)
+        paths = list(self._catalog.paths())
         sem = asyncio.Semaphore(self._SEM_LIMIT)
 
         async def load_with_sem(p: Path) -> Optional[Memo]:
@@ -59,14 +101,91 @@ class FileSystemMemoRepository(MemoRepository):
         results = await asyncio.gather(*tasks)
         return [m for m in results if m is not None]
 
+    async def list_page(
+        self,
+        limit: int,
+        after: Optional[PageKey] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> Tuple[List[Memo], Optional[PageKey]]:
+        """
+        (created_at, uuid) 昇順で limit 件を返す。順序はメタデータ索引で決め、
+        fields に含まれない本文（body）・埋め込み（embedding）は読み込まない。
+        """
+        loop = asyncio.get_running_loop()
+        # 1 件余分に引き、続きが本当にあるときだけ次ページのキーを返す（空の最終ページを作らない）
+        metas = await loop.run_in_executor(self._io_executor, self._meta.page, limit + 1, after)
+        has_more = len(metas) > limit
+        metas = metas[:limit]
+        memos = await self._load_batch(metas, ALL_FIELDS if fields is None else set(fields))
+        next_after = (metas[-1].created_ts or 0.0, metas[-1].uuid) if has_more else None
+        return memos, next_after
+
+    async def iter_all(
+        self,
+        batch_size: int = 100,
+        fields: Optional[Iterable[str]] = None,
+        after: Optional[PageKey] = None,
+    ) -> AsyncIterator[List[Memo]]:
+        """
+        全メモを batch_size 件ずつ安定順で返す非同期ジェネレータ。
+        同時に保持するのは 1 バッチ分だけなので、ピークメモリはコーパスサイズに依存しない。
+        """
+        fields = ALL_FIELDS if fields is None else set(fields)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._io_executor, self._refresh)
+        while True:
+            memos, after = await self.list_page(batch_size, after, fields)
+            if memos:
+                yield memos
+            if after is None:
+                break
+
     async def get_by_uuid(self, uuid: str) -> Memo:
-        pattern = f"{uuid}.txt"
-        for path in self.root.rglob(pattern):
+        path = await self._resolve_path(uuid)
+        if path is not None:
             memo = await self._load_memo(path)
             if memo:
                 return memo
         raise MemoNotFoundError(f"Memo with UUID {uuid} not found")
 
+    async def get_many(self, uuids: Iterable[str]) -> Dict[str, Memo]:
+        """
+        複数 UUID をまとめて取得する。
+        重複を除いてカタログでパスを一括解決し、Semaphore で並列度を抑えて読み込む。
+        """
+        unique = list(dict.fromkeys(u for u in uuids if u))
+        if not unique:
+            return {}
+
+        paths: Dict[str, Path] = {}
+        missing = []
+        for uuid in unique:
+            entry = self._catalog.get(uuid)
+            if entry is not None:
+                paths[uuid] = entry.path
+            else:
+                missing.append(uuid)
+
+        # 未登録分があればカタログを一度だけ再走査して拾い直す
+        if missing:
+            loop = asyncio.get_running_loop()
+            if await loop.run_in_executor(self._io_executor, self._catalog.rescan_if_stale):
+                for uuid in missing:
+                    entry = self._catalog.get(uuid)
+                    if entry is not None:
+                        paths[uuid] = entry.path
+
+        sem = asyncio.Semaphore(self._SEM_LIMIT)
+
+        async def load_with_sem(uuid: str, p: Path):
+            async with sem:
+                return uuid, await self._load_memo(p)
+
+        results = await asyncio.gather(*(load_with_sem(u, p) for u, p in paths.items()))
+        loaded = {u: m for u, m in results if m is not None}
+        # 返却順は入力順に揃える
+        return {u: loaded[u] for u in unique if u in loaded}
+
     async def update(self, uuid: str, title: str, body: str) -> Memo:
         old = await self.get_by_uuid(uuid)
         updated = Memo(
@@ -77,9 +196,10 @@ class FileSystemMemoRepository(MemoRepository):
             tags=old.tags,
             created_at=old.created_at,
             score=old.score,
-            embedding=old.embedding,
+            # 本文が変わったので古いベクトルは引き継がない（再索引時に作り直す）
+            embedding=None,
         )
-        path = self._build_path(old)
+        path = await self._resolve_path(uuid) or self._build_path(old)
 
         def _sync_replace():
             with FileLock(str(path)):
@@ -89,31 +209,187 @@ class FileSystemMemoRepository(MemoRepository):
 
         loop = asyncio.get_running_loop()
         await loop.run_in_executor(self._io_executor, _sync_replace)
-
-        if updated.embedding is not None:
-            await loop.run_in_executor(self._embed_executor, self._save_embedding, updated)
+        self._record(updated, self._catalog.put(uuid, path))
+        await loop.run_in_executor(self._io_executor, self._drop_embedding, uuid)
 
         return updated
 
     async def delete(self, uuid: str) -> bool:
-        try:
-            memo = await self.get_by_uuid(uuid)
-        except MemoNotFoundError:
+        path = await self._resolve_path(uuid)
+        if path is None:
             return False
 
-        path = self._build_path(memo)
         loop = asyncio.get_running_loop()
-        await loop.run_in_executor(self._io_executor, path.unlink)
+        try:
+            await loop.run_in_executor(self._io_executor, path.unlink)
+        except FileNotFoundError:
+            # ファイルは既に無くても、索引と埋め込みは残さない
+            self._catalog.remove(uuid)
+            self._meta.remove(uuid)
+            await loop.run_in_executor(self._io_executor, self._drop_embedding, uuid)
+            return False
+        self._catalog.remove(uuid)
+        self._meta.remove(uuid)
+        await loop.run_in_executor(self._io_executor, self._drop_embedding, uuid)
 
+        # 旧形式の .npy が残っていれば合わせて削除
         embed_path = path.with_suffix(".npy")
         if embed_path.exists():
             await loop.run_in_executor(self._io_executor, embed_path.unlink)
 
         return True
 
+    async def list_categories(self) -> List[str]:
+        """メタデータ索引からカテゴリ一覧を返す（本文・ベクトルは読まない）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_executor, self._meta.categories)
+
+    async def list_tags(self) -> List[str]:
+        """メタデータ索引からタグ一覧を返す（本文・ベクトルは読まない）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_executor, self._meta.tags)
+
+    async def filter_uuids(self, f: MemoFilter) -> List[str]:
+        """メタデータ条件に合うメモの UUID（メモリ上のビットマップ索引で評価する）"""
+        return self._meta.select(f)
+
+    def embedding_matrix(self) -> Tuple[List[str], np.ndarray]:
+        """
+        保存済み埋め込みを (UUID リスト, 行列) で返す。
+        memmap をそのまま返せる場合はコピーしないので、インデックス再構築にそのまま渡せる。
+        """
+        uuids, matrix = self._embeddings.matrix()
+        if all(u in self._catalog for u in uuids):
+            return uuids, matrix
+        # API 外で削除されたメモの行は除外する
+        return self._embeddings.matrix([u for u in uuids if u in self._catalog])
+
+    async def count(self) -> int:
+        """登録メモ件数"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_executor, self._meta.count)
+
     # ── Internal ──
 
-    async def _load_memo(self, path: Path) -> Optional[Memo]:
+    def _refresh(self) -> None:
+        """ツリーを再走査し、カタログとメタデータ索引を同期する"""
+        self._catalog.rescan()
+        self._sync_metadata()
+
+    def _sync_metadata(self) -> None:
+        """
+        カタログとメタデータ索引の差分を取り、(mtime, size) が変わったファイルだけ読み直す。
+        API 外で追加・編集・削除されたメモもここで反映される。
+        """
+        known = self._meta.file_stats()
+        changed: List[MemoMetadata] = []
+        for uuid in self._catalog.uuids():
+            entry = self._catalog.get(uuid)
+            if entry is None or known.pop(uuid, None) == (entry.mtime, entry.size):
+                continue
+            meta = self._read_metadata(uuid, entry)
+            if meta is not None:
+                changed.append(meta)
+        self._meta.upsert_many(changed)
+        # カタログに存在しないもの（削除済み）を除去
+        self._meta.remove_many(known)
+        if changed or known:
+            logger.debug("Metadata index synced: %d updated, %d removed", len(changed), len(known))
+
+    def _read_metadata(self, uuid: str, entry: CatalogEntry) -> Optional[MemoMetadata]:
+        try:
+            raw = entry.path.read_text(encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"Failed to read memo header from {entry.path}: {e!r}")
+            return None
+        if self.HEADER_BREAK not in raw:
+            return None
+        header, body = raw.split(self.HEADER_BREAK, 1)
+        meta = self._parse_header(header)
+        body = body.strip()
+
+        created_at = meta.get("CREATED_AT", "").strip()
+        try:
+            created_ts = datetime.fromisoformat(created_at.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            created_ts = None
+
+        return MemoMetadata(
+            uuid=uuid,
+            title=meta.get("TITLE", ""),
+            category=meta.get("CATEGORY", ""),
+            tags=[t.strip() for t in meta.get("TAGS", "").split(",") if t.strip()],
+            created_at=created_at,
+            created_ts=created_ts,
+            body_length=len(body),
+            content_hash=content_hash(body),
+            mtime=entry.mtime,
+            size=entry.size,
+        )
+
+    def _record(self, memo: Memo, entry: Optional[CatalogEntry]) -> None:
+        """書き込み直後のメモをメタデータ索引へ反映"""
+        if entry is None:
+            return
+        self._meta.upsert(MemoMetadata.from_memo(memo, mtime=entry.mtime, size=entry.size))
+
+    async def _resolve_path(self, uuid: str) -> Optional[Path]:
+        """
+        カタログから UUID のファイルパスを O(1) で引く。
+        見つからない／ファイルが消えている場合は API 外の変更とみなして再走査する。
+        """
+        entry = self._catalog.get(uuid)
+        if entry is not None and entry.path.exists():
+            return entry.path
+
+        loop = asyncio.get_running_loop()
+        rescanned = await loop.run_in_executor(self._io_executor, self._catalog.rescan_if_stale)
+        if not rescanned:
+            if entry is not None:
+                self._catalog.remove(uuid)
+            return None
+        entry = self._catalog.get(uuid)
+        return entry.path if entry is not None else None
+
+    async def _load_batch(self, metas: List[MemoMetadata], fields: set) -> List[Memo]:
+        """メタデータ 1 ページ分を、要求されたフィールドだけ読み込んで Memo にする"""
+        with_embedding = "embedding" in fields
+        if "body" in fields:
+            sem = asyncio.Semaphore(self._SEM_LIMIT)
+
+            async def load_with_sem(meta: MemoMetadata) -> Optional[Memo]:
+                entry = self._catalog.get(meta.uuid)
+                if entry is None:
+                    return None
+                async with sem:
+                    return await self._load_memo(entry.path, with_embedding=False)
+
+            loaded = await asyncio.gather(*(load_with_sem(m) for m in metas))
+            memos = [m for m in loaded if m is not None]
+        else:
+            memos = [self._memo_from_metadata(m) for m in metas]
+
+        if with_embedding and memos:
+            vecs = self._embeddings.get_many(m.uuid for m in memos)
+            for memo in memos:
+                memo.embedding = vecs.get(memo.uuid)
+        return memos
+
+    def _memo_from_metadata(self, meta: MemoMetadata) -> Memo:
+        try:
+            created = datetime.fromisoformat(meta.created_at.replace("Z", "+00:00"))
+        except ValueError:
+            created = now_jst()
+        return Memo(
+            uuid=meta.uuid,
+            title=meta.title,
+            body="",
+            category=meta.category,
+            tags=list(meta.tags),
+            created_at=created,
+        )
+
+    async def _load_memo(self, path: Path, with_embedding: bool = True) -> Optional[Memo]:
         try:
 
             async with aiofiles.open(path, "r", encoding="utf-8") as f:
@@ -152,12 +428,17 @@ class FileSystemMemoRepository(MemoRepository):
             )
 
 
-            embed_path = path.with_suffix(".npy")
-            if embed_path.exists():
-                loop = asyncio.get_running_loop()
-                memo.embedding = await loop.run_in_executor(
-                    self._embed_executor, np.load, str(embed_path)
-                )
+            if not with_embedding:
+                return memo
+
+            memo.embedding = self._embeddings.get(memo.uuid)
+            if memo.embedding is None:
+                embed_path = path.with_suffix(".npy")
+                if embed_path.exists():
+                    loop = asyncio.get_running_loop()
+                    memo.embedding = await loop.run_in_executor(
+                        self._io_executor, self._migrate_legacy_embedding, memo.uuid, embed_path
+                    )
 
             return memo
         except Exception as e:
@@ -175,11 +456,27 @@ class FileSystemMemoRepository(MemoRepository):
         ])
         return f"{header}\n{self.HEADER_BREAK}{memo.body}"
 
-    def _save_embedding(self, memo: Memo) -> None:
-        """同期 NumPy で .npy 保存"""
-        path = self._build_path(memo).with_suffix(".npy")
-        path.parent.mkdir(parents=True, exist_ok=True)
-        np.save(str(path), memo.embedding)
+    def _drop_embedding(self, uuid: str) -> None:
+        """埋め込みを無効化し、死に行が生存行を上回ったら行列ストアを詰め直す"""
+        self._embeddings.remove(uuid)
+        self._compact_embeddings()
+
+    def _compact_embeddings(self) -> None:
+        if self._embeddings.dead_rows <= len(self._embeddings):
+            return
+        try:
+            self._embeddings.compact()
+        except OSError as e:
+            logger.error("Failed to compact embedding store: %s", e)
+
+    def _migrate_legacy_embedding(self, uuid: str, embed_path: Path) -> np.ndarray:
+        """旧形式の per-memo .npy を読み込み、行列ストアへ取り込む"""
+        vec = np.load(str(embed_path)).astype("float32")
+        try:
+            self._embeddings.put(uuid, vec)
+        except ValueError as e:
+            logger.warning(f"Skip migrating embedding of {uuid}: {e}")
+        return vec
 
     def _parse_header(self, header: str) -> dict[str, str]:
         meta: dict[str, str] = {}
@@ -0,0 +1,102 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """UUID に対応するメモファイルの所在情報"""
+    category: str
+    path: Path
+    mtime: float
+    size: int
+
+
+class MemoCatalog:
+    """
+    UUID → (category, path, mtime, size) のインメモリカタログ
+    - 起動時に一度だけ rglob で構築し、以降は add/update/delete で差分更新
+    - API 外でツリーが変更された場合は rescan() で再構築（間隔制限付き）
+    """
+
+    def __init__(self, root: Path, min_rescan_interval: float = 5.0):
+        self.root = root
+        self.min_rescan_interval = min_rescan_interval
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._lock = threading.Lock()
+        self._last_scan = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, uuid: str) -> bool:
+        return uuid in self._entries
+
+    def get(self, uuid: str) -> Optional[CatalogEntry]:
+        return self._entries.get(uuid)
+
+    def uuids(self) -> List[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def paths(self) -> Iterator[Path]:
+        with self._lock:
+            entries = list(self._entries.values())
+        return (e.path for e in entries)
+
+    def put(self, uuid: str, path: Path) -> Optional[CatalogEntry]:
+        """ファイルを stat してエントリを登録／更新する"""
+        entry = self._stat_entry(path)
+        if entry is None:
+            self.remove(uuid)
+            return None
+        with self._lock:
+            self._entries[uuid] = entry
+        return entry
+
+    def remove(self, uuid: str) -> None:
+        with self._lock:
+            self._entries.pop(uuid, None)
+
+    def rescan(self) -> None:
+        """ツリー全体を走査してカタログを作り直す"""
+        entries: Dict[str, CatalogEntry] = {}
+        for path in self.root.rglob("*.txt"):
+            entry = self._stat_entry(path)
+            if entry is not None:
+                entries[path.stem] = entry
+        with self._lock:
+            self._entries = entries
+            self._last_scan = time.monotonic()
+        logger.debug("MemoCatalog scanned %s: %d memos", self.root, len(entries))
+
+    def rescan_if_stale(self) -> bool:
+        """
+        直近の走査から min_rescan_interval 秒以上経過していれば再走査する。
+        存在しない UUID の連続参照でツリー全体を何度も歩かないための制限。
+        """
+        if time.monotonic() - self._last_scan < self.min_rescan_interval:
+            return False
+        self.rescan()
+        return True
+
+    def _stat_entry(self, path: Path) -> Optional[CatalogEntry]:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        try:
+            category = path.parent.relative_to(self.root).as_posix()
+        except ValueError:
+            category = path.parent.name
+        return CatalogEntry(
+            category="" if category == "." else category,
+            path=path,
+            mtime=st.st_mtime,
+            size=st.st_size,
+        )
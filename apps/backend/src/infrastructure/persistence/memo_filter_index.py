@@ -0,0 +1,151 @@
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from domain.memo_filter import MemoFilter
+
+logger = logging.getLogger(__name__)
+
+
+class MemoFilterIndex:
+    """
+    メタデータ絞り込み用のメモリ上の索引
+    - メモごとにスロット番号を振り、カテゴリ・タグごとにスロットのビットマップ（packbits 形式）を持つ
+    - created_at はスロット順の配列で持ち、絞り込み時に昇順の並びを作って二分探索する
+      （並びは変更があったときだけ作り直す）
+    - select() は条件をビットマップの AND で評価し、該当するメモ UUID を返す
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._lock = threading.Lock()
+        self._slot_of: Dict[str, int] = {}
+        self._uuids: List[Optional[str]] = []
+        self._free: List[int] = []
+        # スロットごとの登録内容（更新・削除時にビットを落とすため）
+        self._entries: List[Optional[Tuple[str, Tuple[str, ...]]]] = []
+        nbytes = max(1, (capacity + 7) // 8)
+        self._live = np.zeros(nbytes, dtype=np.uint8)
+        self._categories: Dict[str, np.ndarray] = {}
+        self._tags: Dict[str, np.ndarray] = {}
+        self._created = np.full(nbytes * 8, np.nan)
+        # (昇順の created_ts, 対応するスロット)
+        self._sorted: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    # ── 書き込み ──
+
+    def upsert(
+        self,
+        uuid: str,
+        category: str,
+        tags: Iterable[str],
+        created_ts: Optional[float],
+    ) -> None:
+        tags = tuple(sorted({t.strip() for t in tags if t and t.strip()}))
+        with self._lock:
+            slot = self._slot_of.get(uuid)
+            if slot is None:
+                slot = self._allocate(uuid)
+            else:
+                self._clear(slot)
+            _set(self._live, slot)
+            if category:
+                _set(self._bitmap(self._categories, category), slot)
+            for tag in tags:
+                _set(self._bitmap(self._tags, tag), slot)
+            self._entries[slot] = (category, tags)
+            self._created[slot] = np.nan if created_ts is None else created_ts
+            self._sorted = None
+
+    def remove_many(self, uuids: Iterable[str]) -> None:
+        with self._lock:
+            for uuid in uuids:
+                slot = self._slot_of.pop(uuid, None)
+                if slot is None:
+                    continue
+                self._clear(slot)
+                self._uuids[slot] = None
+                self._entries[slot] = None
+                self._free.append(slot)
+                self._sorted = None
+
+    def _allocate(self, uuid: str) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._uuids[slot] = uuid
+        else:
+            slot = len(self._uuids)
+            self._uuids.append(uuid)
+            self._entries.append(None)
+            if slot >= self._live.size * 8:
+                self._grow()
+        self._slot_of[uuid] = slot
+        return slot
+
+    def _grow(self) -> None:
+        """全ビットマップを倍の長さに広げる"""
+        extra = self._live.size
+        pad = np.zeros(extra, dtype=np.uint8)
+        self._live = np.concatenate([self._live, pad])
+        for maps in (self._categories, self._tags):
+            for key, bm in maps.items():
+                maps[key] = np.concatenate([bm, pad])
+        self._created = np.concatenate([self._created, np.full(extra * 8, np.nan)])
+
+    def _bitmap(self, maps: Dict[str, np.ndarray], key: str) -> np.ndarray:
+        bm = maps.get(key)
+        if bm is None:
+            bm = maps[key] = np.zeros_like(self._live)
+        return bm
+
+    def _clear(self, slot: int) -> None:
+        _unset(self._live, slot)
+        entry = self._entries[slot]
+        if entry is None:
+            return
+        category, tags = entry
+        if category in self._categories:
+            _unset(self._categories[category], slot)
+        for tag in tags:
+            if tag in self._tags:
+                _unset(self._tags[tag], slot)
+        self._created[slot] = np.nan
+
+    # ── 参照 ──
+
+    def select(self, f: MemoFilter) -> List[str]:
+        """条件をすべて満たすメモの UUID（スロット順）"""
+        with self._lock:
+            mask = self._live.copy()
+            if f.category:
+                mask &= self._categories.get(f.category, 0)
+            for tag in f.tags:
+                mask &= self._tags.get(tag.strip(), 0)
+            if f.created_from or f.created_to:
+                mask &= self._created_range(f)
+            slots = np.flatnonzero(np.unpackbits(mask, bitorder="little"))
+            return [self._uuids[s] for s in slots.tolist()]
+
+    def _created_range(self, f: MemoFilter) -> np.ndarray:
+        if self._sorted is None:
+            slots = np.flatnonzero(~np.isnan(self._created))
+            order = np.argsort(self._created[slots], kind="stable")
+            self._sorted = (self._created[slots][order], slots[order])
+        ts, slots = self._sorted
+        lo = np.searchsorted(ts, f.created_from.timestamp(), "left") if f.created_from else 0
+        hi = np.searchsorted(ts, f.created_to.timestamp(), "right") if f.created_to else ts.size
+        bits = np.zeros(self._live.size * 8, dtype=bool)
+        bits[slots[lo:hi]] = True
+        return np.packbits(bits, bitorder="little")
+
+
+def _set(bm: np.ndarray, slot: int) -> None:
+    bm[slot >> 3] |= np.uint8(1 << (slot & 7))
+
+
+def _unset(bm: np.ndarray, slot: int) -> None:
+    bm[slot >> 3] &= np.uint8(~(1 << (slot & 7)) & 0xFF)
@@ -0,0 +1,235 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from domain.memo import Memo
+from domain.memo_filter import MemoFilter
+from infrastructure.persistence.memo_filter_index import MemoFilterIndex
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(body: str) -> str:
+    """本文の内容ハッシュ（変更検知用）"""
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class MemoMetadata:
+    """本文・ベクトルを含まないメモのヘッダ情報"""
+    uuid: str
+    title: str
+    category: str
+    tags: List[str] = field(default_factory=list)
+    created_at: str = ""
+    created_ts: Optional[float] = None
+    body_length: int = 0
+    content_hash: str = ""
+    mtime: float = 0.0
+    size: int = 0
+
+    @classmethod
+    def from_memo(cls, memo: Memo, mtime: float = 0.0, size: int = 0) -> "MemoMetadata":
+        created = memo.created_at
+        if isinstance(created, datetime):
+            created_at, created_ts = created.isoformat(), created.timestamp()
+        else:
+            created_at, created_ts = str(created or ""), None
+        body = memo.body or ""
+        return cls(
+            uuid=memo.uuid,
+            title=memo.title,
+            category=memo.category,
+            tags=[t.strip() for t in memo.tags if t and t.strip()],
+            created_at=created_at,
+            created_ts=created_ts,
+            body_length=len(body),
+            content_hash=content_hash(body),
+            mtime=mtime,
+            size=size,
+        )
+
+
+class MemoMetadataIndex:
+    """
+    SQLite によるメモのメタデータ索引
+    - uuid / title / category / tags / created_at / 本文長 / 内容ハッシュを保持
+    - 書き込み時に差分更新し、タグ・カテゴリ・件数を本文やベクトルに触れず返す
+    - (mtime, size) を保持し、起動時は変化したファイルだけ再読込して整合を取る
+    - カテゴリ・タグ・作成日時の絞り込み用にメモリ上のビットマップ索引を併せて保つ
+    """
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS memos (
+        uuid         TEXT PRIMARY KEY,
+        title        TEXT NOT NULL,
+        category     TEXT NOT NULL,
+        created_at   TEXT NOT NULL,
+        created_ts   REAL,
+        body_length  INTEGER NOT NULL,
+        content_hash TEXT NOT NULL,
+        mtime        REAL NOT NULL,
+        size         INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS memo_tags (
+        uuid TEXT NOT NULL,
+        tag  TEXT NOT NULL,
+        PRIMARY KEY (uuid, tag)
+    );
+    CREATE INDEX IF NOT EXISTS idx_memos_category ON memos(category);
+    CREATE INDEX IF NOT EXISTS idx_memos_created ON memos(created_ts, uuid);
+    CREATE INDEX IF NOT EXISTS idx_memo_tags_tag ON memo_tags(tag);
+    """
+
+    def __init__(self, db_path: Union[str, Path] = ":memory:"):
+        if str(db_path) != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self._SCHEMA)
+        self._conn.commit()
+        self._filter = MemoFilterIndex()
+        self._load_filter()
+
+    def _load_filter(self) -> None:
+        with self._lock:
+            tag_map: Dict[str, List[str]] = {}
+            for uuid, tag in self._conn.execute("SELECT uuid, tag FROM memo_tags"):
+                tag_map.setdefault(uuid, []).append(tag)
+            rows = self._conn.execute("SELECT uuid, category, created_ts FROM memos").fetchall()
+        for uuid, category, created_ts in rows:
+            self._filter.upsert(uuid, category, tag_map.get(uuid, []), created_ts)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ── 書き込み ──
+
+    def upsert(self, meta: MemoMetadata) -> None:
+        self.upsert_many([meta])
+
+    def upsert_many(self, metas: Iterable[MemoMetadata]) -> None:
+        metas = list(metas)
+        if not metas:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO memos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (m.uuid, m.title, m.category, m.created_at, m.created_ts,
+                     m.body_length, m.content_hash, m.mtime, m.size)
+                    for m in metas
+                ],
+            )
+            self._conn.executemany(
+                "DELETE FROM memo_tags WHERE uuid = ?", [(m.uuid,) for m in metas]
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO memo_tags VALUES (?, ?)",
+                [(m.uuid, t) for m in metas for t in m.tags],
+            )
+        for m in metas:
+            self._filter.upsert(m.uuid, m.category, m.tags, m.created_ts)
+
+    def remove(self, uuid: str) -> None:
+        self.remove_many([uuid])
+
+    def remove_many(self, uuids: Iterable[str]) -> None:
+        rows = [(u,) for u in uuids]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM memos WHERE uuid = ?", rows)
+            self._conn.executemany("DELETE FROM memo_tags WHERE uuid = ?", rows)
+        self._filter.remove_many(u for (u,) in rows)
+
+    # ── 参照 ──
+
+    def get(self, uuid: str) -> Optional[MemoMetadata]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM memos WHERE uuid = ?", (uuid,)
+            ).fetchone()
+            if row is None:
+                return None
+            tags = [t for (t,) in self._conn.execute(
+                "SELECT tag FROM memo_tags WHERE uuid = ? ORDER BY tag", (uuid,)
+            )]
+        return MemoMetadata(*row[:3], tags, *row[3:])
+
+    def page(
+        self,
+        limit: int,
+        after: Optional[Tuple[float, str]] = None,
+    ) -> List[MemoMetadata]:
+        """
+        (created_ts, uuid) 昇順のキーセットページング。
+        after に直前ページ末尾のキーを渡すと、その次から limit 件を返す。
+        """
+        sql = "SELECT * FROM memos"
+        params: tuple = ()
+        if after is not None:
+            sql += " WHERE (COALESCE(created_ts, 0), uuid) > (?, ?)"
+            params = (float(after[0]), str(after[1]))
+        sql += " ORDER BY COALESCE(created_ts, 0), uuid LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, params + (int(limit),)).fetchall()
+            if not rows:
+                return []
+            marks = ",".join("?" * len(rows))
+            tag_map: Dict[str, List[str]] = {}
+            for uuid, tag in self._conn.execute(
+                f"SELECT uuid, tag FROM memo_tags WHERE uuid IN ({marks}) ORDER BY tag",
+                [r[0] for r in rows],
+            ):
+                tag_map.setdefault(uuid, []).append(tag)
+        return [MemoMetadata(*r[:3], tag_map.get(r[0], []), *r[3:]) for r in rows]
+
+    def select(self, f: MemoFilter) -> List[str]:
+        """条件に合うメモの UUID（ビットマップ索引で評価し、SQLite には問い合わせない）"""
+        return self._filter.select(f)
+
+    def file_stats(self) -> Dict[str, Tuple[float, int]]:
+        """uuid → (mtime, size)。起動時の差分検出に使う"""
+        with self._lock:
+            return {
+                u: (mtime, size)
+                for u, mtime, size in self._conn.execute("SELECT uuid, mtime, size FROM memos")
+            }
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM memos").fetchone()[0]
+
+    def categories(self) -> List[str]:
+        with self._lock:
+            return [c for (c,) in self._conn.execute(
+                "SELECT DISTINCT category FROM memos WHERE category != '' ORDER BY category"
+            )]
+
+    def tags(self) -> List[str]:
+        with self._lock:
+            return [t for (t,) in self._conn.execute(
+                "SELECT DISTINCT tag FROM memo_tags ORDER BY tag"
+            )]
+
+    def category_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT category, COUNT(*) FROM memos WHERE category != '' GROUP BY category"
+            ).fetchall())
+
+    def tag_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT tag, COUNT(*) FROM memo_tags GROUP BY tag"
+            ).fetchall())
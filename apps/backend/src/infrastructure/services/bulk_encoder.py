@@ -0,0 +1,161 @@
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from infrastructure.services.inference_backends import InferenceBackend, create_backend
+
+logger = logging.getLogger(__name__)
+
+
+def length_buckets(lengths: Sequence[int], batch_size: int) -> List[np.ndarray]:
+    """
+    トークン長でソートし、近い長さ同士を batch_size 件ずつまとめたインデックス列を返す。
+    同じバッチ内の長さが揃うため、パディングが最小になる。
+    """
+    order = np.argsort(np.asarray(lengths), kind="stable")
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+@dataclass
+class BulkEncodeStats:
+    items: int = 0
+    batches: int = 0
+    workers: int = 0
+    tokens: int = 0
+    padded_tokens: int = 0
+    seconds: float = 0.0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.items / self.seconds if self.seconds else 0.0
+
+    @property
+    def padding_ratio(self) -> float:
+        """パディングで埋まったトークンの割合"""
+        return 1.0 - self.tokens / self.padded_tokens if self.padded_tokens else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "chunks_per_sec": self.chunks_per_sec,
+            "padding_ratio": self.padding_ratio,
+        }
+
+
+class BulkEncoder:
+    """
+    大量テキストの一括ベクトル化
+    - トークン長でバケット化し、大きめのバッチで推論
+    - workers >= 2 ならワーカープロセスに分散し、結果は共有メモリに直接書かせる
+    - 返すベクトルは未正規化（正規化は呼び出し側）
+    """
+
+    def __init__(
+        self,
+        backend: InferenceBackend,
+        batch_size: int = 128,
+        workers: int = 0,
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.backend = backend
+        self.batch_size = batch_size
+        self.workers = workers
+
+    def encode(self, texts: Sequence[str]) -> Tuple[np.ndarray, BulkEncodeStats]:
+        texts = list(texts)
+        start = time.perf_counter()
+        stats = BulkEncodeStats(items=len(texts))
+        dim = self.backend.dimension()
+        if not texts:
+            return np.empty((0, dim), dtype="float32"), stats
+
+        lengths = self._token_lengths(texts)
+        batches = length_buckets(lengths, self.batch_size)
+        stats.batches = len(batches)
+        stats.tokens = int(sum(lengths))
+        stats.padded_tokens = int(sum(len(idx) * max(lengths[i] for i in idx) for idx in batches))
+
+        if self.workers >= 2 and len(batches) >= 2:
+            stats.workers = min(self.workers, len(batches))
+            out = self._encode_sharded(texts, batches, dim, stats.workers)
+        else:
+            out = np.empty((len(texts), dim), dtype="float32")
+            for idx in batches:
+                out[idx] = self.backend.encode([texts[i] for i in idx], batch_size=len(idx))
+
+        stats.seconds = time.perf_counter() - start
+        logger.info(
+            "Bulk encoded %d chunks in %.2fs (%.1f chunks/sec, %d batches, padding %.1f%%, workers=%d)",
+            stats.items, stats.seconds, stats.chunks_per_sec, stats.batches,
+            stats.padding_ratio * 100, stats.workers,
+        )
+        return out, stats
+
+    def _token_lengths(self, texts: List[str]) -> List[int]:
+        fn = getattr(self.backend, "token_lengths", None)
+        if fn is None:
+            return [len(t) for t in texts]
+        return list(fn(texts))
+
+    def _encode_sharded(
+        self,
+        texts: List[str],
+        batches: List[np.ndarray],
+        dim: int,
+        workers: int,
+    ) -> np.ndarray:
+        shape = (len(texts), dim)
+        shm = SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+        try:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(self.backend.spec(),),
+            ) as pool:
+                futures = [
+                    pool.submit(
+                        _encode_into_shared,
+                        shm.name,
+                        shape,
+                        idx.tolist(),
+                        [texts[i] for i in idx],
+                    )
+                    for idx in batches
+                ]
+                for f in futures:
+                    f.result()
+            return np.ndarray(shape, dtype="float32", buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+# ── ワーカープロセス側 ──
+
+_worker_backend = None
+
+
+def _init_worker(spec: dict) -> None:
+    global _worker_backend
+    spec = dict(spec)
+    _worker_backend = create_backend(spec.pop("backend"), spec.pop("model_name"), **spec)
+
+
+def _encode_into_shared(shm_name: str, shape: tuple, indices: List[int], texts: List[str]) -> int:
+    shm = SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray(shape, dtype="float32", buffer=shm.buf)
+        out[indices] = _worker_backend.encode(texts, batch_size=len(texts))
+        del out
+    finally:
+        shm.close()
+    return len(texts)
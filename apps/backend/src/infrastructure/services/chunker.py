@@ -0,0 +1,177 @@
+import re
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Protocol, Tuple
+
+# 文末: 日本語の句点・感嘆符・疑問符（閉じ括弧を含む）、英語の . ! ? ＋空白、または改行
+_SENTENCE_END = re.compile(r"[。．！？!?][」』）)\"']*|[.](?=\s)|\n")
+# 段落区切り: 空行
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t　]*\n")
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """本文中のチャンク。start / end は本文に対する文字オフセット"""
+    text: str
+    start: int
+    end: int
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class TokenCounter(Protocol):
+    def count(self, text: str) -> int:
+        ...
+
+    def split(self, text: str, max_tokens: int) -> List[Tuple[int, int]]:
+        """text を max_tokens 以下に区切った文字スパンを返す"""
+        ...
+
+
+class CharTokenCounter:
+    """トークナイザが使えないときの代替（1 文字 = 1 トークンとみなす）"""
+
+    def count(self, text: str) -> int:
+        return len(text)
+
+    def split(self, text: str, max_tokens: int) -> List[Tuple[int, int]]:
+        return [(i, min(i + max_tokens, len(text))) for i in range(0, len(text), max_tokens)]
+
+
+class HFTokenCounter:
+    """HuggingFace の fast tokenizer でトークン数を数え、オフセットで分割する"""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def split(self, text: str, max_tokens: int) -> List[Tuple[int, int]]:
+        offsets = self.tokenizer(
+            text, add_special_tokens=False, return_offsets_mapping=True
+        )["offset_mapping"]
+        # max_tokens ごとのトークン先頭位置で切る（隙間の空白は前のスパンに含める）
+        cuts = [offsets[i][0] for i in range(max_tokens, len(offsets), max_tokens)]
+        bounds = [0] + cuts + [len(text)]
+        return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+
+def counter_for(tokenizer) -> TokenCounter:
+    """offset_mapping が取れる fast tokenizer なら HFTokenCounter、それ以外は文字数"""
+    if tokenizer is not None and getattr(tokenizer, "is_fast", False):
+        return HFTokenCounter(tokenizer)
+    return CharTokenCounter()
+
+
+def split_sentences(text: str) -> List[Tuple[int, int, bool]]:
+    """
+    本文を文単位のスパンに分ける → List[(start, end, 段落末か)]
+    前後の空白はスパンから除く。
+    """
+    paragraph_ends = {m.start() for m in _PARAGRAPH_BREAK.finditer(text)}
+    spans: List[Tuple[int, int, bool]] = []
+    pos = 0
+    for m in _SENTENCE_END.finditer(text):
+        end = m.end()
+        _append_span(text, pos, end, spans, m.start() in paragraph_ends)
+        pos = end
+    _append_span(text, pos, len(text), spans, True)
+    return spans
+
+
+def _append_span(text: str, start: int, end: int, spans: list, para_end: bool) -> None:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if start < end:
+        spans.append((start, end, para_end))
+    elif spans and para_end:
+        s, e, _ = spans[-1]
+        spans[-1] = (s, e, True)
+
+
+class TextChunker:
+    """
+    トークン予算つきチャンカー
+    - 文・段落の境界で区切り、1 チャンクを max_tokens 以下に収める
+    - 直前チャンク末尾の文を overlap_tokens まで次のチャンクに重ねる
+    - 予算を超える長文はトークン境界で強制分割する
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 300,
+        overlap_tokens: int = 0,
+        counter: Optional[TokenCounter] = None,
+    ):
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be >= 1")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = max(0, min(overlap_tokens, max_tokens - 1))
+        self.counter = counter or CharTokenCounter()
+
+    def split(self, text: str) -> List[Chunk]:
+        chunks: List[Chunk] = []
+        current: List[Tuple[int, int, int]] = []  # (start, end, tokens)
+        used = 0
+        carried = 0  # current のうち前チャンクから重ねた単位数
+
+        def flush() -> None:
+            start, end = current[0][0], current[-1][1]
+            chunks.append(Chunk(text[start:end], start, end))
+
+        for start, end, tokens, para_end in self._units(text):
+            if current and used + tokens > self.max_tokens:
+                if len(current) > carried:
+                    flush()
+                    current, used = self._overlap(current)
+                    carried = len(current)
+                # 重ねた分と合わせて予算を超えるなら重ねない
+                if used + tokens > self.max_tokens:
+                    current, used, carried = [], 0, 0
+            current.append((start, end, tokens))
+            used += tokens
+            # 段落末で半分以上埋まっていればそこで切る
+            if para_end and used >= self.max_tokens // 2:
+                flush()
+                current, used = self._overlap(current)
+                carried = len(current)
+        if len(current) > carried:
+            flush()
+        return chunks
+
+    def _units(self, text: str) -> List[Tuple[int, int, int, bool]]:
+        """文スパンにトークン数を付け、予算超えの文は分割しておく"""
+        units = []
+        for start, end, para_end in split_sentences(text):
+            tokens = self.counter.count(text[start:end])
+            if tokens <= self.max_tokens:
+                units.append((start, end, tokens, para_end))
+                continue
+            pieces = self.counter.split(text[start:end], self.max_tokens)
+            for i, (s, e) in enumerate(pieces):
+                s, e = start + s, start + e
+                while s < e and text[s].isspace():
+                    s += 1
+                while e > s and text[e - 1].isspace():
+                    e -= 1
+                if s < e:
+                    units.append((
+                        s, e, self.counter.count(text[s:e]),
+                        para_end and i == len(pieces) - 1,
+                    ))
+        return units
+
+    def _overlap(self, current: List[Tuple[int, int, int]]) -> Tuple[list, int]:
+        if not self.overlap_tokens:
+            return [], 0
+        tail: List[Tuple[int, int, int]] = []
+        used = 0
+        for unit in reversed(current):
+            if used + unit[2] > self.overlap_tokens:
+                break
+            tail.insert(0, unit)
+            used += unit[2]
+        return tail, used
@@ -1,62 +1,269 @@
 import os
 import numpy as np
-from typing import List, Tuple, Union
-from sentence_transformers import SentenceTransformer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from infrastructure.services.bulk_encoder import BulkEncodeStats, BulkEncoder
+from infrastructure.services.chunker import Chunk, TextChunker, counter_for
+from infrastructure.services.embedding_cache import (
+    DiskEmbeddingCache,
+    LRUEmbeddingCache,
+    cache_key,
+)
+from infrastructure.services.inference_backends import InferenceBackend, TorchBackend
+from infrastructure.services.model_registry import ModelRegistry, model_registry
+from infrastructure.services.query_batcher import QueryBatcher
 
 class EmbedderService:
-    def __init__(self, model_name: str | None = None):
+    def __init__(
+        self,
+        model_name: str | None = None,
+        cache_dir: Union[str, Path, None] = None,
+        query_cache_bytes: int = 64 * 1024 * 1024,
+        batch_max_size: int = 32,
+        batch_max_wait_ms: float = 5.0,
+        registry: ModelRegistry | None = None,
+        backend: InferenceBackend | None = None,
+        bulk_batch_size: int = 128,
+        bulk_workers: int = 0,
+        chunk_size: int = 300,
+        chunk_overlap: int = 0,
+    ):
         model_name = model_name or os.getenv("MODEL_NAME", "sentence-transformers/LaBSE")
-        os.environ.setdefault("OMP_NUM_THREADS", "1")
-        os.environ.setdefault("MKL_NUM_THREADS", "1")
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        # モデル本体は共有レジストリから初回利用時に取得する
+        self._registry = registry or model_registry
+        # 推論バックエンド（既定は PyTorch、設定で ONNX Runtime に差し替え）
+        self._backend = backend or TorchBackend(model_name, self._registry)
+        # バックエンドごとに出力が僅かに異なるため、キャッシュキーも分ける
+        if self._backend.cache_tag == "torch":
+            self._model_key = model_name
+        else:
+            self._model_key = f"{model_name}#{self._backend.cache_tag}"
+
+        # 1 段目: クエリ用インメモリ LRU / 2 段目: チャンク用ディスクキャッシュ
+        self._query_cache = LRUEmbeddingCache(max_bytes=query_cache_bytes)
+        self._cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._disk_cache_obj: Optional[DiskEmbeddingCache] = None
+
+        # 再構築向けの一括エンコード（長さバケット化・任意でマルチプロセス）
+        self._bulk = BulkEncoder(self._backend, batch_size=bulk_batch_size, workers=bulk_workers)
+        self._bulk_stats: Optional[BulkEncodeStats] = None
+
+        # チャンク分割のトークン予算（モデルの最大系列長でさらに頭打ちにする）
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._chunkers: Dict[int, TextChunker] = {}
+
+        # 同時クエリをまとめて 1 回の forward に流すバッチャ
+        self._batcher = QueryBatcher(
+            self.encode,
+            max_batch_size=batch_max_size,
+            max_wait_ms=batch_max_wait_ms,
+        )
+
+    @property
+    def model(self):
+        """PyTorch の SentenceTransformer 本体（共有レジストリ経由）"""
+        return self._registry.get(self.model_name)
+
+    @property
+    def backend(self) -> InferenceBackend:
+        return self._backend
+
+    def dimension(self) -> int:
+        return self._backend.dimension()
+
+    @property
+    def _disk_cache(self) -> Optional[DiskEmbeddingCache]:
+        # 次元数がモデルから決まるため、ディスクキャッシュも初回利用時に開く
+        if self._cache_dir is not None and self._disk_cache_obj is None:
+            self._disk_cache_obj = DiskEmbeddingCache(
+                self._cache_dir / self._cache_namespace(),
+                dim=self.dimension(),
+            )
+        return self._disk_cache_obj
+
+    def warm_up(self) -> None:
+        """モデルをロードし、ダミー入力で 1 回 forward して初回遅延を潰す"""
+        self._encode_model(["warm-up"])
 
-    def encode(self, texts: Union[str, List[str]]) -> np.ndarray:
+    async def aencode(self, text: str) -> np.ndarray:
+        """
+        クエリ 1 件を非同期にベクトル化する。
+        キャッシュにあれば即返し、なければマイクロバッチ経由でモデルに通す。
+        """
+        key = cache_key(self._model_key, text)
+        if key in self._query_cache:
+            vec = self._query_cache.get(key)
+            if vec is not None:
+                return vec.copy()
+        return await self._batcher.submit(text)
+
+    async def aclose(self) -> None:
+        await self._batcher.close()
+
+    def encode(
+        self,
+        texts: Union[str, List[str]],
+        persist: bool = False,
+    ) -> np.ndarray:
+        """
+        テキストを L2 正規化済みベクトルに変換する。
+        (モデル名, 正規化テキスト) をキーにキャッシュを引き、未ヒット分だけモデルに通す。
+        persist=True ならディスクキャッシュにも書き込む（チャンク埋め込み用）。
+        """
         # 単一文字列ならリスト化して最後に剥がすフラグを立てる
         single = False
         if isinstance(texts, str):
             texts = [texts]
             single = True
 
-        # モデルで常にバッチ（2D）を返してもらう
-        emb = self.model.encode(
-            texts,
-            convert_to_numpy=True,
-            normalize_embeddings=False
-        ).astype("float32")  # shape = (batch, dim)
+        emb = self._encode_cached(texts, persist, self._encode_model)
 
+        # 単一入力なら 1D に戻して返す
+        return emb[0] if single else emb
+
+    def encode_bulk(self, texts: List[str], persist: bool = False) -> np.ndarray:
+        """
+        大量テキスト（再構築・一括ベクトル化）用の encode。
+        キャッシュ未ヒット分をトークン長でバケット化し、大きなバッチで推論する。
+        """
+        return self._encode_cached(list(texts), persist, self._encode_model_bulk)
+
+    def _encode_cached(self, texts: List[str], persist: bool, compute) -> np.ndarray:
+        keys = [cache_key(self._model_key, t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        for k in dict.fromkeys(keys):
+            vec = self._query_cache.get(k)
+            if vec is not None:
+                found[k] = vec
+        if self._disk_cache is not None:
+            rest = [k for k in dict.fromkeys(keys) if k not in found]
+            if rest:
+                for k, vec in self._disk_cache.get_many(rest).items():
+                    found[k] = vec
+                    self._query_cache.put(k, vec)
+
+        # 未ヒット分（重複除去）だけモデルで計算
+        miss = {k: t for k, t in zip(keys, texts) if k not in found}
+        if miss:
+            computed = compute(list(miss.values()))
+            fresh = dict(zip(miss.keys(), computed))
+            for k, vec in fresh.items():
+                self._query_cache.put(k, vec)
+            if persist and self._disk_cache is not None:
+                self._disk_cache.put_many(fresh)
+            found.update(fresh)
+
+        if not keys:
+            return np.empty((0, self.dimension()), dtype="float32")
+        return np.stack([found[k] for k in keys]).astype("float32")
+
+    def _encode_model(self, texts: List[str]) -> np.ndarray:
+        # バックエンドで常にバッチ（2D）を返してもらう
+        emb = self._backend.encode(texts)  # shape = (batch, dim)
+        return self._normalize(emb)
+
+    def _encode_model_bulk(self, texts: List[str]) -> np.ndarray:
+        emb, self._bulk_stats = self._bulk.encode(texts)
+        return self._normalize(emb)
+
+    @staticmethod
+    def _normalize(emb: np.ndarray) -> np.ndarray:
         # 2D 前提で正規化
         norms = np.linalg.norm(emb, axis=1, keepdims=True)
-        emb = emb / np.clip(norms, a_min=1e-12, a_max=None)
+        return emb / np.clip(norms, a_min=1e-12, a_max=None)
 
-        # 単一入力なら 1D に戻して返す
-        return emb[0] if single else emb
+    def cache_stats(self) -> dict:
+        """キャッシュのヒット／ミス統計"""
+        stats = {
+            "query": {
+                **self._query_cache.stats.to_dict(),
+                "entries": len(self._query_cache),
+                "bytes": self._query_cache.nbytes,
+            },
+        }
+        if self._disk_cache_obj is not None:
+            stats["disk"] = {
+                **self._disk_cache_obj.stats.to_dict(),
+                "entries": len(self._disk_cache_obj),
+            }
+        return stats
+
+    def batcher_stats(self) -> dict:
+        """クエリマイクロバッチの統計（キュー深さ・バッチサイズ）"""
+        return self._batcher.stats()
+
+    def bulk_stats(self) -> Optional[dict]:
+        """直近の一括エンコードの統計（chunks/sec・パディング率など）"""
+        return self._bulk_stats.to_dict() if self._bulk_stats is not None else None
 
-    def chunk_text(self, text: str, max_length: int = 500) -> List[str]:
+    def backend_info(self) -> dict:
+        """推論バックエンドの種別・設定"""
+        info = getattr(self._backend, "info", None)
+        return info() if info is not None else {"backend": self._backend.cache_tag}
+
+    def _cache_namespace(self) -> str:
+        """モデル（とバックエンド）ごとにディスクキャッシュのディレクトリを分ける"""
+        return self._model_key.replace("/", "__").replace("#", "__")
+
+    def _chunker(self, max_tokens: Optional[int] = None) -> TextChunker:
+        budget = max_tokens or self.chunk_size
+        max_seq = getattr(self._backend, "max_seq_length", None)
+        limit = max_seq() if max_seq is not None else None
+        if limit:
+            # [CLS] / [SEP] 分を残して、モデルに黙って切り捨てられないようにする
+            budget = min(budget, limit - 2)
+        chunker = self._chunkers.get(budget)
+        if chunker is None:
+            get_tokenizer = getattr(self._backend, "tokenizer", None)
+            tokenizer = get_tokenizer() if get_tokenizer is not None else None
+            chunker = TextChunker(budget, self.chunk_overlap, counter_for(tokenizer))
+            self._chunkers[budget] = chunker
+        return chunker
+
+    def split_chunks(self, text: str, max_length: Optional[int] = None) -> List[Chunk]:
+        """
+        本文をトークン予算（既定は chunk_size）以下のチャンクに分割し、本文中のオフセットつきで返す
+        """
+        return self._chunker(max_length).split(text)
+
+    def chunk_text(self, text: str, max_length: Optional[int] = None) -> List[str]:
         """
-        本文を max_length 文字以下のチャンクに分割
+        本文をトークン予算（既定は chunk_size）以下のチャンク文字列に分割
         """
-        chunks: List[str] = []
-        current = ""
-        for line in text.splitlines(keepends=True):
-            if len(current) + len(line) <= max_length:
-                current += line
-            else:
-                chunks.append(current.strip())
-                current = line
-        if current.strip():
-            chunks.append(current.strip())
-        return chunks
+        return [c.text for c in self.split_chunks(text, max_length)]
 
     def encode_chunks(
         self,
         text: str,
-        max_length: int = 500
+        max_length: Optional[int] = None
     ) -> List[Tuple[str, np.ndarray]]:
         """
         1) text をチャンクに分割
-        2) 各チャンクをベクトル化
+        2) 各チャンクをベクトル化（内容ハッシュで永続キャッシュ）
         → List[(chunk_text, vector)]
         """
         chunks = self.chunk_text(text, max_length)
-        embeddings = self.encode(chunks)  # np.ndarray, shape=(n_chunks, dim)
+        embeddings = self.encode(chunks, persist=True)  # np.ndarray, shape=(n_chunks, dim)
         return list(zip(chunks, embeddings))
+
+    def encode_chunks_many(
+        self,
+        texts: List[str],
+        max_length: Optional[int] = None
+    ) -> List[List[Tuple[Chunk, np.ndarray]]]:
+        """
+        複数メモの本文をまとめてチャンク化し、全チャンクを 1 回の一括エンコードに流す
+        → メモごとの List[(Chunk, vector)]
+        """
+        per_memo = [self.split_chunks(t, max_length) for t in texts]
+        flat = [c.text for chunks in per_memo for c in chunks]
+        embeddings = self.encode_bulk(flat, persist=True)
+        result: List[List[Tuple[Chunk, np.ndarray]]] = []
+        pos = 0
+        for chunks in per_memo:
+            result.append(list(zip(chunks, embeddings[pos:pos + len(chunks)])))
+            pos += len(chunks)
+        return result
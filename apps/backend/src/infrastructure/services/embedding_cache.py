@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+
+from infrastructure.persistence.embedding_store import EmbeddingStore
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """キャッシュキー用の正規化（NFKC＋前後空白除去＋連続空白の畳み込み）"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def cache_key(model_name: str, text: str) -> str:
+    """(モデル名, 正規化テキスト) のハッシュ"""
+    payload = f"{model_name}\0{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "hit_ratio": self.hit_ratio}
+
+
+class LRUEmbeddingCache:
+    """
+    バイト数上限つきのインメモリ LRU
+    - クエリ埋め込みの再計算を避ける用途
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._data: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._data.get(key)
+            if vec is None:
+                self.stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return vec
+
+    def put(self, key: str, vec: np.ndarray) -> None:
+        if vec.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._nbytes -= old.nbytes
+            self._data[key] = vec
+            self._nbytes += vec.nbytes
+            while self._nbytes > self.max_bytes and self._data:
+                _, evicted = self._data.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+
+
+class DiskEmbeddingCache:
+    """
+    チャンク埋め込みの永続キャッシュ
+    - キー（内容ハッシュ）→ベクトルを EmbeddingStore に追記保存
+    - 変更のない本文を再ベクトル化するときはモデルを通さない
+    """
+
+    def __init__(self, cache_dir: Union[str, Path], dim: int):
+        self.store = EmbeddingStore(cache_dir, dim=dim)
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        keys = list(keys)
+        found = self.store.get_many(keys)
+        self.stats.hits += len(found)
+        self.stats.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        new = [(k, v) for k, v in items.items() if k not in self.store]
+        if new:
+            self.store.put_many(new)
@@ -0,0 +1,206 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from infrastructure.services import score_fusion
+from infrastructure.services.score_fusion import FusionConfig
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FusionEvalRow:
+    """1 設定分の評価結果（全クエリの平均）"""
+    method: str
+    semantic_weight: float
+    elastic_weight: float
+    ndcg: float
+    mrr: float
+    recall: float
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class QueryRun:
+    """
+    ラベル付きクエリ 1 件分の融合前の候補
+    semantic / elastic は [(メモUUID, スコア)]（スコア降順）、relevant は正解 UUID
+    """
+    query: str
+    relevant: List[str]
+    semantic: List[tuple]
+    elastic: List[tuple]
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "QueryRun":
+        return cls(
+            query=d["query"],
+            relevant=list(d.get("relevant", [])),
+            semantic=[tuple(x) for x in d.get("semantic", [])],
+            elastic=[tuple(x) for x in d.get("elastic", [])],
+        )
+
+
+def load_jsonl(path: Path) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def ndcg_at_k(ranked: Sequence[str], relevant: Iterable[str], k: int) -> float:
+    relevant = set(relevant)
+    if not relevant:
+        return 0.0
+    gains = [1.0 / math.log2(i + 2) for i, u in enumerate(ranked[:k]) if u in relevant]
+    ideal = sum(1.0 / math.log2(i + 2) for i in range(min(len(relevant), k)))
+    return sum(gains) / ideal
+
+
+def mrr_at_k(ranked: Sequence[str], relevant: Iterable[str], k: int) -> float:
+    relevant = set(relevant)
+    for i, u in enumerate(ranked[:k]):
+        if u in relevant:
+            return 1.0 / (i + 1)
+    return 0.0
+
+
+def recall_at_k(ranked: Sequence[str], relevant: Iterable[str], k: int) -> float:
+    relevant = set(relevant)
+    if not relevant:
+        return 0.0
+    return len(relevant.intersection(ranked[:k])) / len(relevant)
+
+
+def evaluate(runs: Sequence[QueryRun], config: FusionConfig, k: int) -> FusionEvalRow:
+    """1 つの融合設定で全クエリを融合し、nDCG / MRR / Recall の平均を返す"""
+    scores = np.zeros((len(runs), 3))
+    for row, run in enumerate(runs):
+        ranked = [u for u, _ in score_fusion.fuse(run.semantic, run.elastic, k, config)]
+        scores[row] = (
+            ndcg_at_k(ranked, run.relevant, k),
+            mrr_at_k(ranked, run.relevant, k),
+            recall_at_k(ranked, run.relevant, k),
+        )
+    ndcg, mrr, recall = scores.mean(axis=0) if len(runs) else (0.0, 0.0, 0.0)
+    return FusionEvalRow(
+        method=config.method,
+        semantic_weight=config.semantic_weight,
+        elastic_weight=config.elastic_weight,
+        ndcg=float(ndcg),
+        mrr=float(mrr),
+        recall=float(recall),
+    )
+
+
+def grid_report(
+    runs: Sequence[QueryRun],
+    k: int = 10,
+    methods: Sequence[str] = score_fusion.FUSION_METHODS,
+    semantic_weights: Sequence[float] = (0.0, 0.2, 0.4, 0.5, 0.6, 0.8, 1.0),
+    rrf_k: int = 60,
+) -> List[FusionEvalRow]:
+    """融合方式 × セマンティック側の重み（全文検索側は 1 - w）を総当たりし、nDCG の降順で返す"""
+    rows = [
+        evaluate(runs, FusionConfig(method, w, 1.0 - w, rrf_k), k)
+        for method in methods
+        for w in semantic_weights
+    ]
+    return sorted(rows, key=lambda r: (r.ndcg, r.mrr), reverse=True)
+
+
+async def collect_runs(uc, labelled: Sequence[dict], depth: int = 100) -> List[QueryRun]:
+    """
+    HybridSearchUseCase.retrieve で、ラベル付きクエリごとの融合前の候補を集める
+    （一度集めれば融合方式・重みの比較は検索エンジンなしで何度でもやり直せる）
+    """
+    runs: List[QueryRun] = []
+    for item in labelled:
+        best, es_hits = await uc.retrieve(item["query"], depth)
+        runs.append(QueryRun(
+            query=item["query"],
+            relevant=list(item.get("relevant", [])),
+            semantic=sorted(((u, s) for u, (_, s) in best.items()), key=lambda x: x[1], reverse=True),
+            elastic=[(m.uuid, float(s)) for m, s in es_hits],
+        ))
+    return runs
+
+
+def print_report(rows: List[FusionEvalRow], n_queries: int, k: int) -> None:
+    print(f"queries={n_queries} k={k}")
+    print(f"{'method':<8} {'w_sem':>6} {'w_es':>6} {'nDCG@k':>8} {'MRR@k':>8} {'R@k':>8}")
+    for r in rows:
+        print(
+            f"{r.method:<8} {r.semantic_weight:>6.2f} {r.elastic_weight:>6.2f} "
+            f"{r.ndcg:>8.4f} {r.mrr:>8.4f} {r.recall:>8.4f}"
+        )
+
+
+async def _collect(labels: Path, out: Path, depth: int) -> None:
+    from app.container import Container
+    from usecases.hybrid_search import HybridSearchUseCase
+
+    container = Container()
+    try:
+        uc = HybridSearchUseCase(
+            chunk_repo=container.faiss_chunk_repo,
+            elastic_repo=container.elastic_repo,
+            embedder=container.embedder,
+            memo_repo=container.memo_repo,
+        )
+        runs = await collect_runs(uc, load_jsonl(labels), depth)
+    finally:
+        await container.close()
+    with open(out, "w", encoding="utf-8") as f:
+        for run in runs:
+            f.write(json.dumps(asdict(run), ensure_ascii=False) + "\n")
+    logger.info("Collected %d query runs into %s", len(runs), out)
+
+
+def _main(argv: Optional[List[str]] = None) -> None:
+    """
+    ラベル付きクエリでハイブリッド検索の融合方式と重みを比較する
+    1. 候補の収集（FAISS・Elasticsearch を使う）:
+       python -m infrastructure.services.fusion_eval collect --labels labels.jsonl --out runs.jsonl
+       labels.jsonl の各行: {"query": "...", "relevant": ["メモUUID", ...]}
+    2. 融合の比較（検索エンジン不要）:
+       python -m infrastructure.services.fusion_eval grid --runs runs.jsonl --k 10
+    """
+    parser = argparse.ArgumentParser(description=_main.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    collect = sub.add_parser("collect")
+    collect.add_argument("--labels", required=True)
+    collect.add_argument("--out", required=True)
+    collect.add_argument("--depth", type=int, default=100, help="系統ごとに集める候補数")
+    grid = sub.add_parser("grid")
+    grid.add_argument("--runs", required=True)
+    grid.add_argument("--k", type=int, default=10)
+    grid.add_argument("--methods", default=",".join(score_fusion.FUSION_METHODS))
+    grid.add_argument("--weights", default="0,0.2,0.4,0.5,0.6,0.8,1", help="セマンティック側の重み")
+    grid.add_argument("--rrf-k", type=int, default=60)
+    args = parser.parse_args(argv)
+
+    if args.command == "collect":
+        asyncio.run(_collect(Path(args.labels), Path(args.out), args.depth))
+        return
+    runs = [QueryRun.from_dict(d) for d in load_jsonl(Path(args.runs))]
+    rows = grid_report(
+        runs,
+        k=args.k,
+        methods=args.methods.split(","),
+        semantic_weights=[float(x) for x in args.weights.split(",")],
+        rrf_k=args.rrf_k,
+    )
+    print_report(rows, len(runs), args.k)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    _main()
@@ -0,0 +1,434 @@
+import argparse
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Optional, Protocol, Sequence, Union
+
+import numpy as np
+
+from infrastructure.services.model_registry import ModelRegistry, model_registry
+
+logger = logging.getLogger(__name__)
+
+# ONNX 変換後にパリティ検証で使う文（日英混在）
+PARITY_SAMPLES = [
+    "今日は良い天気です。",
+    "FAISS を使ったベクトル検索の設定メモ",
+    "The quick brown fox jumps over the lazy dog.",
+    "Semantic search over personal notes.",
+    "議事録: 来週のリリース計画について",
+]
+
+
+class InferenceBackend(Protocol):
+    """テキスト→埋め込み（未正規化）の推論バックエンド"""
+
+    name: str
+
+    @property
+    def cache_tag(self) -> str:
+        ...
+
+    def dimension(self) -> int:
+        ...
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        ...
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        ...
+
+    def tokenizer(self):
+        ...
+
+    def max_seq_length(self) -> Optional[int]:
+        ...
+
+    def spec(self) -> dict:
+        ...
+
+
+class TorchBackend:
+    """
+    共有レジストリの SentenceTransformer（PyTorch）で推論する
+    num_threads > 0 なら torch.set_num_threads で intra-op スレッド数を指定する（0 はランタイム既定）
+    """
+
+    name = "torch"
+
+    def __init__(
+        self,
+        model_name: str,
+        registry: Optional[ModelRegistry] = None,
+        num_threads: int = 0,
+    ):
+        self.model_name = model_name
+        self.num_threads = num_threads
+        self._registry = registry or model_registry
+        if num_threads > 0:
+            import torch
+
+            torch.set_num_threads(num_threads)
+
+    @property
+    def cache_tag(self) -> str:
+        return "torch"
+
+    @property
+    def model(self):
+        return self._registry.get(self.model_name)
+
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=False,
+        ).astype("float32")
+
+    def tokenizer(self):
+        return getattr(self.model, "tokenizer", None)
+
+    def max_seq_length(self) -> Optional[int]:
+        return getattr(self.model, "max_seq_length", None)
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        tokenizer = self.tokenizer()
+        if tokenizer is None:
+            return [len(t) for t in texts]
+        ids = tokenizer(
+            texts, truncation=True, max_length=self.model.max_seq_length
+        )["input_ids"]
+        return [len(i) for i in ids]
+
+    def spec(self) -> dict:
+        """別プロセスで同じバックエンドを組み立てるための create_backend 引数"""
+        return {"backend": "torch", "model_name": self.model_name, "torch_threads": self.num_threads}
+
+
+class OnnxBackend:
+    """
+    ONNX Runtime（CPU）で推論するバックエンド
+    - 初回利用時に SentenceTransformer 全体（pooling / dense 層込み）を ONNX へエクスポート
+    - quantize=True なら重みを動的 int8 量子化したモデルを使う
+    - エクスポート直後に PyTorch 出力とのコサイン類似度でパリティ検証する
+    """
+
+    name = "onnx"
+
+    _MODEL_FILE = "model.onnx"
+    _QUANTIZED_FILE = "model.int8.onnx"
+    _META_FILE = "meta.json"
+
+    def __init__(
+        self,
+        model_name: str,
+        model_dir: Union[str, Path],
+        quantize: bool = True,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0,
+        registry: Optional[ModelRegistry] = None,
+        parity_threshold: float = 0.99,
+    ):
+        self.model_name = model_name
+        self.model_dir = Path(model_dir)
+        self.quantize = quantize
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.parity_threshold = parity_threshold
+        self._registry = registry or model_registry
+
+        self._session = None
+        self._tokenizer = None
+        self._meta: dict = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cache_tag(self) -> str:
+        return "onnx-int8" if self.quantize else "onnx"
+
+    @property
+    def model_path(self) -> Path:
+        return self.model_dir / (self._QUANTIZED_FILE if self.quantize else self._MODEL_FILE)
+
+    def dimension(self) -> int:
+        self._ensure_session()
+        return int(self._meta["dim"])
+
+    def info(self) -> dict:
+        return {
+            "backend": self.cache_tag,
+            "model_path": str(self.model_path),
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+            "parity": self._meta.get("parity", {}).get(self.cache_tag),
+        }
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        session = self._ensure_session()
+        input_names = self._meta["input_names"]
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            features = self._tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self._meta["max_seq_length"],
+                return_tensors="np",
+            )
+            feed = {name: features[name].astype("int64") for name in input_names}
+            outputs.append(session.run(None, feed)[0])
+        if not outputs:
+            return np.empty((0, self.dimension()), dtype="float32")
+        return np.concatenate(outputs).astype("float32")
+
+    def tokenizer(self):
+        self._ensure_session()
+        return self._tokenizer
+
+    def max_seq_length(self) -> Optional[int]:
+        self._ensure_session()
+        return self._meta.get("max_seq_length")
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        self._ensure_session()
+        ids = self._tokenizer(
+            texts, truncation=True, max_length=self._meta["max_seq_length"]
+        )["input_ids"]
+        return [len(i) for i in ids]
+
+    def spec(self) -> dict:
+        return {
+            "backend": "onnx",
+            "model_name": self.model_name,
+            "onnx_dir": str(self.model_dir),
+            "quantize": self.quantize,
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+        }
+
+    # ── 初期化 ──
+
+    def _ensure_session(self):
+        if self._session is not None:
+            return self._session
+        with self._lock:
+            if self._session is None:
+                try:
+                    import onnxruntime as ort
+                    from transformers import AutoTokenizer
+                except ImportError as e:
+                    raise RuntimeError(
+                        "ONNX backend requires onnxruntime (pip install onnxruntime onnx)"
+                    ) from e
+
+                exported = self._ensure_exported()
+                self._meta = json.loads((self.model_dir / self._META_FILE).read_text())
+
+                opts = ort.SessionOptions()
+                opts.intra_op_num_threads = self.intra_op_threads
+                opts.inter_op_num_threads = self.inter_op_threads
+                opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                self._tokenizer = AutoTokenizer.from_pretrained(str(self.model_dir))
+                self._session = ort.InferenceSession(
+                    str(self.model_path), opts, providers=["CPUExecutionProvider"]
+                )
+                logger.info(
+                    "ONNX session ready: %s (intra=%d, inter=%d)",
+                    self.model_path, self.intra_op_threads, self.inter_op_threads,
+                )
+                if exported:
+                    self._verify_parity()
+        return self._session
+
+    def _ensure_exported(self) -> bool:
+        """必要ならエクスポート・量子化する。新たに生成したら True"""
+        fp32_path = self.model_dir / self._MODEL_FILE
+        created = False
+        if not fp32_path.exists():
+            export_onnx(self._registry.get(self.model_name), self.model_dir)
+            created = True
+        if self.quantize and not self.model_path.exists():
+            quantize_onnx(fp32_path, self.model_path)
+            created = True
+        return created
+
+    def _verify_parity(self) -> None:
+        report = check_parity(
+            TorchBackend(self.model_name, self._registry), self, PARITY_SAMPLES
+        )
+        meta_path = self.model_dir / self._META_FILE
+        meta = json.loads(meta_path.read_text())
+        meta.setdefault("parity", {})[self.cache_tag] = asdict(report)
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2))
+        self._meta = meta
+        if report.min_cosine < self.parity_threshold:
+            logger.warning(
+                "ONNX parity below threshold: min cosine %.4f < %.4f",
+                report.min_cosine, self.parity_threshold,
+            )
+        else:
+            logger.info("ONNX parity ok: min cosine %.4f", report.min_cosine)
+
+
+def export_onnx(st_model, out_dir: Union[str, Path], opset: int = 17) -> Path:
+    """
+    SentenceTransformer を pooling / dense / normalize 層込みで ONNX にエクスポートする。
+    トークナイザとメタ情報（次元・入力名・最大長）も同じディレクトリに保存する。
+    """
+    import torch
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_path = out_dir / OnnxBackend._MODEL_FILE
+
+    st_model = st_model.to("cpu").eval()
+    features = st_model.tokenize(["hello world"])
+    input_names = [
+        n for n in ("input_ids", "attention_mask", "token_type_ids") if n in features
+    ]
+
+    class _Wrapper(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(dict(zip(input_names, inputs)))["sentence_embedding"]
+
+    dynamic_axes = {n: {0: "batch", 1: "sequence"} for n in input_names}
+    dynamic_axes["sentence_embedding"] = {0: "batch"}
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False
+
+    start = time.perf_counter()
+    with torch.no_grad():
+        torch.onnx.export(
+            _Wrapper(st_model),
+            tuple(features[n] for n in input_names),
+            str(out_path),
+            input_names=input_names,
+            output_names=["sentence_embedding"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            **kwargs,
+        )
+    st_model.tokenizer.save_pretrained(str(out_dir))
+    meta = {
+        "dim": st_model.get_sentence_embedding_dimension(),
+        "input_names": input_names,
+        "max_seq_length": st_model.max_seq_length,
+    }
+    (out_dir / OnnxBackend._META_FILE).write_text(json.dumps(meta, indent=2))
+    logger.info("Exported ONNX model to %s in %.1fs", out_path, time.perf_counter() - start)
+    return out_path
+
+
+def quantize_onnx(src: Union[str, Path], dst: Union[str, Path]) -> Path:
+    """重みを動的 int8 量子化する（活性はランタイムで量子化）"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(str(src), str(dst), weight_type=QuantType.QInt8)
+    logger.info("Quantized ONNX model written to %s", dst)
+    return Path(dst)
+
+
+@dataclass
+class ParityReport:
+    n: int
+    min_cosine: float
+    mean_cosine: float
+
+    def passed(self, threshold: float = 0.99) -> bool:
+        return self.min_cosine >= threshold
+
+
+def check_parity(
+    reference: InferenceBackend,
+    candidate: InferenceBackend,
+    texts: Sequence[str] = PARITY_SAMPLES,
+) -> ParityReport:
+    """同じ入力に対する 2 バックエンドの出力をコサイン類似度で比較する"""
+    texts = list(texts)
+    a = reference.encode(texts)
+    b = candidate.encode(texts)
+    a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+    b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+    cos = np.sum(a * b, axis=1)
+    return ParityReport(n=len(texts), min_cosine=float(cos.min()), mean_cosine=float(cos.mean()))
+
+
+def create_backend(
+    backend: str,
+    model_name: str,
+    onnx_dir: Union[str, Path, None] = None,
+    quantize: bool = True,
+    intra_op_threads: int = 0,
+    inter_op_threads: int = 0,
+    registry: Optional[ModelRegistry] = None,
+    torch_threads: int = 0,
+) -> InferenceBackend:
+    """設定値からバックエンドを生成する"""
+    if backend == "torch":
+        return TorchBackend(model_name, registry, num_threads=torch_threads)
+    if backend == "onnx":
+        if onnx_dir is None:
+            raise ValueError("onnx_dir is required for the onnx backend")
+        return OnnxBackend(
+            model_name,
+            onnx_dir,
+            quantize=quantize,
+            intra_op_threads=intra_op_threads,
+            inter_op_threads=inter_op_threads,
+            registry=registry,
+        )
+    raise ValueError(f"unknown embedding backend: {backend}")
+
+
+def _main() -> None:
+    """
+    ONNX へのエクスポート・量子化とパリティ／速度の確認を行う CLI
+    例: python -m infrastructure.services.inference_backends --out .index_data/onnx/LaBSE
+    """
+    parser = argparse.ArgumentParser(description=_main.__doc__)
+    parser.add_argument("--model", default=os.getenv("MODEL_NAME", "sentence-transformers/LaBSE"))
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--no-quantize", action="store_true")
+    parser.add_argument("--intra-op-threads", type=int, default=0)
+    parser.add_argument("--inter-op-threads", type=int, default=0)
+    parser.add_argument("--torch-threads", type=int, default=0)
+    args = parser.parse_args()
+
+    torch_backend = TorchBackend(args.model, num_threads=args.torch_threads)
+    onnx_backend = OnnxBackend(
+        args.model,
+        args.out,
+        quantize=not args.no_quantize,
+        intra_op_threads=args.intra_op_threads,
+        inter_op_threads=args.inter_op_threads,
+    )
+    report = check_parity(torch_backend, onnx_backend)
+    print(f"parity: min={report.min_cosine:.4f} mean={report.mean_cosine:.4f} (n={report.n})")
+
+    for backend in (torch_backend, onnx_backend):
+        backend.encode(PARITY_SAMPLES[:1])
+        start = time.perf_counter()
+        for text in PARITY_SAMPLES * 4:
+            backend.encode([text])
+        ms = (time.perf_counter() - start) * 1000 / (len(PARITY_SAMPLES) * 4)
+        print(f"{backend.cache_tag}: {ms:.1f} ms/query")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    _main()
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from typing import List, Tuple
+
+import numpy as np
+
+from domain.memo import Memo
+from infrastructure.services.chunker import Chunk
+from infrastructure.services.embedder import EmbedderService
+
+logger = logging.getLogger(__name__)
+
+
+class MemoIndexer:
+    """
+    メモ 1 件の作成・更新・削除を各検索インデックスへ反映する
+    - メモ単位の FAISS（セマンティック検索）: ベクトルを登録／置換／削除
+    - チャンク単位の FAISS: チャンクを作り直して置換／削除
+    - Elasticsearch: ドキュメントを登録／上書き／削除
+    """
+
+    def __init__(self, memo_repo, faiss_index_repo, faiss_chunk_repo, elastic_repo, embedder: EmbedderService):
+        self.memo_repo = memo_repo
+        self.faiss_index_repo = faiss_index_repo
+        self.faiss_chunk_repo = faiss_chunk_repo
+        self.elastic_repo = elastic_repo
+        self.embedder = embedder
+
+    async def add_to_index(self, uuid: str, memo: Memo) -> None:
+        """新規メモを索引に追加する（CreateMemoUseCase の IndexRepository）"""
+        await self.reindex(memo)
+
+    async def reindex(self, memo: Memo) -> None:
+        """本文からベクトル・チャンクを作り直し、既存分を置き換える"""
+        text = memo.body or memo.title or ""
+        # セマンティック検索用インデックス（共有 embedder で埋め込みを作って保存）
+        memo.embedding = await asyncio.to_thread(self.embedder.encode, text)
+        await self.memo_repo.save_embedding(memo)
+        await self.faiss_index_repo.upsert([memo])
+
+        # チャンク単位ベクトル検索インデックス
+        (chunks,) = await asyncio.to_thread(self.embedder.encode_chunks_many, [text])
+        items: List[Tuple[str, np.ndarray]] = [
+            (f"{memo.uuid}_{i}", vec) for i, (_, vec) in enumerate(chunks)
+        ]
+        passages: List[Chunk] = [c for c, _ in chunks]
+        await self.faiss_chunk_repo.replace_memo_chunks(memo.uuid, items, passages)
+
+        # Elasticsearch 全文検索インデックス（同じ _id で上書き）
+        await self.elastic_repo.bulk_index([memo])
+
+    async def remove(self, uuid: str) -> None:
+        """削除されたメモのベクトル・チャンク・文書を取り除く"""
+        await self.faiss_index_repo.remove([uuid])
+        await self.faiss_chunk_repo.remove_memos([uuid])
+        await self.elastic_repo.delete(uuid)
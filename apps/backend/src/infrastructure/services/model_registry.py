@@ -0,0 +1,56 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    プロセス内で SentenceTransformer を共有するレジストリ
+    - モデル名ごとに一度だけロード（初回アクセス時 or warm_up 時）
+    - 同時アクセスでも二重ロードしないようモデル単位でロック
+    """
+
+    def __init__(self):
+        self._models: Dict[str, object] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def get(self, model_name: str):
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._guard:
+            lock = self._locks.setdefault(model_name, threading.Lock())
+        with lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = self._load(model_name)
+                self._models[model_name] = model
+        return model
+
+    def warm_up(self, model_names: Iterable[str]) -> None:
+        for name in model_names:
+            self.get(name)
+
+    def is_loaded(self, model_name: str) -> bool:
+        return model_name in self._models
+
+    def loaded(self) -> List[str]:
+        return list(self._models)
+
+    def _load(self, model_name: str):
+        # 重い import はロード時まで遅延させる
+        from sentence_transformers import SentenceTransformer
+
+        start = time.perf_counter()
+        model = SentenceTransformer(model_name)
+        logger.info("Loaded model %s in %.1fs", model_name, time.perf_counter() - start)
+        return model
+
+
+# プロセス全体で共有するレジストリ
+model_registry = ModelRegistry()
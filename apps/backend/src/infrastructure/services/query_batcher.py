@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBatcher:
+    """
+    同時に届いたクエリをまとめて 1 回の encode に流す非同期マイクロバッチャ
+    - 最初の要求から max_wait_ms 経過するか max_batch_size 件集まったら実行
+    - 結果は各呼び出し元の Future に振り分ける
+    - キュー深さ・バッチサイズを統計として公開
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self._encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._batches = 0
+        self._items = 0
+        self._max_seen = 0
+        self._last_size = 0
+
+    async def submit(self, text: str) -> np.ndarray:
+        """1 件のクエリを投入し、バッチ実行後のベクトルを待つ"""
+        self._ensure_worker()
+        fut = self._loop.create_future()
+        await self._queue.put((text, fut))
+        return await fut
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # イベントループごとにキューとワーカーを張り直す
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            first = await self._queue.get()
+            batch: List[Tuple[str, asyncio.Future]] = [first]
+            deadline = self._loop.time() + self.max_wait_ms / 1000.0
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = [t for t, _ in batch]
+        self._batches += 1
+        self._items += len(batch)
+        self._last_size = len(batch)
+        self._max_seen = max(self._max_seen, len(batch))
+        try:
+            vecs = await asyncio.to_thread(self._encode_fn, texts)
+        except Exception as e:
+            logger.error("Batched encode failed (size=%d): %s", len(batch), e)
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut), vec in zip(batch, vecs):
+            if not fut.done():
+                fut.set_result(vec)
+
+    async def close(self) -> None:
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": self._items / self._batches if self._batches else 0.0,
+            "max_batch_size_seen": self._max_seen,
+            "last_batch_size": self._last_size,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+        }
@@ -0,0 +1,95 @@
+import logging
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MINMAX = "minmax"
+ZSCORE = "zscore"
+RRF = "rrf"
+FUSION_METHODS = (MINMAX, ZSCORE, RRF)
+
+
+@dataclass(frozen=True)
+class FusionConfig:
+    """
+    セマンティック・全文検索の 2 系統の結果を 1 本に融合する設定
+    - minmax: 系統ごとに [0, 1] へ Min-Max 正規化して重み付き和
+    - zscore: 系統ごとに標準化して重み付き和（片方にしか無い候補は、その系統の最低値とみなす）
+    - rrf: 順位だけを使う Reciprocal Rank Fusion。重み × 1 / (rrf_k + 順位)
+    """
+    method: str = MINMAX
+    semantic_weight: float = 0.6
+    elastic_weight: float = 0.4
+    rrf_k: int = 60
+
+    def __post_init__(self):
+        if self.method not in FUSION_METHODS:
+            raise ValueError(f"unknown fusion method: {self.method!r} (expected one of {FUSION_METHODS})")
+
+
+def fuse(
+    semantic: Sequence[Tuple[str, float]],
+    elastic: Sequence[Tuple[str, float]],
+    top_k: int,
+    config: FusionConfig = FusionConfig(),
+) -> List[Tuple[str, float]]:
+    """
+    (UUID, スコア) の 2 系統を融合し、上位 top_k 件を [(UUID, 融合スコア)] で返す（降順）
+    各系統の UUID は重複しない前提。スコアは大きいほど良い
+    """
+    sem_ids, sem_raw = _split(semantic)
+    es_ids, es_raw = _split(elastic)
+    if not sem_ids and not es_ids:
+        return []
+
+    # 両系統の UUID を通し番号に振り直し、系統ごとのスコアを同じ配列に足し込む
+    ids, codes = np.unique(np.asarray(sem_ids + es_ids, dtype=str), return_inverse=True)
+    sem_codes, es_codes = codes[:len(sem_ids)], codes[len(sem_ids):]
+    combined = np.zeros(len(ids), dtype="float64")
+    for w, raw, idx in (
+        (config.semantic_weight, sem_raw, sem_codes),
+        (config.elastic_weight, es_raw, es_codes),
+    ):
+        if w <= 0 or not raw.size:
+            continue
+        if config.method == ZSCORE:
+            z = _zscore(raw)
+            # 片方の系統にしか無い候補が、弱い一致より有利にならないように最低値で埋める
+            base = np.full(len(ids), z.min())
+            base[idx] = z
+            combined += w * base
+        elif config.method == RRF:
+            ranks = np.empty(raw.size, dtype="float64")
+            ranks[np.argsort(-raw, kind="stable")] = np.arange(1, raw.size + 1)
+            combined[idx] += w / (config.rrf_k + ranks)
+        else:
+            combined[idx] += w * _minmax(raw)
+
+    k = min(top_k, len(ids))
+    if k <= 0:
+        return []
+    # 全件ソートせず上位 k 件だけを選んでから並べる
+    top = np.argpartition(-combined, k - 1)[:k] if k < len(ids) else np.arange(len(ids))
+    top = top[np.lexsort((ids[top], -combined[top]))]
+    return [(str(ids[i]), float(combined[i])) for i in top.tolist()]
+
+
+def _split(hits: Sequence[Tuple[str, float]]) -> Tuple[List[str], np.ndarray]:
+    return [u for u, _ in hits], np.asarray([s for _, s in hits], dtype="float64")
+
+
+def _minmax(x: np.ndarray) -> np.ndarray:
+    lo, hi = x.min(), x.max()
+    if hi == lo:
+        return np.ones_like(x)
+    return (x - lo) / (hi - lo)
+
+
+def _zscore(x: np.ndarray) -> np.ndarray:
+    std = x.std()
+    if std == 0:
+        return np.zeros_like(x)
+    return (x - x.mean()) / std
@@ -0,0 +1,142 @@
+import copy
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Protocol, Tuple
+
+from infrastructure.services.embedding_cache import CacheStats, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# (世代, 検索種別, 正規化クエリ, その他の条件...)
+SearchKey = Tuple[Hashable, ...]
+
+
+class ResultCache(Protocol):
+    """書き込み側から見た検索結果キャッシュ（書き込み後に世代を進めて古い結果を捨てる）"""
+    def invalidate(self) -> None:
+        ...
+
+
+class SearchResultCache:
+    """
+    検索結果（List[Memo]）のインメモリ LRU＋TTL キャッシュ
+    - キーは (索引の世代, 検索種別, 正規化クエリ, 絞り込み・top_k などの条件)
+    - メモの作成・更新・削除や索引の再構築のたびに invalidate() で世代を進め、古い結果は二度と返さない
+      （世代を進める前に計算し始めた結果は、古い世代のキーなので put しても捨てる）
+    - 件数・推定バイト数の両方に上限を持ち、超えたら古い順に追い出す
+    - put 時と get 時に値を深いコピーにする（呼び出し側が hybrid_score などを書き換えても保存値は変わらない）
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_s: float = 60.0,
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._data: "OrderedDict[SearchKey, Tuple[float, int, Any]]" = OrderedDict()
+        self._nbytes = 0
+        self._generation = 0
+        self._expired = 0
+        self._evicted = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def key(self, mode: str, query: str, *params: Hashable) -> SearchKey:
+        """現在の世代でのキー。params はハッシュ可能な値（MemoFilter は frozen なのでそのまま渡せる）"""
+        return (self._generation, mode, normalize_text(query), *params)
+
+    def get(self, key: SearchKey) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or key[0] != self._generation:
+                self.stats.misses += 1
+                return None
+            expires, size, value = entry
+            if time.monotonic() >= expires:
+                self._drop(key, size)
+                self._expired += 1
+                self.stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, key: SearchKey, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        size = _estimate_bytes(value)
+        if size > self.max_bytes:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            if key[0] != self._generation:
+                # 計算中に索引が変わった結果は保存しない
+                return
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._nbytes -= old[1]
+            self._data[key] = (time.monotonic() + self.ttl_s, size, value)
+            self._nbytes += size
+            while self._data and (len(self._data) > self.max_entries or self._nbytes > self.max_bytes):
+                _, (_, evicted, _) = self._data.popitem(last=False)
+                self._nbytes -= evicted
+                self._evicted += 1
+
+    def invalidate(self) -> None:
+        """世代を進めて全エントリを捨てる（書き込み側から呼ぶ）"""
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+            self._nbytes = 0
+
+    def _drop(self, key: SearchKey, size: int) -> None:
+        del self._data[key]
+        self._nbytes -= size
+
+    def cache_stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats.to_dict(),
+                "entries": len(self._data),
+                "bytes": self._nbytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl_s,
+                "generation": self._generation,
+                "expired": self._expired,
+                "evicted": self._evicted,
+            }
+
+
+def _estimate_bytes(value: Any) -> int:
+    """検索結果の大まかなメモリ量（メモの文字列フィールドと付与属性を数える）"""
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_estimate_bytes(v) for v in value)
+    if hasattr(value, "__dict__"):
+        size = sys.getsizeof(value)
+        for attr in vars(value).values():
+            if isinstance(attr, (str, bytes)):
+                size += sys.getsizeof(attr)
+            elif isinstance(attr, (list, tuple)):
+                size += sum(sys.getsizeof(x) for x in attr)
+            elif hasattr(attr, "nbytes"):
+                size += int(attr.nbytes)
+        return size
+    return sys.getsizeof(value)
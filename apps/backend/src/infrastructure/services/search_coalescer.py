@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from infrastructure.services.search_pool import SearchPool
+
+logger = logging.getLogger(__name__)
+
+# (クエリ行列, k, ef_search) → 行ごとの結果
+SearchBatchFn = Callable[[np.ndarray, int, Optional[int]], List[Any]]
+
+
+def _trim(result: Any, k: int) -> Any:
+    """行ごとの結果を k 件に切り詰める（リスト、またはリストの組）"""
+    if isinstance(result, tuple):
+        return tuple(part[:k] for part in result)
+    return result[:k]
+
+
+class SearchCoalescer:
+    """
+    同時に届いたベクトル検索をまとめて 1 回の行列検索に流す非同期コアレッサ
+    - バッチは同時に max_inflight 本まで並行して流し、枠が埋まっている間に溜まった要求は
+      そのまま次の 1 バッチにまとめる（max_wait_ms > 0 なら最初の要求からその時間だけ追加で待つ）
+      max_inflight の既定は pool のワーカー数（pool なしなら 1）
+    - ef_search が同じ要求ごとに search_batch_fn(行列, 最大の k, ef_search) を 1 回呼ぶ
+    - 結果は各呼び出し元の k に切り詰めて Future に振り分ける
+    - pool を渡すと検索専用プールで実行し、投入時点でプールの枠を確保する（満杯なら即拒否）
+    """
+
+    def __init__(
+        self,
+        search_batch_fn: SearchBatchFn,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 0.0,
+        pool: Optional[SearchPool] = None,
+        max_inflight: int = 0,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self._search_batch_fn = search_batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._pool = pool
+        self.max_inflight = max_inflight or (pool.workers if pool is not None else 1)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+        self._batches = 0
+        self._items = 0
+        self._max_seen = 0
+        self._last_size = 0
+
+    async def submit(self, query: np.ndarray, k: int, ef_search: Optional[int] = None) -> Any:
+        """1 件のクエリベクトルを投入し、まとめて検索した結果のうち自分の分を待つ"""
+        self._ensure_worker()
+        if self._pool is not None:
+            self._pool.acquire()
+        try:
+            fut = self._loop.create_future()
+            await self._queue.put((np.asarray(query, dtype="float32").reshape(-1), k, ef_search, fut))
+            return await fut
+        finally:
+            if self._pool is not None:
+                self._pool.release()
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # イベントループごとにキューとワーカーを張り直す
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_inflight)
+            self._flushes = set()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            # 空き枠ができるまで次のバッチは作らない（その間に届いた要求は同じバッチに入る）
+            await self._slots.acquire()
+            try:
+                batch = [await self._queue.get()]
+            except BaseException:
+                self._slots.release()
+                raise
+            # 既に溜まっている分は待たずに取り込む
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            deadline = self._loop.time() + self.max_wait_ms / 1000.0
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            task = self._loop.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task) -> None:
+        self._flushes.discard(task)
+        self._slots.release()
+
+    async def _flush(self, batch: List[Tuple[np.ndarray, int, Optional[int], asyncio.Future]]) -> None:
+        self._batches += 1
+        self._items += len(batch)
+        self._last_size = len(batch)
+        self._max_seen = max(self._max_seen, len(batch))
+
+        groups: Dict[Optional[int], List[Tuple[np.ndarray, int, Optional[int], asyncio.Future]]] = {}
+        for item in batch:
+            groups.setdefault(item[2], []).append(item)
+        for ef_search, items in groups.items():
+            queries = np.stack([q for q, _, _, _ in items])
+            k = max(k for _, k, _, _ in items)
+            try:
+                if self._pool is not None:
+                    results = await self._pool.run(
+                        self._search_batch_fn, queries, k, ef_search, admitted=True
+                    )
+                else:
+                    results = await self._loop.run_in_executor(
+                        None, self._search_batch_fn, queries, k, ef_search
+                    )
+            except Exception as e:
+                logger.error("Batched search failed (size=%d): %s", len(items), e)
+                for *_, fut in items:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, k_i, _, fut), result in zip(items, results):
+                if not fut.done():
+                    fut.set_result(_trim(result, k_i))
+
+    async def close(self) -> None:
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        # 実行中のバッチは最後まで流して呼び出し元に結果を返す
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "inflight": len(self._flushes),
+            "max_inflight": self.max_inflight,
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": self._items / self._batches if self._batches else 0.0,
+            "max_batch_size_seen": self._max_seen,
+            "last_batch_size": self._last_size,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+        }
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Optional, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SearchPoolSaturated(RuntimeError):
+    """検索の待ち行列が上限に達していて、要求を受け付けられないときに投げられる例外"""
+    pass
+
+
+def _set_omp_threads(n: int) -> None:
+    # OpenMP のスレッド数は呼び出したスレッドごとの設定なので、各ワーカーで設定する
+    faiss.omp_set_num_threads(n)
+
+
+class SearchPool:
+    """
+    FAISS 検索専用のスレッドプール
+    - ファイル I/O（永続化スレッド）や埋め込み（既定の executor）と CPU を取り合わないよう分離する
+    - 各ワーカーで faiss.omp_set_num_threads を設定し、1 検索あたりの OpenMP スレッド数を固定する
+      （workers × omp_threads がコア数を超えないようにする）
+    - 待ち＋実行中の要求が max_pending を超えたら SearchPoolSaturated で即座に断る
+    - キュー待ち時間と計算時間を分けて計測する
+    """
+
+    def __init__(
+        self,
+        workers: int = 0,
+        omp_threads: int = 0,
+        max_pending: int = 1024,
+        window: int = 1024,
+    ):
+        cpus = os.cpu_count() or 1
+        # 0 なら自動: ワーカーはコア数の半分（最低 1）、OpenMP はコアをワーカーで割った数
+        self.workers = workers or max(1, cpus // 2)
+        self.omp_threads = omp_threads or max(1, cpus // self.workers)
+        self.max_pending = max(1, max_pending)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="faiss-search",
+            initializer=_set_omp_threads,
+            initargs=(self.omp_threads,),
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_ms: Deque[float] = deque(maxlen=window)
+        self._compute_ms: Deque[float] = deque(maxlen=window)
+
+    # ── 受付 ──
+
+    def acquire(self) -> None:
+        """要求 1 件分の枠を確保する。満杯なら SearchPoolSaturated"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise SearchPoolSaturated(
+                    f"search pool saturated ({self._pending} pending, limit {self.max_pending})"
+                )
+            self._pending += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    # ── 実行 ──
+
+    async def run(self, fn: Callable[..., Any], *args, admitted: bool = False) -> Any:
+        """
+        fn(*args) を検索スレッドで実行する
+        admitted=True は呼び出し側で acquire 済み（まとめ処理で枠を確保している場合）
+        """
+        if not admitted:
+            self.acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            result, wait_ms, compute_ms = await loop.run_in_executor(
+                self._executor, self._timed, time.perf_counter(), fn, args
+            )
+        finally:
+            if not admitted:
+                self.release()
+        with self._lock:
+            self._completed += 1
+            self._wait_ms.append(wait_ms)
+            self._compute_ms.append(compute_ms)
+        return result
+
+    @staticmethod
+    def _timed(submitted: float, fn: Callable[..., Any], args: tuple) -> Tuple[Any, float, float]:
+        started = time.perf_counter()
+        result = fn(*args)
+        finished = time.perf_counter()
+        return result, (started - submitted) * 1000, (finished - started) * 1000
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    # ── 統計 ──
+
+    def stats(self) -> dict:
+        with self._lock:
+            wait = np.asarray(self._wait_ms)
+            compute = np.asarray(self._compute_ms)
+            stats = {
+                "workers": self.workers,
+                "omp_threads": self.omp_threads,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+        for name, values in (("wait_ms", wait), ("compute_ms", compute)):
+            stats[name] = {
+                "p50": float(np.percentile(values, 50)) if values.size else 0.0,
+                "p95": float(np.percentile(values, 95)) if values.size else 0.0,
+                "mean": float(values.mean()) if values.size else 0.0,
+            }
+        return stats
@@ -1,7 +1,9 @@
 from fastapi import APIRouter
 from .vectorize import router as vectorize_router
 from .progress  import router as progress_router
+from .metrics   import router as metrics_router
 
 router = APIRouter()
 router.include_router(vectorize_router, prefix="/incremental-vectorize", tags=["admin"])
 router.include_router(progress_router,    prefix="/progress",               tags=["admin"])
+router.include_router(metrics_router,     prefix="/metrics",                tags=["admin"])
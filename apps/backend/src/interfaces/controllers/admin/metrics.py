@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, status
+from interfaces.controllers.dependencies import (
+    get_embedder_service,
+    get_faiss_chunk_repo,
+    get_faiss_index_repo,
+    get_search_cache,
+    get_search_pool,
+)
+
+router = APIRouter()
+
+@router.get("", status_code=status.HTTP_200_OK)
+async def metrics(
+    embedder = Depends(get_embedder_service),
+    faiss_index_repo = Depends(get_faiss_index_repo),
+    faiss_chunk_repo = Depends(get_faiss_chunk_repo),
+    search_pool = Depends(get_search_pool),
+    search_cache = Depends(get_search_cache),
+):
+    """キャッシュ等の内部統計を返す"""
+    return {
+        "embedding_cache": embedder.cache_stats(),
+        "query_batcher": embedder.batcher_stats(),
+        "embedding_backend": embedder.backend_info(),
+        "bulk_encode": embedder.bulk_stats(),
+        "faiss_index": faiss_index_repo.stats(),
+        "faiss_chunks": faiss_chunk_repo.stats(),
+        "faiss_search_batches": {
+            "faiss_index": faiss_index_repo.search_stats(),
+            "faiss_chunks": faiss_chunk_repo.search_stats(),
+        },
+        "faiss_search_pool": search_pool.stats(),
+        "search_cache": search_cache.cache_stats(),
+    }
@@ -1,158 +1,168 @@
 import logging
 from functools import lru_cache
-from pathlib import Path
 from fastapi import Depends, Request
 
+from app.container import Container
 from config import settings
-from domain.memo import Memo
-from interfaces.repositories.index_repo import IndexRepository
+from interfaces.repositories.index_repo import ChunkIndexRepository
 from interfaces.repositories.memo_repo import MemoRepository
 from interfaces.repositories.search_repo import SearchRepository
-from infrastructure.persistence.fs_memo_repo import FileSystemMemoRepository
 from infrastructure.persistence.faiss_chunk_repo import FaissChunkRepository
 from infrastructure.persistence.faiss_index_repo import FaissIndexRepository
 from infrastructure.persistence.elasticsearch_repo import ElasticsearchMemoRepository
 from infrastructure.services.embedder import EmbedderService
-from infrastructure.utils.datetime_jst import DateTimeJST
+from infrastructure.services.memo_indexer import MemoIndexer
+from infrastructure.services.search_cache import SearchResultCache
+from infrastructure.services.search_pool import SearchPool
 from interfaces.utils.datetime import DateTimeProvider
 
 from usecases.create_memo import CreateMemoUseCase
+from usecases.delete_memo import DeleteMemoUseCase
+from usecases.update_memo import UpdateMemoUseCase
 from usecases.search_memos import SearchMemosUseCase
 from usecases.hybrid_search import HybridSearchUseCase
 from usecases.incremental_vectorize import IncrementalVectorizeUseCase
 from usecases.get_progress import GetVectorizeProgressUseCase
+from usecases.list_memos import ListMemosUseCase
 
 logger = logging.getLogger(__name__)
 
 
-@lru_cache()
-def get_memo_repo() -> MemoRepository:
+def get_container(request: Request) -> Container:
+    """
+    lifespan で生成したアプリケーション共有コンテナを取得
+    """
+    return request.app.state.container
+
+
+def get_memo_repo(container: Container = Depends(get_container)) -> MemoRepository:
     """
     FileSystemMemoRepository の具象実装を提供
     """
-    repo_dir = Path(settings.memos_root)
-    logger.debug(f"🔧 FileSystemMemoRepository をインスタンス化します (root={repo_dir})")
-    return FileSystemMemoRepository(root=repo_dir)
+    return container.memo_repo
 
 
-@lru_cache()
-def get_faiss_chunk_repo() -> FaissChunkRepository:
+def get_faiss_chunk_repo(container: Container = Depends(get_container)) -> FaissChunkRepository:
     """
     チャンク単位ベクトル検索用 FaissChunkRepository を提供
     """
-    index_dir = Path(settings.index_data_root)
-    logger.debug(f"🔧 FaissChunkRepository をインスタンス化します (index_dir={index_dir})")
-    return FaissChunkRepository(
-        index_dir=index_dir,
-        dimension=settings.embedding_dim,
-    )
+    return container.faiss_chunk_repo
 
 
-@lru_cache()
-def get_faiss_index_repo() -> FaissIndexRepository:
+def get_faiss_index_repo(container: Container = Depends(get_container)) -> FaissIndexRepository:
     """
     セマンティック検索用 FaissIndexRepository を提供
     """
-    index_dir = Path(settings.index_data_root)
-    logger.debug(f"🔧 FaissIndexRepository をインスタンス化します (index_dir={index_dir})")
-    return FaissIndexRepository(
-        index_dir=index_dir,
-        memo_repo=get_memo_repo(),
-    )
+    return container.faiss_index_repo
+
+
+def get_search_pool(container: Container = Depends(get_container)) -> SearchPool:
+    """
+    FAISS 検索専用プールを提供（統計用）
+    """
+    return container.search_pool
+
+
+def get_search_cache(container: Container = Depends(get_container)) -> SearchResultCache:
+    """
+    検索結果キャッシュを提供（検索ユースケースが読み、書き込みユースケースが無効化する）
+    """
+    return container.search_cache
 
 
-@lru_cache()
 def get_index_repo(
     chunk_repo: FaissChunkRepository = Depends(get_faiss_chunk_repo),
-) -> IndexRepository:
+) -> ChunkIndexRepository:
     return chunk_repo
 
 
-@lru_cache()
-def get_elastic_repo() -> ElasticsearchMemoRepository:
+def get_elastic_repo(container: Container = Depends(get_container)) -> ElasticsearchMemoRepository:
     """
     全文検索用 ElasticsearchMemoRepository を提供
     """
-    raw = settings.elasticsearch_hosts
-    if isinstance(raw, str) and raw.startswith("["):
-        hosts_list = __import__("json").loads(raw)
-    elif isinstance(raw, str):
-        hosts_list = [h.strip() for h in raw.split(",") if h.strip()]
-    else:
-        hosts_list = raw
-
-    logger.debug(f"🔧 ElasticsearchMemoRepository をインスタンス化します (hosts={hosts_list})")
-    return ElasticsearchMemoRepository(
-        hosts=hosts_list,
-        index_name=settings.elasticsearch_index,
-    )
+    return container.elastic_repo
 
 
-@lru_cache()
-def get_embedder_service() -> EmbedderService:
+def get_embedder_service(container: Container = Depends(get_container)) -> EmbedderService:
     """
     EmbedderService のインスタンスを提供
     """
-    logger.debug(f"🔧 EmbedderService をインスタンス化します (model={settings.model_name})")
-    return EmbedderService(model_name=settings.model_name)
+    return container.embedder
 
 
-@lru_cache()
-def get_datetime_provider() -> DateTimeProvider:
+def get_datetime_provider(container: Container = Depends(get_container)) -> DateTimeProvider:
     """
     DateTimeProvider の具象実装 (JST) を提供
     """
-    logger.debug("🔧 DateTimeJST を提供します")
-    return DateTimeJST()
+    return container.datetime_provider
+
+
+def get_memo_indexer(container: Container = Depends(get_container)) -> MemoIndexer:
+    """
+    メモの変更を各検索インデックスへ反映する MemoIndexer を提供
+    """
+    return container.memo_indexer
 
 
 @lru_cache()
 def get_create_uc(
     memo_repo: MemoRepository = Depends(get_memo_repo),
     datetime_provider: DateTimeProvider = Depends(get_datetime_provider),
-    faiss_index_repo: FaissIndexRepository = Depends(get_faiss_index_repo),
-    faiss_chunk_repo: FaissChunkRepository = Depends(get_faiss_chunk_repo),
-    elastic_repo: ElasticsearchMemoRepository = Depends(get_elastic_repo),
+    indexer: MemoIndexer = Depends(get_memo_indexer),
+    cache: SearchResultCache = Depends(get_search_cache),
 ) -> CreateMemoUseCase:
     logger.debug("🔧 CreateMemoUseCase をインスタンス化します")
-
-    class CompositeIndexRepo:
-        async def add_to_index(self, uuid: str, memo: Memo) -> None:
-            # セマンティック検索用インデックス更新
-            faiss_index_repo.incremental_update([memo])
-            # チャンク単位ベクトル検索インデックス更新
-            chunks = EmbedderService(model_name=settings.model_name).encode_chunks(
-                memo.body or memo.title or ""
-            )
-            items = [(f"{memo.uuid}_{i}", vec) for i, (_, vec) in enumerate(chunks)]
-            faiss_chunk_repo.add_chunks_batch(items)
-            # Elasticsearch 全文検索インデックス更新
-            await elastic_repo.index(memo)
-
     return CreateMemoUseCase(
         memo_repo,
         datetime_provider,
-        CompositeIndexRepo(),
+        indexer,
+        cache,
     )
 
 
+@lru_cache()
+def get_update_uc(
+    memo_repo: MemoRepository = Depends(get_memo_repo),
+    indexer: MemoIndexer = Depends(get_memo_indexer),
+    cache: SearchResultCache = Depends(get_search_cache),
+) -> UpdateMemoUseCase:
+    logger.debug("🔧 UpdateMemoUseCase をインスタンス化します")
+    return UpdateMemoUseCase(memo_repo, indexer, cache)
+
+
+@lru_cache()
+def get_delete_uc(
+    memo_repo: MemoRepository = Depends(get_memo_repo),
+    indexer: MemoIndexer = Depends(get_memo_indexer),
+    cache: SearchResultCache = Depends(get_search_cache),
+) -> DeleteMemoUseCase:
+    logger.debug("🔧 DeleteMemoUseCase をインスタンス化します")
+    return DeleteMemoUseCase(memo_repo, indexer, cache)
+
+
 @lru_cache()
 def get_search_uc(
     faiss_repo: FaissIndexRepository = Depends(get_faiss_index_repo),
     memo_repo: MemoRepository = Depends(get_memo_repo),
+    embedder: EmbedderService = Depends(get_embedder_service),
+    cache: SearchResultCache = Depends(get_search_cache),
 ) -> SearchMemosUseCase:
     logger.debug("🔧 SearchMemosUseCase をインスタンス化します")
     return SearchMemosUseCase(
         index_repo=faiss_repo,
         memo_repo=memo_repo,
+        embedder=embedder,
+        cache=cache,
     )
 
 
 @lru_cache()
 def get_hybrid_uc(
-    chunk_repo: IndexRepository = Depends(get_index_repo),
+    chunk_repo: ChunkIndexRepository = Depends(get_index_repo),
     elastic_repo: SearchRepository = Depends(get_elastic_repo),
     embedder: EmbedderService = Depends(get_embedder_service),
+    memo_repo: MemoRepository = Depends(get_memo_repo),
+    cache: SearchResultCache = Depends(get_search_cache),
 ) -> HybridSearchUseCase:
     logger.debug("🔧 HybridSearchUseCase をインスタンス化します")
     return HybridSearchUseCase(
@@ -161,15 +171,20 @@ def get_hybrid_uc(
         embedder=embedder,
         semantic_weight=settings.hybrid_semantic_weight,
         elastic_weight=settings.hybrid_elastic_weight,
+        memo_repo=memo_repo,
+        max_results=settings.search_max_results,
+        fusion=settings.hybrid_fusion,
+        rrf_k=settings.hybrid_rrf_k,
+        cache=cache,
     )
 
 
-@lru_cache()
 def get_incremental_uc(
     request: Request,
     memo_repo: MemoRepository = Depends(get_memo_repo),
     chunk_repo: FaissChunkRepository = Depends(get_faiss_chunk_repo),
     embedder: EmbedderService = Depends(get_embedder_service),
+    cache: SearchResultCache = Depends(get_search_cache),
 ) -> IncrementalVectorizeUseCase:
     logger.debug("🔧 IncrementalVectorizeUseCase をインスタンス化します")
     return IncrementalVectorizeUseCase(
@@ -177,12 +192,19 @@ def get_incremental_uc(
         memo_repo,
         request.app,
         embedder,
+        cache=cache,
     )
 
 
-@lru_cache()
 def get_progress_uc(
     request: Request,
 ) -> GetVectorizeProgressUseCase:
     logger.debug("🔧 GetVectorizeProgressUseCase をインスタンス化します")
     return GetVectorizeProgressUseCase(request.app)
+
+
+def get_list_uc(
+    memo_repo: MemoRepository = Depends(get_memo_repo),
+) -> ListMemosUseCase:
+    logger.debug("🔧 ListMemosUseCase をインスタンス化します")
+    return ListMemosUseCase(memo_repo)
@@ -9,6 +9,7 @@ from .semantic_search import router as semantic_search_router
 from .hybrid_search import router as hybrid_search_router
 from .tags import router as tags_router
 from .categories import router as categories_router
+from .list import router as list_router
 
 router = APIRouter()
 
@@ -17,6 +18,9 @@ for rtr in [create_router, get_router, update_router, delete_router]:
     router.include_router(rtr, prefix="/memo",  tags=["memo"])
     router.include_router(rtr, prefix="/memos", tags=["memo"])
 
+# メモ一覧（カーソルページング）
+router.include_router(list_router, prefix="/memos", tags=["memo"])
+
 # 検索エンドポイント
 router.include_router(semantic_search_router, prefix="/search/semantic", tags=["memo"])
 router.include_router(hybrid_search_router,  prefix="/search/hybrid",  tags=["memo"])
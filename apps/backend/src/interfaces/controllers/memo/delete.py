@@ -1,8 +1,9 @@
 import logging
 from fastapi import APIRouter, Depends, Request, HTTPException, status
 
-from interfaces.controllers.dependencies import get_memo_repo
+from interfaces.controllers.dependencies import get_delete_uc
 from interfaces.controllers.utils import log_request
+from usecases.delete_memo import DeleteMemoUseCase
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["memo"])
@@ -16,7 +17,7 @@ router = APIRouter(tags=["memo"])
 async def delete_memo(
     request: Request,
     uuid: str,
-    repo = Depends(get_memo_repo),
+    uc: DeleteMemoUseCase = Depends(get_delete_uc),
 ) -> None:
     """
     UUID に紐づくメモを削除します。
@@ -25,7 +26,8 @@ async def delete_memo(
     # リクエストをログに出力
     await log_request(request, {"uuid": uuid})
 
-    deleted = await repo.delete(uuid)
+    # 検索インデックスからも取り除く
+    deleted = await uc.execute(uuid)
     if not deleted:
         logger.warning("削除対象のメモが見つかりません: %s", uuid)
         raise HTTPException(
@@ -4,6 +4,7 @@ from typing import List
 
 from interfaces.dtos.search_dto import SearchRequestDTO, SearchResultDTO
 from interfaces.controllers.dependencies import get_hybrid_uc
+from infrastructure.services.search_pool import SearchPoolSaturated
 from usecases.hybrid_search import HybridSearchUseCase
 
 logger = logging.getLogger(__name__)
@@ -28,10 +29,18 @@ async def search_hybrid(
         return []
 
     try:
-        memos = await uc.execute(query, top_k=dto.top_k if hasattr(dto, "top_k") else 10)
+        memos = await uc.execute(
+            query,
+            top_k=dto.top_k if hasattr(dto, "top_k") else 10,
+            ef_search=dto.ef_search,
+            filters=dto.to_filter(),
+            fusion=dto.fusion,
+        )
         # ドメインモデル → DTO 変換
         return [SearchResultDTO.from_domain(m) for m in memos]
 
+    except SearchPoolSaturated:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, detail="検索が混み合っています。時間をおいて再試行してください")
     except Exception as e:
         logger.error("ハイブリッド検索エラー: %s", e, exc_info=True)
         raise HTTPException(
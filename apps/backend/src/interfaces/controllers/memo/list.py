@@ -0,0 +1,41 @@
+import logging
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+
+from interfaces.dtos.memo_dto import MemoDTO
+from interfaces.dtos.memo_page_dto import MemoPageDTO
+from interfaces.controllers.dependencies import get_list_uc
+from interfaces.controllers.utils import log_request
+from usecases.list_memos import InvalidCursorError, ListMemosUseCase
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["memo"])
+
+
+@router.get(
+    "",
+    response_model=MemoPageDTO,
+    status_code=status.HTTP_200_OK,
+    summary="メモ一覧（カーソルページング）",
+)
+async def get_memo_page(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500, description="1 ページの件数"),
+    cursor: Optional[str] = Query(None, description="前ページの next_cursor"),
+    uc: ListMemosUseCase = Depends(get_list_uc),
+) -> MemoPageDTO:
+    """
+    作成日時の昇順でメモを返します。
+    続きは next_cursor を cursor に渡して取得します。
+    """
+    await log_request(request, {"limit": limit, "cursor": cursor})
+
+    try:
+        memos, next_cursor = await uc.execute(limit, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return MemoPageDTO(
+        items=[MemoDTO.from_domain(m) for m in memos],
+        next_cursor=next_cursor,
+    )
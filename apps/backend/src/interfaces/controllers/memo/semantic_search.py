@@ -2,9 +2,11 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from typing import List
 
-from interfaces.dtos.search_dto import SearchRequestDTO, SearchResultDTO
+from config import settings
+from interfaces.dtos.search_dto import BatchSearchRequestDTO, SearchRequestDTO, SearchResultDTO
 from interfaces.controllers.dependencies import get_search_uc
 from interfaces.controllers.utils  import log_request
+from infrastructure.services.search_pool import SearchPoolSaturated
 from usecases.search_memos import SearchMemosUseCase
 
 logger = logging.getLogger(__name__)
@@ -25,8 +27,39 @@ async def search_memos(
         return []
 
     try:
-        results = await uc.execute(query)
+        results = await uc.execute(query, filters=dto.to_filter())
         return [SearchResultDTO.from_domain(m) for m in results]
+    except SearchPoolSaturated:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, detail="検索が混み合っています。時間をおいて再試行してください")
     except Exception as exc:
         logger.error("Search failed: %s", exc, exc_info=True)
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail="検索処理中にエラーが発生しました")
+
+
+@router.post(
+    "/batch",
+    response_model=List[List[SearchResultDTO]],
+    status_code=status.HTTP_200_OK,
+    summary="メモ一括検索（複数クエリを 1 回の行列検索で処理）",
+)
+async def search_memos_batch(
+    request: Request,
+    dto: BatchSearchRequestDTO,
+    uc: SearchMemosUseCase = Depends(get_search_uc),
+) -> List[List[SearchResultDTO]]:
+    """クエリと同じ並びで、クエリごとの検索結果を返す"""
+    logger.debug("Batch search: %d queries (top_k=%d)", len(dto.queries), dto.top_k)
+    if len(dto.queries) > settings.search_batch_max_queries:
+        raise HTTPException(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"queries は最大 {settings.search_batch_max_queries} 件までです",
+        )
+
+    try:
+        results = await uc.execute_batch(dto.queries, dto.top_k)
+        return [[SearchResultDTO.from_domain(m) for m in memos] for memos in results]
+    except SearchPoolSaturated:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, detail="検索が混み合っています。時間をおいて再試行してください")
+    except Exception as exc:
+        logger.error("Batch search failed: %s", exc, exc_info=True)
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail="検索処理中にエラーが発生しました")
@@ -4,8 +4,9 @@ from fastapi import APIRouter, Depends, Request, HTTPException, status
 from interfaces.dtos.memo_update_dto import MemoUpdateDTO
 from interfaces.dtos.memo_dto        import MemoDTO
 from interfaces.controllers.utils     import log_request
-from interfaces.controllers.dependencies import get_memo_repo
+from interfaces.controllers.dependencies import get_update_uc
 from interfaces.repositories.memo_repo   import MemoNotFoundError
+from usecases.update_memo               import UpdateMemoUseCase
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["memo"])
@@ -21,7 +22,7 @@ async def update_memo(
     request: Request,
     uuid: str,
     dto: MemoUpdateDTO,
-    repo = Depends(get_memo_repo),
+    uc: UpdateMemoUseCase = Depends(get_update_uc),
 ) -> MemoDTO:
     """
     指定した UUID のメモを更新して新しい状態を返却します。
@@ -31,8 +32,8 @@ async def update_memo(
     await log_request(request, dto)
 
     try:
-        # 更新処理
-        updated = await repo.update(
+        # 更新処理（検索インデックスの該当ベクトル・チャンクも置き換える）
+        updated = await uc.execute(
             uuid=uuid,
             title=dto.title,
             body=dto.body,
@@ -1 +1 @@
-from .search_dto import SearchRequestDTO, SearchResultDTO
+from .search_dto import BatchSearchRequestDTO, SearchRequestDTO, SearchResultDTO
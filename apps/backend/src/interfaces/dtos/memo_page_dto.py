@@ -0,0 +1,12 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+from interfaces.dtos.memo_dto import MemoDTO
+
+
+class MemoPageDTO(BaseModel):
+    """
+    メモ一覧（カーソルページング）のレスポンス DTO
+    """
+    items:       List[MemoDTO]  = Field(default_factory=list, description="このページのメモ")
+    next_cursor: Optional[str]  = Field(None, description="次ページ取得用カーソル（最終ページなら null）")
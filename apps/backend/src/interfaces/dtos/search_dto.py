@@ -1,9 +1,34 @@
-from pydantic import BaseModel
-from typing import List
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from domain.memo import Memo
+from domain.memo_filter import MemoFilter
 
 class SearchRequestDTO(BaseModel):
     query: str
+    # HNSW チャンク索引の探索幅（大きいほど再現率↑・遅くなる。未指定なら既定値）
+    ef_search: Optional[int] = Field(None, ge=1, le=4096)
+    # 絞り込み条件（すべて AND。検索の内側で適用する）
+    category:     Optional[str] = None
+    tags:         List[str] = Field(default_factory=list)
+    created_from: Optional[datetime] = None
+    created_to:   Optional[datetime] = None
+    # ハイブリッド検索の融合方式（minmax / zscore / rrf。未指定なら既定値）
+    fusion:       Optional[str] = Field(None, pattern="^(minmax|zscore|rrf)$")
+
+    def to_filter(self) -> Optional[MemoFilter]:
+        f = MemoFilter(
+            category     = self.category or None,
+            tags         = tuple(t.strip() for t in self.tags if t.strip()),
+            created_from = self.created_from,
+            created_to   = self.created_to,
+        )
+        return None if f.is_empty else f
+
+class BatchSearchRequestDTO(BaseModel):
+    # 1 リクエストで複数クエリをまとめて検索する（オフライン評価など）
+    queries: List[str] = Field(..., min_length=1)
+    top_k:   int = Field(10, ge=1, le=1000)
 
 class SearchResultDTO(BaseModel):
     uuid:       str
@@ -14,6 +39,10 @@ class SearchResultDTO(BaseModel):
     tags:       List[str]
     created_at: str
     score:      float
+    # 一致したチャンク（本文中の文字オフセットつき）
+    passage:       Optional[str] = None
+    passage_start: Optional[int] = None
+    passage_end:   Optional[int] = None
 
     @classmethod
     def from_domain(cls, m: Memo) -> "SearchResultDTO":
@@ -26,4 +55,7 @@ class SearchResultDTO(BaseModel):
             tags       = m.tags if isinstance(m.tags, list) else m.tags.split(","),
             created_at = m.created_at.isoformat(),
             score      = m.score,
+            passage       = getattr(m, "passage", None),
+            passage_start = getattr(m, "passage_start", None),
+            passage_end   = getattr(m, "passage_end", None),
         )
@@ -1,22 +1,46 @@
 from abc import ABC, abstractmethod
-from typing import List
-from domain.memo import Memo
+from typing import List, Optional, Protocol, Sequence, Tuple
 
-from typing import List, Tuple
 import numpy as np
 
-class IndexRepository:
-    ...
-    async def search(self, query_vec: np.ndarray, top_k: int) -> Tuple[List[float], List[int]]:
-        """query_vec を FAISS に投げて (距離, インデックス) を返す"""
-        raise NotImplementedError
+from domain.memo import Memo
+
+
+class IndexRepository(ABC):
+    """メモ単位のベクトル索引（1 メモ 1 ベクトル）"""
+
+    @abstractmethod
+    async def search(
+        self, query_vec: np.ndarray, top_k: int, memo_uuids: Optional[Sequence[str]] = None
+    ) -> Tuple[List[str], np.ndarray]:
+        """query_vec に近いメモの (UUIDリスト, 距離配列) を返す（memo_uuids を渡すとそのメモだけが対象）"""
+        ...
+
+    @abstractmethod
+    async def search_batch(self, queries: np.ndarray, top_k: int) -> List[Tuple[List[str], np.ndarray]]:
+        """クエリ行列 (n, dim) を 1 回で検索し、行ごとに (UUIDリスト, 距離配列) を返す"""
+        ...
+
+    @abstractmethod
+    async def rebuild_from_matrix(self, uuids: List[str], matrix: np.ndarray) -> None:
+        """(UUID リスト, 埋め込み行列) から全件を作り直す"""
+        ...
 
     @abstractmethod
     async def incremental_update(self, memos: List[Memo]) -> None:
         """新規メモのみインデックスに追加する"""
-        pass
+        ...
 
-    @abstractmethod
-    async def search(self, query: str, top_k: int) -> List[Memo]:
-        """クエリを検索し、上位K件のメモを返す"""
-        pass
+
+class ChunkIndexRepository(Protocol):
+    """チャンク単位のベクトル索引（メモごとに複数チャンク）"""
+
+    async def search_memos(
+        self,
+        query_vec: np.ndarray,
+        top_k: int,
+        ef_search: Optional[int] = None,
+        memo_uuids: Optional[Sequence[str]] = None,
+    ) -> List[Tuple[str, float]]:
+        """異なるメモ top_k 件を、各メモで最も近いチャンクの (チャンクID, スコア) で返す（memo_uuids で絞り込み）"""
+        ...
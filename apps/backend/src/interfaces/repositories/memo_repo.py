@@ -1,6 +1,14 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Set
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
 from domain.memo import Memo
+from domain.memo_filter import MemoFilter
+
+# ページングのキー: (created_at の epoch 秒, uuid)
+PageKey = Tuple[float, str]
+
+# iter_all / list_page で省略可能な重いフィールド
+ALL_FIELDS = frozenset({"body", "embedding"})
 
 class MemoNotFoundError(Exception):
     """指定された UUID のメモが見つからなかったときに投げられる例外"""
@@ -17,6 +25,11 @@ class MemoRepository(ABC):
         """すべてのメモを取得する"""
         ...
 
+    @abstractmethod
+    async def save_embedding(self, memo: Memo) -> None:
+        """memo.embedding を保存する（本文・ヘッダは書き換えない）"""
+        ...
+
     @abstractmethod
     async def delete(self, uuid: str) -> bool:
         """
@@ -25,6 +38,67 @@ class MemoRepository(ABC):
         """
         ...
 
+    async def get_many(self, uuids: Iterable[str]) -> Dict[str, Memo]:
+        """
+        複数 UUID のメモをまとめて取得し {uuid: Memo} を返す。
+        見つからない UUID は結果に含めない。
+        既定実装は get_by_uuid の並列呼び出しで、具象側で一括ロードに差し替える。
+        """
+        unique = list(dict.fromkeys(u for u in uuids if u))
+        results = await asyncio.gather(
+            *(self.get_by_uuid(u) for u in unique), return_exceptions=True
+        )
+        return {
+            u: m for u, m in zip(unique, results)
+            if not isinstance(m, BaseException) and m is not None
+        }
+
+    async def filter_uuids(self, f: MemoFilter) -> List[str]:
+        """
+        メタデータ条件に合うメモの UUID を返す。
+        既定実装は list_all() を走査するだけなので、具象側で索引を使う実装に差し替える。
+        """
+        return [m.uuid for m in await self.list_all() if f.matches(m)]
+
+    async def list_page(
+        self,
+        limit: int,
+        after: Optional[PageKey] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> Tuple[List[Memo], Optional[PageKey]]:
+        """
+        (created_at, uuid) 昇順で after の次から limit 件を返す。
+        戻り値の 2 要素目は次ページのキー（最終ページなら None）。
+        既定実装は list_all() を並べ替えて切り出すだけなので、具象側で差し替える。
+        """
+        memos = sorted(await self.list_all(), key=self._page_key)
+        if after is not None:
+            memos = [m for m in memos if self._page_key(m) > tuple(after)]
+        page = memos[:limit]
+        next_after = self._page_key(page[-1]) if len(memos) > limit else None
+        return page, next_after
+
+    async def iter_all(
+        self,
+        batch_size: int = 100,
+        fields: Optional[Iterable[str]] = None,
+        after: Optional[PageKey] = None,
+    ) -> AsyncIterator[List[Memo]]:
+        """
+        全メモを batch_size 件ずつ安定順で返す非同期ジェネレータ。
+        fields で body / embedding の読み込みを省略できる（既定は両方読む）。
+        """
+        while True:
+            memos, after = await self.list_page(batch_size, after, fields)
+            if memos:
+                yield memos
+            if after is None:
+                break
+
+    @staticmethod
+    def _page_key(memo: Memo) -> PageKey:
+        return (memo.created_at.timestamp(), memo.uuid)
+
     async def list_categories(self) -> List[str]:
         """
         list_all() で取ってきたメモからカテゴリだけ抜き出して返す
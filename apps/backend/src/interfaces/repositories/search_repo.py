@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from domain.memo import Memo
+from domain.memo_filter import MemoFilter
 
 
 class SearchRepository(ABC):
@@ -11,9 +12,12 @@ class SearchRepository(ABC):
     """
 
     @abstractmethod
-    async def search(self, query: str, top_k: int) -> List[Tuple[Memo, float]]:
+    async def search(
+        self, query: str, top_k: int, filters: Optional[MemoFilter] = None
+    ) -> List[Tuple[Memo, float]]:
         """
         クエリ文字列を全文検索し、(Memo, score) のリストを返す
+        filters はスコアに影響しない絞り込み条件として検索エンジン側で評価する
         """
         ...
 
@@ -1,24 +1,14 @@
 import asyncio
-from pathlib import Path
+from contextlib import asynccontextmanager
 import time
 import logging
 
-from fastapi import FastAPI, Request, Depends, Response
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.container import Container
 from config import settings
 from interfaces.controllers import router as api_router
-from interfaces.controllers.dependencies import (
-    get_memo_repo,
-    get_index_repo,
-    get_datetime_provider,
-    get_faiss_index_repo,
-    get_embedder_service,
-)
-from infrastructure.persistence.fs_memo_repo import FileSystemMemoRepository
-from infrastructure.persistence.faiss_index_repo import FaissIndexRepository
-from infrastructure.services.embedder import EmbedderService
-from interfaces.utils.datetime import DateTimeProvider
 
 # ─── Logging setup ─────────────────────────────────────────────────────────
 logging.basicConfig(
@@ -27,12 +17,70 @@ logging.basicConfig(
 )
 logger = logging.getLogger("uvicorn.access")
 
+# 起動時の未ベクトル化メモ走査のバッチサイズ
+STARTUP_BATCH_SIZE = 100
+
+
+async def initialize_faiss(container: Container) -> None:
+    """
+    起動時にFAISSインデックスの初期化を行う。
+    初回のみ全メモのベクトル化とインデックス構築を実施し、以降はスキップ。
+    """
+    memo_repo = container.memo_repo
+    faiss_repo = container.faiss_index_repo
+    embedder = container.embedder
+
+    if not faiss_repo.id_to_uuid:
+        # 未ベクトル化のメモだけをバッチ単位で埋め込み（全件をメモリに載せない）
+        async for batch in memo_repo.iter_all(STARTUP_BATCH_SIZE):
+            missing = [m for m in batch if getattr(m, "embedding", None) is None]
+            if not missing:
+                continue
+            vecs = await asyncio.to_thread(
+                embedder.encode_bulk, [m.body or m.title or "" for m in missing]
+            )
+            for memo, vec in zip(missing, vecs):
+                memo.embedding = vec
+                await memo_repo.save_embedding(memo)
+
+        uuids, matrix = memo_repo.embedding_matrix()
+        if not uuids:
+            logger.debug("FAISS initialization skipped: no memos")
+            return
+        try:
+            await faiss_repo.rebuild_from_matrix(uuids, matrix)
+        except Exception as e:
+            logger.error("FAISS initial rebuild failed: %s", e, exc_info=True)
+            return
+        container.search_cache.invalidate()
+        logger.debug("FAISS initial rebuild done: %d memos indexed", len(uuids))
+    else:
+        logger.debug("FAISS initialization skipped: %d entries already indexed", len(faiss_repo.id_to_uuid))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    アプリケーション寿命でリソースを一度だけ生成し、終了時に解放する
+    """
+    container = Container(settings)
+    app.state.container = container
+    try:
+        if settings.model_warmup:
+            # 初回リクエストでモデルロードを待たせないよう、ここで共有モデルを温める
+            await asyncio.to_thread(container.embedder.warm_up)
+        await initialize_faiss(container)
+        yield
+    finally:
+        await container.close()
+
 
 def create_app() -> FastAPI:
     app = FastAPI(
         title=settings.title,
         version=settings.version,
         description=settings.description,
+        lifespan=lifespan,
     )
 
     # ─── Middleware ─────────────────────────────────────────────────────────
@@ -66,56 +114,6 @@ def create_app() -> FastAPI:
         )
         return response
 
-    # ─── Dependency Providers ─────────────────────────────────────────────────
-    def provide_memo_repo() -> FileSystemMemoRepository:
-        return FileSystemMemoRepository(Path(settings.memos_root))
-
-    def provide_index_repo(
-        memo_repo: FileSystemMemoRepository = Depends(provide_memo_repo),
-    ) -> FaissIndexRepository:
-        return FaissIndexRepository(
-            index_dir=Path(settings.index_data_root),
-            memo_repo=memo_repo,
-            dim=settings.embedding_dim,
-        )
-
-    def provide_datetime_provider() -> DateTimeProvider:
-        return get_datetime_provider()
-
-    def provide_embedder() -> EmbedderService:
-        return get_embedder_service()
-
-    app.dependency_overrides = {
-        get_memo_repo: provide_memo_repo,
-        get_index_repo: provide_index_repo,
-        get_datetime_provider: provide_datetime_provider,
-        get_faiss_index_repo: provide_index_repo,
-        get_embedder_service: provide_embedder,
-    }
-
-    # ─── Startup Events ───────────────────────────────────────────────────────
-    @app.on_event("startup")
-    async def initialize_faiss():
-        """
-        起動時にFAISSインデックスの初期化を行う。
-        初回のみ全メモのベクトル化とインデックス構築を実施し、以降はスキップ。
-        """
-        memo_repo = provide_memo_repo()
-        faiss_repo = provide_index_repo(memo_repo)
-        embedder = provide_embedder()
-
-        if not faiss_repo.id_to_uuid:
-            all_memos = await memo_repo.list_all()
-            for memo in all_memos:
-                if getattr(memo, "embedding", None) is None:
-                    vec = embedder.encode(memo.body or memo.title or "")
-                    memo.embedding = vec
-                    await asyncio.to_thread(memo_repo._save_embedding, memo)
-            faiss_repo.rebuild(all_memos)
-            logger.debug("FAISS initial rebuild done: %d memos indexed", len(all_memos))
-        else:
-            logger.debug("FAISS initialization skipped: %d entries already indexed", len(faiss_repo.id_to_uuid))
-
     # ─── Routers ─────────────────────────────────────────────────────────────
     app.include_router(api_router, prefix="/api")
 
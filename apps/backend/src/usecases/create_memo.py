@@ -5,6 +5,7 @@ from typing import Optional, List, Protocol
 from domain.memo import Memo
 from interfaces.repositories.memo_repo import MemoRepository
 from interfaces.utils.datetime import DateTimeProvider
+from infrastructure.services.search_cache import ResultCache
 
 logger = logging.getLogger(__name__)
 
@@ -24,10 +25,12 @@ class CreateMemoUseCase:
         memo_repo: MemoRepository,
         datetime_provider: DateTimeProvider,
         index_repo: Optional[IndexRepository] = None,
+        cache: Optional[ResultCache] = None,
     ):
         self._memo_repo = memo_repo
         self._dt_provider = datetime_provider
         self._index_repo = index_repo
+        self._cache = cache
 
     async def execute(
         self,
@@ -66,4 +69,8 @@ class CreateMemoUseCase:
             except Exception as e:
                 logger.error("Failed to index memo (uuid=%s): %s", memo.uuid, e)
 
+        # 4) 検索結果キャッシュを無効化（索引更新の成否によらず、保存済みの内容を次の検索に反映する）
+        if self._cache is not None:
+            self._cache.invalidate()
+
         return memo
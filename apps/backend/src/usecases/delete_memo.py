@@ -0,0 +1,45 @@
+import logging
+from typing import Optional, Protocol
+
+from interfaces.repositories.memo_repo import MemoRepository
+from infrastructure.services.search_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+
+class MemoIndexRemover(Protocol):
+    """削除されたメモを検索インデックスから取り除くインターフェース"""
+    async def remove(self, uuid: str) -> None:
+        ...
+
+
+class DeleteMemoUseCase:
+    """
+    メモを削除し、各検索インデックスからも取り除くユースケース
+    """
+
+    def __init__(
+        self,
+        memo_repo: MemoRepository,
+        indexer: Optional[MemoIndexRemover] = None,
+        cache: Optional[ResultCache] = None,
+    ):
+        self._memo_repo = memo_repo
+        self._indexer = indexer
+        self._cache = cache
+
+    async def execute(self, uuid: str) -> bool:
+        deleted = await self._memo_repo.delete(uuid)
+        if not deleted:
+            return False
+
+        if self._indexer is not None:
+            try:
+                await self._indexer.remove(uuid)
+                logger.info("Memo removed from indexes (uuid=%s)", uuid)
+            except Exception as e:
+                logger.error("Failed to remove memo from indexes (uuid=%s): %s", uuid, e)
+
+        if self._cache is not None:
+            self._cache.invalidate()
+        return True
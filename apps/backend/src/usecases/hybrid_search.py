@@ -1,11 +1,16 @@
 import asyncio
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from domain.memo import Memo
-from interfaces.repositories.index_repo import IndexRepository
+from domain.memo_filter import MemoFilter
+from interfaces.repositories.index_repo import ChunkIndexRepository
+from interfaces.repositories.memo_repo import MemoRepository
 from interfaces.repositories.search_repo import SearchRepository
+from infrastructure.services import score_fusion
 from infrastructure.services.embedder import EmbedderService
+from infrastructure.services.score_fusion import FusionConfig
+from infrastructure.services.search_cache import SearchResultCache
 
 logger = logging.getLogger(__name__)
 
@@ -13,146 +18,225 @@ logger = logging.getLogger(__name__)
 class HybridSearchUseCase:
     """
     チャンク単位 FAISS + Elasticsearch を融合したハイブリッド検索ユースケース。
-    FAISSの距離を類似度に変換し、両者スコアをMin-Max正規化してから合成する。
-    top_k=None のときは「無制限取得」を行う。
+    FAISS の内積スコアと Elasticsearch のスコアを score_fusion で融合する
+    （Min-Max / z-score / RRF をリクエストごとに選べる。既定はコンストラクタの fusion）。
+    FAISS 側はメモ単位検索で、異なるメモを top_k 件（1 メモにつき最も近いチャンク 1 件）取る。
+    top_k=None のときは max_results 件を上限に取得する。
+    filters は FAISS では探索対象の絞り込み、Elasticsearch では filter 句として検索前に適用する。
     """
 
     def __init__(
         self,
-        chunk_repo: IndexRepository,
+        chunk_repo: ChunkIndexRepository,
         elastic_repo: SearchRepository,
         embedder: EmbedderService,
         semantic_weight: float = 0.2,
         elastic_weight: float = 0.8,
+        memo_repo: Optional[MemoRepository] = None,
+        max_results: int = 1000,
+        fusion: str = score_fusion.MINMAX,
+        rrf_k: int = 60,
+        cache: Optional[SearchResultCache] = None,
     ) -> None:
         self.chunk_repo = chunk_repo
         self.elastic_repo = elastic_repo
         self.embedder = embedder
+        self.memo_repo = memo_repo or getattr(chunk_repo, "memo_repo", None)
         self.semantic_weight = semantic_weight
         self.elastic_weight = elastic_weight
+        self.max_results = max_results
+        # 既定の融合方式（不正な値はここで弾く）
+        self.fusion = FusionConfig(method=fusion).method
+        self.rrf_k = rrf_k
+        self.cache = cache
 
-    async def execute(self, query: str, top_k: Optional[int] = None) -> List[Memo]:
+    async def execute(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        filters: Optional[MemoFilter] = None,
+        fusion: Optional[str] = None,
+    ) -> List[Memo]:
+        """
+        ef_search: チャンク索引が HNSW のときの探索幅（None なら索引の既定値）
+        filters: カテゴリ・タグ・作成日時の絞り込み（None なら全件が対象）
+        fusion: 融合方式 minmax / zscore / rrf（None なら既定値）
+        cache があれば同じ条件・同じ索引世代の結果を再利用する
+        """
+        limit = top_k or self.max_results
+        if filters is not None and filters.is_empty:
+            filters = None
+        fusion = fusion or self.fusion
+        if self.cache is None:
+            return await self._execute(query, limit, ef_search, filters, fusion)
+        key = self.cache.key("hybrid", query, limit, ef_search, filters, fusion)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        results = await self._execute(query, limit, ef_search, filters, fusion)
+        self.cache.put(key, results)
+        return results
+
+    async def _execute(
+        self,
+        query: str,
+        limit: int,
+        ef_search: Optional[int],
+        filters: Optional[MemoFilter],
+        fusion: str,
+    ) -> List[Memo]:
         # ──── ショートサーキット：全文検索のみ ────
         if self.semantic_weight <= 0:
-            es_hits = (
-                await self.elastic_repo.search_all(query)
-                if top_k is None
-                else await self.elastic_repo.search(query, top_k)
-            )
+            es_hits = await self.elastic_repo.search(query, limit, filters)
             results = []
             for memo, score in es_hits:
                 setattr(memo, "hybrid_score", score)
                 results.append(memo)
-            return results if top_k is None else results[:top_k]
+            return results[:limit]
 
         # ──── ショートサーキット：セマンティック検索のみ ────
         if self.elastic_weight <= 0:
-            q_vec = await asyncio.to_thread(self.embedder.encode, query)
-            uuids_chunks, dists = await asyncio.to_thread(
-                self.chunk_repo.search, q_vec, top_k
+            allowed = await self._allowed_uuids(filters)
+            if allowed is not None and not allowed:
+                return []
+            q_vec = await self.embedder.aencode(query)
+            chunk_hits = await self.chunk_repo.search_memos(
+                q_vec, limit, ef_search=ef_search, memo_uuids=allowed
             )
 
+            best = self._best_chunks(chunk_hits)
+            memo_map = await self._fetch_memos(list(best))
+
             results = []
-            for chunk_uuid, dist in zip(uuids_chunks, dists):
-                if not chunk_uuid:
+            for base_uuid, (chunk_id, similarity) in sorted(
+                best.items(), key=lambda x: x[1][1], reverse=True
+            ):
+                memo = memo_map.get(base_uuid)
+                if memo is None:
+                    logger.warning("Semantic fallback failed for uuid=%s", base_uuid)
                     continue
-                base_uuid = chunk_uuid.split("_", 1)[0]
-                try:
-                    memo = await self.chunk_repo.memo_repo.get_by_uuid(base_uuid)
-                    # 距離→類似度
-                    similarity = 1.0 - float(dist)
-                    setattr(memo, "hybrid_score", similarity)
-                    results.append(memo)
-                except Exception as e:
-                    logger.warning(
-                        "Semantic fallback failed for uuid=%s: %s", base_uuid, e
-                    )
-
-            return results if top_k is None else results[:top_k]
+                setattr(memo, "hybrid_score", similarity)
+                self._attach_passage(memo, chunk_id)
+                results.append(memo)
 
-        # ──── 通常のハイブリッド検索 ────
+            return results[:limit]
 
-        # 1. クエリ埋め込みをスレッドで計算
-        q_vec = await asyncio.to_thread(self.embedder.encode, query)
+        # ──── 通常のハイブリッド検索 ────
 
-        # 2. 並列検索: FAISS と Elasticsearch
-        faiss_task = asyncio.to_thread(self.chunk_repo.search, q_vec, top_k)
-        es_task = (
-            self.elastic_repo.search_all(query)
-            if top_k is None
-            else self.elastic_repo.search(query, top_k)
+        # 1〜2. 絞り込み対象の解決・埋め込み・FAISS と Elasticsearch の並列検索
+        best, es_hits = await self.retrieve(query, limit, ef_search, filters)
+        es_map: Dict[str, Memo] = {memo.uuid: memo for memo, _ in es_hits}
+
+        # 3. 融合（正規化・重み付け・上位 limit 件の選択まで配列上で行う）
+        config = self._fusion_config(fusion)
+        fused = score_fusion.fuse(
+            [(uid, score) for uid, (_, score) in best.items()],
+            [(memo.uuid, float(score)) for memo, score in es_hits],
+            limit,
+            config,
         )
-        (uuids_chunks, dists), es_hits = await asyncio.gather(faiss_task, es_task)
+        logger.debug("Fused hybrid scores (%s): %s", config.method, fused)
 
-        # 3. FAISS結果をベースUUIDごとに「最大類似度」で集計
-        sem_raw: Dict[str, float] = {}
-        for chunk_uuid, dist in zip(uuids_chunks, dists):
-            if not chunk_uuid:
-                continue
-            base_uuid = chunk_uuid.split("_", 1)[0]
-            similarity = 1.0 - float(dist)
-            sem_raw[base_uuid] = max(sem_raw.get(base_uuid, 0.0), similarity)
-
-        # 4. Elasticsearch結果をマップ化
-        es_raw: Dict[str, float] = {}
-        es_map: Dict[str, Memo] = {}
-        for memo, score in es_hits:
-            es_raw[memo.uuid] = float(score)
-            es_map[memo.uuid] = memo
-
-        # 5. スコアをMin-Max正規化
-        sem_scores = self._normalize_scores(sem_raw)
-        es_scores = self._normalize_scores(es_raw)
-
-        # 6. 全候補UUIDを収集し、重み付き合成
-        all_ids = set(sem_scores) | set(es_scores)
-        combined_scores: Dict[str, float] = {
-            uid: sem_scores.get(uid, 0.0) * self.semantic_weight
-                 + es_scores.get(uid, 0.0) * self.elastic_weight
-            for uid in all_ids
-        }
-        logger.debug("Combined hybrid scores: %s", combined_scores)
-
-        # 7. Elasticsearch未取得分のフォールバック取得
-        missing = [uid for uid in all_ids if uid not in es_map]
+        # 4. Elasticsearch未取得分のフォールバック取得
+        missing = [uid for uid, _ in fused if uid not in es_map]
         fetched_map: Dict[str, Memo] = {}
         if missing:
             fetched = await self.elastic_repo.mget(missing)
+            not_in_es = []
             for uid, memo in zip(missing, fetched):
                 if memo:
                     fetched_map[uid] = memo
                 else:
-                    try:
-                        fallback = await self.chunk_repo.memo_repo.get_by_uuid(uid)
-                        fetched_map[uid] = fallback
-                    except Exception as e:
-                        logger.warning(
-                            "Fallback get_by_uuid failed for uuid=%s: %s", uid, e
-                        )
-
-        # 8. 結果組立 & ソート
+                    not_in_es.append(uid)
+            if not_in_es:
+                fetched_map.update(await self._fetch_memos(not_in_es))
+
+        # 5. 結果組立（fused は既に降順）
         results: List[Memo] = []
-        for uid, score in sorted(
-            combined_scores.items(), key=lambda x: x[1], reverse=True
-        ):
+        for uid, score in fused:
             memo = es_map.get(uid) or fetched_map.get(uid)
             if memo is None:
                 logger.warning("Memo not found for uuid=%s", uid)
                 continue
             setattr(memo, "hybrid_score", score)
+            if uid in best:
+                self._attach_passage(memo, best[uid][0])
             results.append(memo)
 
-        return results if top_k is None else results[:top_k]
+        return results
+
+    async def retrieve(
+        self,
+        query: str,
+        limit: int,
+        ef_search: Optional[int] = None,
+        filters: Optional[MemoFilter] = None,
+    ) -> Tuple[Dict[str, Tuple[str, float]], List[Tuple[Memo, float]]]:
+        """
+        融合前の 2 系統の候補を返す → ({メモUUID: (一致チャンクID, 内積スコア)}, [(Memo, ES スコア)])
+        （融合方式のオフライン評価でも使う）
+        """
+        allowed = await self._allowed_uuids(filters)
+        if allowed is not None and not allowed:
+            return {}, []
+        q_vec = await self.embedder.aencode(query)
+        faiss_task = self.chunk_repo.search_memos(
+            q_vec, limit, ef_search=ef_search, memo_uuids=allowed
+        )
+        es_task = self.elastic_repo.search(query, limit, filters)
+        chunk_hits, es_hits = await asyncio.gather(faiss_task, es_task)
+        return self._best_chunks(chunk_hits), es_hits
+
+    def _fusion_config(self, fusion: Optional[str]) -> FusionConfig:
+        return FusionConfig(
+            method=fusion or self.fusion,
+            semantic_weight=self.semantic_weight,
+            elastic_weight=self.elastic_weight,
+            rrf_k=self.rrf_k,
+        )
+
+    async def _allowed_uuids(self, filters: Optional[MemoFilter]) -> Optional[List[str]]:
+        """絞り込み条件に合うメモ UUID（条件なし・メタデータ源なしは None＝全件）"""
+        if filters is None:
+            return None
+        if self.memo_repo is None:
+            logger.warning("No memo repository for metadata filters; semantic side is unfiltered")
+            return None
+        return await self.memo_repo.filter_uuids(filters)
 
     @staticmethod
-    def _normalize_scores(score_map: Dict[str, float]) -> Dict[str, float]:
+    def _best_chunks(chunk_hits: List[Tuple[str, float]]) -> Dict[str, Tuple[str, float]]:
         """
-        Min-Max正規化を行う。全要素が同一値なら1.0を返す。
+        ベースUUID → (最も類似したチャンクID, スコア)
+        チャンク索引は内積（正規化済みベクトルならコサイン類似度）なので、スコアは大きいほど近い
         """
-        if not score_map:
+        best: Dict[str, Tuple[str, float]] = {}
+        for chunk_id, score in chunk_hits:
+            if not chunk_id:
+                continue
+            base_uuid = chunk_id.split("_", 1)[0]
+            score = float(score)
+            if base_uuid not in best or score > best[base_uuid][1]:
+                best[base_uuid] = (chunk_id, score)
+        return best
+
+    def _attach_passage(self, memo: Memo, chunk_id: str) -> None:
+        """保存済みのチャンク本文・オフセットを一致箇所として付与（再分割はしない）"""
+        get_passage = getattr(self.chunk_repo, "get_passage", None)
+        chunk = get_passage(chunk_id) if get_passage is not None else None
+        if chunk is None:
+            return
+        setattr(memo, "passage", chunk.text)
+        setattr(memo, "passage_start", chunk.start)
+        setattr(memo, "passage_end", chunk.end)
+
+    async def _fetch_memos(self, uuids: List[str]) -> Dict[str, Memo]:
+        """MemoRepository.get_many で一括取得（未設定・失敗時は空）"""
+        if not uuids or self.memo_repo is None:
+            return {}
+        try:
+            return await self.memo_repo.get_many(uuids)
+        except Exception as e:
+            logger.warning("Fallback get_many failed for %d uuids: %s", len(uuids), e)
             return {}
-        vals = list(score_map.values())
-        min_v, max_v = min(vals), max(vals)
-        if max_v == min_v:
-            return {k: 1.0 for k in score_map}
-        return {k: (v - min_v) / (max_v - min_v) for k, v in score_map.items()}
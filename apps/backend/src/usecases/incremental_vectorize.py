@@ -1,12 +1,17 @@
-from typing import List, Tuple
+import logging
+from typing import List, Optional, Set, Tuple
 from fastapi import FastAPI
 import numpy as np
 from anyio import to_thread
 
-from domain.memo import Memo
 from interfaces.repositories.memo_repo import MemoRepository
 from infrastructure.persistence.faiss_chunk_repo import FaissChunkRepository
+from infrastructure.services.chunker import Chunk
 from infrastructure.services.embedder import EmbedderService
+from infrastructure.services.search_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
 
 class IncrementalVectorizeUseCase:
     def __init__(
@@ -14,67 +19,72 @@ class IncrementalVectorizeUseCase:
         chunk_repo: FaissChunkRepository,
         memo_repo: MemoRepository,
         app: FastAPI,
-        embedder: EmbedderService = EmbedderService(),
+        embedder: EmbedderService,
+        batch_size: int = 100,
+        cache: Optional[ResultCache] = None,
     ) -> None:
         self._chunk_repo = chunk_repo
         self._memo_repo  = memo_repo
         self._app        = app
+        # コンテナが持つ共有インスタンス（キャッシュ・バッチャーを他のユースケースと共用する）
         self._embedder   = embedder
+        self._batch_size = batch_size
+        self._cache      = cache
 
         # 進捗 state の初期化
         self._app.state.vectorize_progress = {"processed": 0, "total": 0}
 
     async def execute(self) -> None:
-        logger = getattr(self._app, "logger", None)
-        if logger:
-            logger.info("IncrementalVectorizeUseCase: START")
-        else:
-            print("UseCase START")
+        logger.info("IncrementalVectorizeUseCase: START")
 
-        # 1) 全メモ取得
-        all_memos: List[Memo] = await self._memo_repo.list_all() or []
-        # 2) 未ベクトル化分を抽出
-        to_vectorize: List[Memo] = await self._chunk_repo.filter_new(all_memos) or []
+        # 1) メタデータだけをストリームで走査し、未ベクトル化分の UUID を抽出
+        pending: Set[str] = set()
+        async for batch in self._memo_repo.iter_all(self._batch_size, fields=()):
+            new = await self._chunk_repo.filter_new(batch) or []
+            pending.update(m.uuid for m in new)
 
-        total = len(to_vectorize)
+        total = len(pending)
         # 進捗情報をまとめて更新
         self._app.state.vectorize_progress.update(total=total, processed=0)
 
         if total == 0:
-            if logger:
-                logger.info("No new memos to vectorize.")
-            else:
-                print("新規メモなし")
+            logger.info("No new memos to vectorize.")
             return
 
-        # 3) 各メモをチャンク→エンコード→追加
-        for idx, memo in enumerate(to_vectorize, start=1):
-            # encode_chunks は CPU バウンドの可能性があるため thread で実行
-            chunked: List[Tuple[str, np.ndarray]] = await to_thread.run_sync(
-                lambda text: self._embedder.encode_chunks(text),
-                memo.body or memo.title or ""
+        # 2) 本文付きで再度ストリームし、対象メモのチャンクをバッチ単位でまとめてエンコード→追加
+        idx = 0
+        async for batch in self._memo_repo.iter_all(self._batch_size, fields=("body",)):
+            targets = [m for m in batch if m.uuid in pending]
+            if not targets:
+                continue
+            # 複数メモのチャンクを長さバケット化して一括推論（CPU バウンドのため thread で実行）
+            chunked: List[List[Tuple[Chunk, np.ndarray]]] = await to_thread.run_sync(
+                self._embedder.encode_chunks_many,
+                [m.body or m.title or "" for m in targets],
             )
 
-            # (chunk_id, vector) ペアをまとめて生成
-            items: List[Tuple[str, np.ndarray]] = [
-                (f"{memo.uuid}_{i}", vec)
-                for i, (_, vec) in enumerate(chunked)
-            ]
+            # (chunk_id, vector) ペアと、チャンク本文・オフセットをまとめて生成
+            items: List[Tuple[str, np.ndarray]] = []
+            passages: List[Chunk] = []
+            for memo, chunks in zip(targets, chunked):
+                for i, (chunk, vec) in enumerate(chunks):
+                    items.append((f"{memo.uuid}_{i}", vec))
+                    passages.append(chunk)
 
             # バッチ追加（実装側で一括追加に対応）
-            self._chunk_repo.add_chunks_batch(items)
+            await self._chunk_repo.add_chunks_batch(items, passages)
+            if self._cache is not None:
+                self._cache.invalidate()
 
             # 進捗更新
+            idx += len(targets)
             self._app.state.vectorize_progress["processed"] = idx
 
-            if logger:
-                logger.info(f"Vectorized memo {memo.uuid} ({idx}/{total})")
-            else:
-                print(f"ベクトル化完了: {memo.uuid} ({idx}/{total})")
+            stats = self._embedder.bulk_stats() or {}
+            logger.info(
+                f"Vectorized {len(targets)} memos ({idx}/{total}), "
+                f"{stats.get('chunks_per_sec', 0.0):.1f} chunks/sec"
+            )
 
-        if logger:
-            logger.info("All chunks added to FAISS index.")
-            logger.info("IncrementalVectorizeUseCase: COMPLETE")
-        else:
-            print("FAISS への追加完了")
-            print("UseCase COMPLETE")
+        logger.info("All chunks added to FAISS index.")
+        logger.info("IncrementalVectorizeUseCase: COMPLETE")
@@ -0,0 +1,49 @@
+import base64
+import json
+from typing import List, Optional, Tuple
+
+from domain.memo import Memo
+from interfaces.repositories.memo_repo import MemoRepository, PageKey
+
+# 一覧 API では埋め込みは不要
+_LIST_FIELDS = ("body",)
+
+
+class InvalidCursorError(ValueError):
+    """ページングカーソルが不正なときに投げられる例外"""
+    pass
+
+
+def encode_cursor(key: PageKey) -> str:
+    raw = json.dumps([key[0], key[1]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> PageKey:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, uuid = json.loads(base64.urlsafe_b64decode(padded))
+        return float(ts), str(uuid)
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor!r}") from e
+
+
+class ListMemosUseCase:
+    """
+    created_at → uuid 順のカーソルページングでメモ一覧を返すユースケース
+    """
+
+    def __init__(self, memo_repo: MemoRepository):
+        self._memo_repo = memo_repo
+
+    async def execute(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Memo], Optional[str]]:
+        """
+        戻り値は (メモ一覧, 次ページのカーソル or None)。
+        """
+        after = decode_cursor(cursor) if cursor else None
+        memos, next_key = await self._memo_repo.list_page(limit, after, fields=_LIST_FIELDS)
+        return memos, encode_cursor(next_key) if next_key is not None else None
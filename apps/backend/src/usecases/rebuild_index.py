@@ -1,15 +1,26 @@
-from typing import List
+from typing import Optional
 
 from interfaces.repositories.index_repo import IndexRepository
-from interfaces.repositories.memo_repo import MemoRepository
-from domain.memo import Memo
+from infrastructure.persistence.fs_memo_repo import FileSystemMemoRepository
+from infrastructure.services.search_cache import ResultCache
+
 
 class RebuildIndexUseCase:
-    def __init__(self, index_repo: IndexRepository, memo_repo: MemoRepository):
+    def __init__(
+        self,
+        index_repo: IndexRepository,
+        memo_repo: FileSystemMemoRepository,
+        cache: Optional[ResultCache] = None,
+    ):
         self.index_repo = index_repo
         self.memo_repo = memo_repo
+        self.cache = cache
 
     async def execute(self) -> None:
-        memos: List[Memo] = await self.memo_repo.list_all()
-        # 同期メソッドとして全件再構築
-        self.index_repo.rebuild(memos)
+        # 本文は読まず、EmbeddingStore の memmap をそのまま渡す（メモ単位のロード・行列のコピーをしない）
+        uuids, matrix = self.memo_repo.embedding_matrix()
+        if not uuids:
+            return
+        await self.index_repo.rebuild_from_matrix(uuids, matrix)
+        if self.cache is not None:
+            self.cache.invalidate()
@@ -1,13 +1,16 @@
 from dataclasses import replace
 import asyncio
 import logging
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
 from domain.memo import Memo
+from domain.memo_filter import MemoFilter
 from interfaces.repositories.index_repo import IndexRepository
 from interfaces.repositories.memo_repo import MemoRepository
+from infrastructure.services.embedder import EmbedderService
+from infrastructure.services.search_cache import SearchResultCache
 
 logger = logging.getLogger(__name__)
 
@@ -15,42 +18,105 @@ logger = logging.getLogger(__name__)
 class SearchMemosUseCase:
     """SentenceTransformers + FAISS によるセマンティック検索"""
 
-    _embedder = SentenceTransformer("sentence-transformers/LaBSE")
-
     def __init__(
         self,
         index_repo: IndexRepository,
-        memo_repo: MemoRepository
+        memo_repo: MemoRepository,
+        embedder: EmbedderService,
+        cache: Optional[SearchResultCache] = None,
     ) -> None:
         self.index_repo = index_repo
         self.memo_repo = memo_repo
+        self.embedder = embedder
+        self.cache = cache
+
+    async def execute(
+        self,
+        query: str,
+        top_k: int = 100,
+        filters: Optional[MemoFilter] = None,
+    ) -> list[Memo]:
+        """
+        filters を渡すと条件に合うメモだけを FAISS の探索対象にする（事後の間引きはしない）
+        cache があれば同じ条件・同じ索引世代の結果を再利用する
+        """
+        if self.cache is None:
+            return await self._execute(query, top_k, filters)
+        key = self.cache.key("semantic", query, top_k, filters)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        results = await self._execute(query, top_k, filters)
+        self.cache.put(key, results)
+        return results
+
+    async def _execute(
+        self,
+        query: str,
+        top_k: int,
+        filters: Optional[MemoFilter],
+    ) -> list[Memo]:
+        # 0. 絞り込み対象（該当なしなら埋め込みも省く）
+        allowed = None
+        if filters is not None and not filters.is_empty:
+            allowed = await self.memo_repo.filter_uuids(filters)
+            if not allowed:
+                return []
 
-    async def execute(self, query: str, top_k: int = 100) -> list[Memo]:
         # 1. ベクトル化
-        q_vec = self._embed(query)
+        q_vec = await self.embedder.aencode(query)
 
         # 2. 類似検索
-        uuids, dists = await self.index_repo.search(q_vec, top_k)
-        dists = np.asarray(dists).flatten()
-        uuids = [u for u in uuids if u]
-        if not uuids:
+        uuids, dists = await self.index_repo.search(q_vec, top_k, memo_uuids=allowed)
+        hits = self._hits(uuids, dists)
+        if not hits:
             return []
 
-        # 3. メモ取得（並列）
-        coros = [self.memo_repo.get_by_uuid(u) for u in uuids]
-        results = await asyncio.gather(*coros, return_exceptions=True)
+        # 3. メモ取得（一括）
+        memo_map = await self.memo_repo.get_many(u for u, _ in hits)
 
         # 4. スコア付与 & フィルタリング
+        return self._to_memos(hits, memo_map)
+
+    async def execute_batch(self, queries: List[str], top_k: int = 10) -> List[list[Memo]]:
+        """
+        複数クエリをまとめて検索する（クエリと同じ並びで結果を返す。空クエリは空リスト）
+        埋め込み・FAISS 検索・メモ取得をそれぞれ 1 回にまとめる
+        """
+        texts = [q.strip() for q in queries]
+        active = [i for i, t in enumerate(texts) if t]
+        results: List[list[Memo]] = [[] for _ in texts]
+        if not active:
+            return results
+
+        # 1. まとめてベクトル化（大量クエリ向けのバケット化バッチ推論）
+        vecs = await asyncio.to_thread(self.embedder.encode_bulk, [texts[i] for i in active])
+
+        # 2. クエリ行列で 1 回検索
+        rows = await self.index_repo.search_batch(np.asarray(vecs, dtype="float32"), top_k)
+        hits_per_query = [self._hits(uuids, dists) for uuids, dists in rows]
+
+        # 3. 全クエリ分のメモを一括取得
+        wanted = {u for hits in hits_per_query for u, _ in hits}
+        memo_map = await self.memo_repo.get_many(wanted) if wanted else {}
+
+        for i, hits in zip(active, hits_per_query):
+            results[i] = self._to_memos(hits, memo_map)
+        return results
+
+    @staticmethod
+    def _hits(uuids: List[str], dists) -> List[Tuple[str, float]]:
+        dists = np.asarray(dists).flatten()
+        return [(u, float(d)) for u, d in zip(uuids, dists) if u]
+
+    @staticmethod
+    def _to_memos(hits: List[Tuple[str, float]], memo_map: Dict[str, Memo]) -> list[Memo]:
         memos: list[Memo] = []
-        for uuid, res, dist in zip(uuids, results, dists):
-            if isinstance(res, Exception):
-                logger.warning("memo uuid=%s fetch failed: %s", uuid, res)
+        for uuid, dist in hits:
+            memo = memo_map.get(uuid)
+            if memo is None:
+                logger.warning("memo uuid=%s fetch failed: not found", uuid)
                 continue
             # dataclasses.replace を使ってスコアを更新したコピーを生成
-            memos.append(replace(res, score=float(dist)))
-
+            memos.append(replace(memo, score=dist))
         return memos
-
-    @classmethod
-    def _embed(cls, text: str) -> np.ndarray:
-        return cls._embedder.encode(text, convert_to_numpy=True).astype("float32")
@@ -0,0 +1,44 @@
+import logging
+from typing import Optional, Protocol
+
+from domain.memo import Memo
+from interfaces.repositories.memo_repo import MemoRepository
+from infrastructure.services.search_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+
+class MemoReindexer(Protocol):
+    """更新されたメモを検索インデックスへ反映するインターフェース"""
+    async def reindex(self, memo: Memo) -> None:
+        ...
+
+
+class UpdateMemoUseCase:
+    """
+    メモを更新し、各検索インデックスの該当ベクトル・チャンクを置き換えるユースケース
+    """
+
+    def __init__(
+        self,
+        memo_repo: MemoRepository,
+        indexer: Optional[MemoReindexer] = None,
+        cache: Optional[ResultCache] = None,
+    ):
+        self._memo_repo = memo_repo
+        self._indexer = indexer
+        self._cache = cache
+
+    async def execute(self, uuid: str, title: str, body: str) -> Memo:
+        updated = await self._memo_repo.update(uuid=uuid, title=title, body=body)
+
+        if self._indexer is not None:
+            try:
+                await self._indexer.reindex(updated)
+                logger.info("Memo reindexed (uuid=%s)", uuid)
+            except Exception as e:
+                logger.error("Failed to reindex memo (uuid=%s): %s", uuid, e)
+
+        if self._cache is not None:
+            self._cache.invalidate()
+        return updated
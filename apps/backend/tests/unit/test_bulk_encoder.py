@@ -0,0 +1,52 @@
+import numpy as np
+
+from infrastructure.services.bulk_encoder import BulkEncoder, length_buckets
+from infrastructure.services.embedder import EmbedderService
+
+
+class _LengthBackend:
+    """文字数をトークン長とみなし、各バッチの長さを記録する"""
+    name = "fake"
+    cache_tag = "fake"
+
+    def __init__(self):
+        self.batches = []
+
+    def dimension(self):
+        return 2
+
+    def token_lengths(self, texts):
+        return [len(t) for t in texts]
+
+    def encode(self, texts, batch_size=32):
+        self.batches.append([len(t) for t in texts])
+        return np.array([[len(t), 1.0] for t in texts], dtype="float32")
+
+
+def test_length_buckets_group_similar_lengths():
+    buckets = length_buckets([5, 1, 4, 2, 3], batch_size=2)
+    assert [b.tolist() for b in buckets] == [[1, 3], [4, 2], [0]]
+
+
+def test_bulk_encoder_keeps_input_order():
+    backend = _LengthBackend()
+    texts = ["aaaa", "a", "aaa", "aa", "aaaaa"]
+    out, stats = BulkEncoder(backend, batch_size=2).encode(texts)
+    assert out[:, 0].tolist() == [4, 1, 3, 2, 5]
+    assert backend.batches == [[1, 2], [3, 4], [5]]
+    assert stats.items == 5 and stats.batches == 3
+    assert stats.tokens == 15 and stats.padded_tokens == 2 * 2 + 2 * 4 + 5
+    assert stats.chunks_per_sec > 0
+
+
+def test_encode_chunks_many_splits_per_memo(tmp_path):
+    backend = _LengthBackend()
+    svc = EmbedderService("m", cache_dir=tmp_path, backend=backend, bulk_batch_size=8)
+    result = svc.encode_chunks_many(["one\ntwo", "three"], max_length=5)
+    assert [[c.text for c, _ in chunks] for chunks in result] == [["one", "two"], ["three"]]
+    assert len(backend.batches) == 1
+    assert svc.bulk_stats()["items"] == 3
+
+    # 2 回目はディスク／LRU キャッシュから返り、一括エンコードは走らない
+    svc.encode_chunks_many(["one\ntwo"], max_length=5)
+    assert len(backend.batches) == 1
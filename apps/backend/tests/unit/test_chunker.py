@@ -0,0 +1,75 @@
+import asyncio
+
+import numpy as np
+
+from infrastructure.persistence.faiss_chunk_repo import FaissChunkRepository
+from infrastructure.services.chunker import Chunk, TextChunker, split_sentences
+
+
+def test_split_sentences_handles_japanese_and_english():
+    text = "今日は晴れ。明日は雨！\n\nThis is one. And two?"
+    spans = [(text[s:e], para) for s, e, para in split_sentences(text)]
+    assert spans == [
+        ("今日は晴れ。", False),
+        ("明日は雨！", True),
+        ("This is one.", False),
+        ("And two?", True),
+    ]
+
+
+def test_chunks_respect_budget_and_offsets():
+    text = "一文目です。二文目です。三文目です。四文目です。"
+    chunks = TextChunker(max_tokens=12).split(text)
+    assert [c.text for c in chunks] == ["一文目です。二文目です。", "三文目です。四文目です。"]
+    for c in chunks:
+        assert text[c.start:c.end] == c.text
+        assert len(c.text) <= 12
+
+
+def test_overlap_repeats_trailing_sentence():
+    text = "aaaa. bbbb. cccc. dddd."
+    chunks = TextChunker(max_tokens=12, overlap_tokens=5).split(text)
+    assert [c.text for c in chunks] == ["aaaa. bbbb.", "bbbb. cccc.", "cccc. dddd."]
+
+
+def test_long_sentence_is_force_split():
+    text = "x" * 25
+    chunks = TextChunker(max_tokens=10).split(text)
+    assert [len(c.text) for c in chunks] == [10, 10, 5]
+    assert chunks[-1].end == 25
+
+
+def test_chunk_repo_persists_passages(tmp_path):
+    repo = FaissChunkRepository(tmp_path, dimension=2)
+    vecs = np.eye(2, dtype="float32")
+    passages = [Chunk("first", 0, 5), Chunk("second", 6, 12)]
+    asyncio.run(repo.add_chunks_batch([("m1_0", vecs[0]), ("m1_1", vecs[1])], passages))
+    repo.close()
+
+    reloaded = FaissChunkRepository(tmp_path, dimension=2)
+    assert reloaded.get_passage("m1_1") == Chunk("second", 6, 12)
+    assert set(reloaded.get_passages(["m1_0", "missing"])) == {"m1_0"}
+    reloaded.close()
+
+
+def test_chunk_passage_log_is_compacted_when_mostly_dead(tmp_path):
+    repo = FaissChunkRepository(tmp_path, dimension=2, passage_compact_min=4)
+    vecs = np.eye(2, dtype="float32")
+
+    async def churn():
+        for n in range(3):
+            items = [(f"m1_{n}", vecs[0]), (f"m2_{n}", vecs[1])]
+            await repo.replace_memo_chunks("m1", items[:1], [Chunk(f"one{n}", 0, 4)])
+            await repo.replace_memo_chunks("m2", items[1:], [Chunk(f"two{n}", 0, 4)])
+
+    asyncio.run(churn())
+    repo.close()
+
+    lines = (tmp_path / "chunk_passages.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2
+    reloaded = FaissChunkRepository(tmp_path, dimension=2)
+    assert reloaded.get_passages(["m1_0", "m1_2", "m2_2"]) == {
+        "m1_2": Chunk("one2", 0, 4),
+        "m2_2": Chunk("two2", 0, 4),
+    }
+    reloaded.close()
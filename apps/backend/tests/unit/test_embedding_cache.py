@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+import infrastructure.services.embedder as embedder_module
+from infrastructure.services.embedder import EmbedderService
+from infrastructure.services.embedding_cache import LRUEmbeddingCache, cache_key
+from infrastructure.services.model_registry import ModelRegistry
+
+
+class _FakeModel:
+    """テキスト長から決まるベクトルを返し、呼び出し回数を記録する"""
+    dim = 4
+
+    def __init__(self, name):
+        self.calls = []
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return np.array([[len(t), 1, 0, 0] for t in texts], dtype="float32")
+
+
+class _FakeRegistry(ModelRegistry):
+    def _load(self, model_name):
+        return _FakeModel(model_name)
+
+
+@pytest.fixture(autouse=True)
+def fake_model(monkeypatch):
+    monkeypatch.setattr(embedder_module, "model_registry", _FakeRegistry())
+
+
+def test_cache_key_normalizes_whitespace_and_width():
+    assert cache_key("m", "  ＡＢＣ  def ") == cache_key("m", "ABC def")
+    assert cache_key("m", "abc") != cache_key("other", "abc")
+
+
+def test_lru_evicts_by_bytes():
+    vec = np.zeros(4, dtype="float32")  # 16 bytes
+    cache = LRUEmbeddingCache(max_bytes=32)
+    cache.put("a", vec)
+    cache.put("b", vec)
+    cache.get("a")
+    cache.put("c", vec)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.nbytes == 32
+
+
+def test_repeat_query_skips_model():
+    svc = EmbedderService("fake")
+    first = svc.encode("hello")
+    second = svc.encode("hello")
+    np.testing.assert_array_equal(first, second)
+    assert len(svc.model.calls) == 1
+    stats = svc.cache_stats()["query"]
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_chunk_embeddings_persist_across_instances(tmp_path):
+    svc = EmbedderService("fake", cache_dir=tmp_path)
+    svc.encode_chunks("line one\nline two", max_length=9)
+    assert len(svc.model.calls) == 1
+
+    # 新しいプロセス相当: LRU は空でもディスクから返る
+    again = EmbedderService("fake", cache_dir=tmp_path)
+    chunks = again.encode_chunks("line one\nline two", max_length=9)
+    # モデルは共有レジストリの同一インスタンスで、追加の forward は発生しない
+    assert again.model is svc.model
+    assert len(again.model.calls) == 1
+    assert len(chunks) == 2
+    assert again.cache_stats()["disk"]["hits"] == 2
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from domain.memo import Memo
+from infrastructure.persistence.embedding_store import EmbeddingStore
+from infrastructure.persistence.fs_memo_repo import FileSystemMemoRepository
+
+
+def test_store_put_get_reopen(tmp_path):
+    store = EmbeddingStore(tmp_path, dim=4)
+    store.put_many([("a", np.ones(4)), ("b", np.arange(4))])
+    store.put("a", np.full(4, 2.0))
+    store.remove("b")
+
+    np.testing.assert_array_equal(store.get("a"), np.full(4, 2.0, dtype="float32"))
+    assert store.get("b") is None
+    assert store.dead_rows == 2
+
+    # ログを再生して同じ状態に戻る
+    reopened = EmbeddingStore(tmp_path, dim=4)
+    assert reopened.uuids() == ["a"]
+    np.testing.assert_array_equal(reopened.get("a"), np.full(4, 2.0, dtype="float32"))
+
+    reopened.compact()
+    assert reopened.dead_rows == 0
+    ids, mat = reopened.matrix()
+    assert ids == ["a"]
+    assert isinstance(mat, np.memmap)
+
+
+def test_store_float16_and_dim_check(tmp_path):
+    store = EmbeddingStore(tmp_path, dim=3, dtype="float16")
+    store.put("a", np.array([0.5, 0.25, 1.0]))
+    assert store.get("a").dtype == np.float32
+    with pytest.raises(ValueError):
+        store.put("b", np.zeros(5))
+
+
+def test_store_truncates_partial_row(tmp_path):
+    store = EmbeddingStore(tmp_path, dim=2)
+    store.put("a", np.ones(2))
+    with open(store.matrix_path, "ab") as f:
+        f.write(b"\x00\x01")
+    assert EmbeddingStore(tmp_path, dim=2).get("a") is not None
+
+
+def test_repo_round_trips_embeddings(tmp_path):
+    store = EmbeddingStore(tmp_path / "emb", dim=4)
+    repo = FileSystemMemoRepository(tmp_path / "memos", embedding_store=store)
+    memo = Memo(uuid="u1", title="t", body="b", category="c", tags=[],
+                created_at=datetime.now(), embedding=np.ones(4, dtype="float32"))
+
+    async def scenario():
+        await repo.add(memo)
+        loaded = await repo.get_by_uuid("u1")
+        np.testing.assert_array_equal(loaded.embedding, np.ones(4))
+        uuids, mat = repo.embedding_matrix()
+        assert uuids == ["u1"] and mat.shape == (1, 4)
+        await repo.delete("u1")
+        assert "u1" not in store
+
+    asyncio.run(scenario())
+    repo.close()
+
+
+def test_repo_update_drops_stale_embedding_and_compacts(tmp_path):
+    store = EmbeddingStore(tmp_path / "emb", dim=4)
+    repo = FileSystemMemoRepository(tmp_path / "memos", embedding_store=store)
+
+    async def scenario():
+        for u in ("u1", "u2"):
+            await repo.add(Memo(uuid=u, title="t", body="b", category="c", tags=[],
+                                created_at=datetime.now(), embedding=np.ones(4, dtype="float32")))
+        updated = await repo.update("u1", "t", "new body")
+        # 本文が変わったら再索引までベクトルを持たない
+        assert updated.embedding is None
+        assert "u1" not in store
+        await repo.delete("u2")
+
+    asyncio.run(scenario())
+    # 死に行（2）が生存行（0）を上回った時点で詰め直される
+    assert store.dead_rows == 0
+    repo.close()
+
+
+def test_repo_delete_drops_embedding_when_file_already_gone(tmp_path, monkeypatch):
+    store = EmbeddingStore(tmp_path / "emb", dim=4)
+    repo = FileSystemMemoRepository(tmp_path / "memos", embedding_store=store)
+    memo = Memo(uuid="u1", title="t", body="b", category="c", tags=[], created_at=datetime.now())
+
+    async def scenario():
+        await repo.add(memo)
+        memo.embedding = np.ones(4, dtype="float32")
+        await repo.save_embedding(memo)
+        assert "u1" in store
+
+        def vanished(self, missing_ok=False):
+            raise FileNotFoundError(self)
+
+        # 存在確認と削除の間に外部で消された場合
+        monkeypatch.setattr(Path, "unlink", vanished)
+        assert await repo.delete("u1") is False
+        assert "u1" not in store
+
+    asyncio.run(scenario())
+    repo.close()
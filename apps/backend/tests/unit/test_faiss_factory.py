@@ -0,0 +1,104 @@
+import asyncio
+
+import faiss
+import numpy as np
+
+from infrastructure.persistence import faiss_factory
+from infrastructure.persistence.faiss_chunk_repo import FaissChunkRepository
+from infrastructure.persistence.faiss_factory import FLAT, HNSW, IVF, IndexPlan, IndexPolicy
+from infrastructure.persistence.faiss_index_repo import FaissIndexRepository
+from vector_helpers import chunk_items, unit_vectors
+
+DIM = 8
+
+
+def test_plan_by_count_and_memory_budget():
+    policy = IndexPolicy(flat_max=100, memory_budget_mb=1)
+    assert policy.plan(100, DIM) == IndexPlan(FLAT)
+    assert policy.plan(1_000, DIM).kind == HNSW
+    # 予算（1MB）に HNSW が収まらない規模では IVF
+    big = policy.plan(100_000, DIM)
+    assert big.kind == IVF and big.nlist == faiss_factory.nlist_for(100_000)
+
+
+def test_nlist_has_enough_training_points():
+    assert faiss_factory.nlist_for(100) == 2
+    assert faiss_factory.nlist_for(1_000_000) == 4000
+
+
+def test_migration_thresholds_have_hysteresis():
+    policy = IndexPolicy(flat_max=100, memory_budget_mb=0)
+    assert policy.needs_migration(IndexPlan(FLAT), 100, DIM) is None
+    assert policy.needs_migration(IndexPlan(FLAT), 101, DIM).kind == IVF
+    # Flat に戻すのは半分を下回ってから
+    ivf = IndexPlan(IVF, faiss_factory.nlist_for(101))
+    assert policy.needs_migration(ivf, 80, DIM) is None
+    assert policy.needs_migration(ivf, 50, DIM) == IndexPlan(FLAT)
+    # セル数が適正値から大きく外れたら学習し直す
+    assert policy.needs_migration(ivf, 100_000, DIM).nlist == faiss_factory.nlist_for(100_000)
+
+
+def test_ivf_is_trained_on_real_vectors(tmp_path):
+    vecs = unit_vectors(400, DIM)
+    policy = IndexPolicy(flat_max=100, memory_budget_mb=0, nprobe=2)
+    repo = FaissIndexRepository(tmp_path, memo_repo=None, dim=DIM, policy=policy)
+    uuids = [f"m{i}" for i in range(len(vecs))]
+    asyncio.run(repo.rebuild_from_matrix(uuids, vecs))
+
+    ivf = faiss.extract_index_ivf(repo.index)
+    assert ivf.nlist == faiss_factory.nlist_for(400) and ivf.nprobe == 2
+    # 重心が 1 点に潰れていない（全件が同じセルに入っていない）
+    sizes = [ivf.invlists.list_size(i) for i in range(ivf.nlist)]
+    assert max(sizes) < len(vecs)
+    hits, _ = repo._sync_search(vecs[7], 1)
+    assert hits == ["m7"]
+    repo.close()
+
+
+def test_rebuild_with_fewer_vectors_than_cells(tmp_path):
+    repo = FaissIndexRepository(tmp_path, memo_repo=None, dim=DIM)
+    vecs = unit_vectors(3, DIM)
+    asyncio.run(repo.rebuild_from_matrix(["a", "b", "c"], vecs))
+    assert repo.stats()["index_type"] == FLAT
+    assert repo._sync_search(vecs[2], 1)[0] == ["c"]
+    repo.close()
+
+
+def test_chunk_repo_migrates_when_crossing_threshold(tmp_path):
+    vecs = unit_vectors(120, DIM)
+    policy = IndexPolicy(flat_max=50, memory_budget_mb=64)
+    repo = FaissChunkRepository(tmp_path, dimension=DIM, policy=policy)
+
+    async def run():
+        await repo.add_chunks_batch(chunk_items(vecs[:40]))
+        assert repo._maintain_task is None
+        await repo.add_chunks_batch(chunk_items(vecs[40:], 40))
+        await repo._maintain_task
+
+    asyncio.run(run())
+    assert repo.stats()["index_type"] == HNSW
+    assert repo.index.ntotal == 120
+    assert repo._sync_search(vecs[99], 1)[0][0] == "m99_0"
+    repo.close()
+
+    reloaded = FaissChunkRepository(tmp_path, dimension=DIM, policy=policy)
+    assert reloaded.stats()["index_type"] == HNSW
+    assert faiss.downcast_index(reloaded.index.index).hnsw.efSearch == policy.hnsw_ef_search
+    reloaded.close()
+
+
+def test_catch_up_applies_changes_made_during_rebuild():
+    policy = IndexPolicy()
+    vecs = unit_vectors(4, DIM)
+    current = faiss_factory.build(IndexPlan(FLAT), DIM, faiss.METRIC_INNER_PRODUCT, policy)
+    current.add_with_ids(vecs, np.arange(4, dtype="int64"))
+    snapshot = np.array([0, 1, 2], dtype="int64")
+    fresh = faiss_factory.build(IndexPlan(FLAT), DIM, faiss.METRIC_INNER_PRODUCT, policy)
+    fresh.add_with_ids(vecs[:3], snapshot)
+
+    # 作り直し中に 3 が追加され、1 が削除された
+    fetch = lambda ids: np.stack([current.reconstruct(i) for i in ids])
+    tombstones = faiss_factory.catch_up(fresh, fetch, snapshot, [0, 2, 3])
+    assert tombstones == set()
+    ids = faiss.vector_to_array(fresh.id_map)
+    assert sorted(ids.tolist()) == [0, 2, 3]
@@ -0,0 +1,53 @@
+import asyncio
+
+import faiss
+
+from infrastructure.persistence import faiss_eval, faiss_factory
+from infrastructure.persistence.faiss_chunk_repo import FaissChunkRepository
+from infrastructure.persistence.faiss_factory import HNSW, IndexPolicy
+from vector_helpers import chunk_items, unit_vectors
+
+DIM = 16
+
+
+def test_hnsw_chunk_repo_persists_and_adds_incrementally(tmp_path):
+    vecs = unit_vectors(300, DIM)
+    policy = IndexPolicy(kind="hnsw", hnsw_m=8, hnsw_ef_construction=40, hnsw_ef_search=24)
+    repo = FaissChunkRepository(tmp_path, dimension=DIM, policy=policy)
+    inner = faiss.downcast_index(repo.index.index)
+    assert isinstance(inner, faiss.IndexHNSWFlat)
+    assert inner.hnsw.efConstruction == 40 and inner.hnsw.efSearch == 24
+    asyncio.run(repo.add_chunks_batch(chunk_items(vecs[:200])))
+    repo.close()
+
+    reloaded = FaissChunkRepository(tmp_path, dimension=DIM, policy=policy)
+    assert reloaded.stats()["index_type"] == HNSW and reloaded.index.ntotal == 200
+    asyncio.run(reloaded.add_chunks_batch(chunk_items(vecs[200:], 200)))
+    assert reloaded.index.ntotal == 300
+    # 内積なのでスコアはコサイン類似度（自分自身で 1.0）
+    hits = asyncio.run(reloaded.search(vecs[250], 3, ef_search=128))
+    assert hits[0][0] == "m250_0" and abs(hits[0][1] - 1.0) < 1e-5
+    reloaded.close()
+
+
+def test_search_params_raise_ef_to_k():
+    policy = IndexPolicy(kind="hnsw", hnsw_ef_search=16)
+    index = faiss_factory.build(faiss_factory.IndexPlan(HNSW), DIM, faiss.METRIC_INNER_PRODUCT, policy)
+    assert faiss_factory.search_params(index, 10) is None
+    assert faiss_factory.search_params(index, 50).efSearch == 50
+    assert faiss_factory.search_params(index, 10, ef_search=200).efSearch == 200
+    # インデックス側の既定値は変わらない
+    assert faiss.downcast_index(index.index).hnsw.efSearch == 16
+
+    flat = faiss_factory.build(faiss_factory.IndexPlan("flat"), DIM, faiss.METRIC_INNER_PRODUCT, policy)
+    assert faiss_factory.search_params(flat, 10, ef_search=200) is None
+
+
+def test_hnsw_report_against_exact_search():
+    base, queries = faiss_eval.split_queries(unit_vectors(500, DIM), 20)
+    assert len(base) == 480 and len(queries) == 20
+    rows = faiss_eval.hnsw_report(base, queries, k=5, m=8, ef_searches=(8, 128))
+    assert [r.label.split()[0] for r in rows] == ["flat", "hnsw", "hnsw"]
+    assert rows[0].recall == 1.0
+    # 探索幅を広げると再現率は下がらない
+    assert rows[2].recall >= rows[1].recall and rows[2].recall > 0.9
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import uuid
+
+import numpy as np
+
+from domain.memo import Memo
+from infrastructure.persistence.faiss_idmap import RECORD, IdMapFile
+from infrastructure.persistence.faiss_index_repo import FaissIndexRepository
+
+
+def test_appends_and_reloads_mixed_keys(tmp_path):
+    hex_id = uuid.uuid4().hex
+    dashed = str(uuid.uuid4())
+    keys = {0: f"{hex_id}_0", 1: f"{hex_id}_12", 2: dashed, 3: "memo-x_3", 4: "plain", 5: f"{hex_id}_01"}
+    path = tmp_path / "chunk_ids.idmap"
+
+    id_map = IdMapFile(path)
+    id_map.add(keys.items())
+    id_map.flush(keys)
+    assert path.stat().st_size == len(keys) * RECORD.itemsize
+
+    id_map.remove([1, 4])
+    id_map.add([(6, f"{dashed}_7")])
+    live = {i: k for i, k in keys.items() if i not in (1, 4)}
+    live[6] = f"{dashed}_7"
+    id_map.flush(live)
+    # 差分の 3 レコードだけが追記される
+    assert path.stat().st_size == (len(keys) + 3) * RECORD.itemsize
+    assert IdMapFile(path).load() == live
+
+
+def test_readding_an_id_after_removal_keeps_the_latest(tmp_path):
+    id_map = IdMapFile(tmp_path / "m.idmap")
+    id_map.add([(0, "a"), (1, "b")])
+    id_map.remove([0])
+    id_map.add([(0, "c")])
+    id_map.flush({0: "c", 1: "b"})
+    assert IdMapFile(tmp_path / "m.idmap").load() == {0: "c", 1: "b"}
+
+
+def test_truncated_tail_is_ignored(tmp_path):
+    path = tmp_path / "m.idmap"
+    id_map = IdMapFile(path)
+    id_map.add([(0, uuid.uuid4().hex), (1, uuid.uuid4().hex)])
+    id_map.flush({})
+    with open(path, "ab") as f:
+        f.write(b"\x01" * 10)
+    assert sorted(IdMapFile(path).load()) == [0, 1]
+
+
+def test_compacts_when_removals_dominate(tmp_path):
+    path = tmp_path / "m.idmap"
+    id_map = IdMapFile(path, compact_min_records=4)
+    id_map.add((i, f"k{i}") for i in range(4))
+    id_map.flush({i: f"k{i}" for i in range(4)})
+    id_map.remove([0, 1, 2])
+    id_map.flush({3: "k3"})
+    assert path.stat().st_size == RECORD.itemsize
+    assert IdMapFile(path).load() == {3: "k3"}
+
+
+def test_legacy_json_map_is_migrated(tmp_path):
+    repo = FaissIndexRepository(tmp_path, memo_repo=None, dim=4)
+    memo = Memo(uuid="a", title="a", body="", category="", tags=[], created_at=None,
+                embedding=np.ones(4, dtype="float32"))
+    asyncio.run(repo.incremental_update([memo]))
+    repo.close()
+    (tmp_path / "faiss.idmap").unlink()
+    (tmp_path / "id_to_uuid.json").write_text(json.dumps({"0": "a"}))
+
+    reloaded = FaissIndexRepository(tmp_path, memo_repo=None, dim=4)
+    assert reloaded.id_to_uuid == {0: "a"}
+    assert not (tmp_path / "id_to_uuid.json").exists()
+    assert IdMapFile(tmp_path / "faiss.idmap").load() == {0: "a"}
+    reloaded.close()
@@ -0,0 +1,59 @@
+import asyncio
+
+from infrastructure.persistence.faiss_chunk_repo import FaissChunkRepository
+from infrastructure.persistence.faiss_factory import IndexPolicy
+from infrastructure.persistence.faiss_index_repo import FaissIndexRepository
+from vector_helpers import chunk_items, unit_vectors
+
+DIM = 8
+
+
+def test_chunk_index_opens_mapped_and_copies_on_first_write(tmp_path):
+    vecs = unit_vectors(20, DIM)
+    repo = FaissChunkRepository(tmp_path, dimension=DIM)
+    asyncio.run(repo.add_chunks_batch(chunk_items(vecs[:10])))
+    repo.close()
+
+    mapped = FaissChunkRepository(tmp_path, dimension=DIM)
+    assert mapped.stats()["mmap"]
+    assert mapped._sync_search(vecs[3], 1)[0][0] == "m3_0"
+
+    asyncio.run(mapped.add_chunks_batch(chunk_items(vecs[10:], 10)))
+    assert not mapped.stats()["mmap"]
+    assert mapped._sync_search(vecs[15], 1)[0][0] == "m15_0"
+    assert mapped._sync_search(vecs[3], 1)[0][0] == "m3_0"
+    mapped.close()
+
+    reloaded = FaissChunkRepository(tmp_path, dimension=DIM)
+    assert reloaded.index.ntotal == 20
+    reloaded.close()
+    assert not FaissChunkRepository(tmp_path, dimension=DIM, mmap=False).stats()["mmap"]
+
+
+def test_mapped_hnsw_removal_keeps_tombstones(tmp_path):
+    policy = IndexPolicy(kind="hnsw", hnsw_m=8)
+    vecs = unit_vectors(10, DIM)
+    repo = FaissChunkRepository(tmp_path, dimension=DIM, policy=policy)
+    asyncio.run(repo.add_chunks_batch(chunk_items(vecs)))
+    repo.close()
+
+    mapped = FaissChunkRepository(tmp_path, dimension=DIM, policy=policy, compact_ratio=1.0)
+    assert mapped.stats()["mmap"]
+    asyncio.run(mapped.remove_memos(["m4"]))
+    assert mapped.stats()["tombstones"] == 1
+    assert all(cid != "m4_0" for cid, _ in mapped._sync_search(vecs[4], 3))
+    mapped.close()
+
+
+def test_mapped_ivf_memo_index_supports_remove(tmp_path):
+    vecs = unit_vectors(400, DIM)
+    policy = IndexPolicy(flat_max=100, memory_budget_mb=0)
+    repo = FaissIndexRepository(tmp_path, memo_repo=None, dim=DIM, policy=policy)
+    asyncio.run(repo.rebuild_from_matrix([f"m{i}" for i in range(400)], vecs))
+    repo.close()
+
+    mapped = FaissIndexRepository(tmp_path, memo_repo=None, dim=DIM, policy=policy)
+    assert mapped.stats()["mmap"] and mapped.stats()["index_type"] == "ivf"
+    assert asyncio.run(mapped.remove(["m7"])) == 1
+    assert mapped.index.ntotal == 399 and not mapped.stats()["mmap"]
+    mapped.close()
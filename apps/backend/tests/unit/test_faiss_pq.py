@@ -0,0 +1,70 @@
+import asyncio
+
+import numpy as np
+
+from infrastructure.persistence import faiss_eval
+from infrastructure.persistence.faiss_chunk_repo import FaissChunkRepository
+from infrastructure.persistence.faiss_factory import FLAT, IVFPQ, IndexPolicy
+from vector_helpers import chunk_items, clustered_vectors
+
+DIM = 16
+# 学習を軽くするため 4bit・OPQ なし（16 重心 × 39 点 = 624 点から IVFPQ に移行）
+POLICY = IndexPolicy(kind=IVFPQ, pq_m=8, pq_nbits=4, opq=False)
+
+
+def test_policy_waits_for_enough_training_points():
+    assert POLICY.plan(623, DIM).kind == FLAT
+    assert POLICY.plan(624, DIM).kind == IVFPQ
+    assert IndexPolicy(pq_m=96).pq_m_for(100) == 50
+
+
+def test_ivfpq_chunk_repo_reranks_with_full_precision_vectors(tmp_path):
+    vecs = clustered_vectors(900, DIM)
+    repo = FaissChunkRepository(tmp_path, dimension=DIM, policy=POLICY, rerank_factor=4)
+
+    async def run():
+        await repo.add_chunks_batch(chunk_items(vecs[:300]))
+        assert repo.stats()["index_type"] == FLAT
+        await repo.add_chunks_batch(chunk_items(vecs[300:], 300))
+        await repo._maintain_task
+        assert repo.stats()["index_type"] == IVFPQ and repo.stats()["rerank"]
+
+        hits = await repo.search(vecs[42], 5)
+        assert hits[0][0] == "m42_0"
+        # スコアは圧縮後の近似値ではなく原精度の内積
+        for cid, score in hits:
+            i = int(cid[1:].split("_")[0])
+            assert abs(score - float(vecs[i] @ vecs[42])) < 1e-5
+
+        await repo.remove_memos(["m42"])
+        assert "m42_0" not in repo._vectors
+        assert all(cid != "m42_0" for cid, _ in await repo.search(vecs[42], 5))
+
+    asyncio.run(run())
+    repo.close()
+
+    reloaded = FaissChunkRepository(tmp_path, dimension=DIM, policy=POLICY)
+    assert reloaded.stats()["index_type"] == IVFPQ
+    assert len(reloaded._vectors) == 899
+    reloaded.close()
+
+
+def test_vector_store_is_backfilled_when_switching_to_ivfpq(tmp_path):
+    vecs = clustered_vectors(10, DIM)
+    flat = FaissChunkRepository(tmp_path, dimension=DIM)
+    asyncio.run(flat.add_chunks_batch(chunk_items(vecs)))
+    flat.close()
+
+    repo = FaissChunkRepository(tmp_path, dimension=DIM, policy=POLICY)
+    assert len(repo._vectors) == 10
+    np.testing.assert_allclose(repo._vectors.get("m3_0"), vecs[3], atol=1e-6)
+    repo.close()
+
+
+def test_pq_report_measures_size_and_rerank_recall():
+    base, queries = faiss_eval.split_queries(clustered_vectors(1000, DIM), 20)
+    rows = faiss_eval.pq_report(base, queries, k=5, policy=POLICY, rerank_factors=(1, 8))
+    flat, plain, reranked = rows
+    assert flat.recall == 1.0
+    assert plain.bytes_per_vector < flat.bytes_per_vector
+    assert reranked.recall >= plain.recall
@@ -0,0 +1,108 @@
+import asyncio
+import json
+
+import faiss
+import numpy as np
+
+from domain.memo import Memo
+from infrastructure.persistence.faiss_chunk_repo import FaissChunkRepository
+from infrastructure.persistence.faiss_factory import IndexPolicy
+from infrastructure.persistence.faiss_index_repo import FaissIndexRepository
+
+DIM = 4
+
+
+def _vec(i):
+    v = np.zeros(DIM, dtype="float32")
+    v[i % DIM] = 1.0
+    return v
+
+
+def _memo(uuid, i):
+    return Memo(uuid=uuid, title=uuid, body="", category="", tags=[], created_at=None, embedding=_vec(i))
+
+
+def test_memo_index_upsert_and_remove(tmp_path):
+    repo = FaissIndexRepository(tmp_path, memo_repo=None, dim=DIM)
+
+    async def run():
+        await repo.incremental_update([_memo("a", 0), _memo("b", 1)])
+        # 更新: a のベクトルを置き換える
+        await repo.upsert([_memo("a", 2)])
+        uuids, _ = await repo.search(_vec(2), 1)
+        assert uuids == ["a"]
+        uuids, _ = await repo.search(_vec(0), 3)
+        assert sorted(uuids) == ["a", "b"]
+
+        assert await repo.remove(["b"]) == 1
+        uuids, _ = await repo.search(_vec(1), 3)
+        assert uuids == ["a"]
+
+    asyncio.run(run())
+    assert repo.stats()["live"] == 1 and repo.index.ntotal == 1
+    repo.close()
+
+    reloaded = FaissIndexRepository(tmp_path, memo_repo=None, dim=DIM)
+    assert reloaded.id_to_uuid == {2: "a"}
+    reloaded.close()
+
+
+def test_chunk_repo_replaces_and_removes_memo_chunks(tmp_path):
+    repo = FaissChunkRepository(tmp_path, dimension=DIM)
+
+    async def run():
+        await repo.add_chunks_batch([("m1_0", _vec(0)), ("m1_1", _vec(1)), ("m2_0", _vec(2))])
+        await repo.replace_memo_chunks("m1", [("m1_0", _vec(3))])
+        hits = await repo.search(_vec(1), 5)
+        assert {cid for cid, _ in hits} == {"m1_0", "m2_0"}
+
+        assert await repo.remove_memos(["m2"]) == 1
+        new = await repo.filter_new([_memo("m1", 0), _memo("m2", 0)])
+        assert [m.uuid for m in new] == ["m2"]
+
+    asyncio.run(run())
+    repo.close()
+
+    reloaded = FaissChunkRepository(tmp_path, dimension=DIM)
+    assert reloaded.stats()["live"] == 1
+    assert [cid for cid, _ in reloaded._sync_search(_vec(3), 5)] == ["m1_0"]
+    reloaded.close()
+
+
+def test_tombstones_trigger_compaction(tmp_path):
+    # HNSW は remove_ids 非対応なので墓標になる
+    policy = IndexPolicy(kind="hnsw")
+    repo = FaissChunkRepository(tmp_path, dimension=DIM, policy=policy, compact_ratio=0.3)
+
+    async def run():
+        await repo.add_chunks_batch([(f"m{i}_0", _vec(i)) for i in range(4)])
+        await repo.remove_memos(["m0"])
+        assert repo.stats()["tombstones"] == 1
+        assert all(cid != "m0_0" for cid, _ in await repo.search(_vec(0), 4))
+
+        await repo.remove_memos(["m1"])  # 2/4 > 0.3 でコンパクション
+        await repo._maintain_task
+
+    asyncio.run(run())
+    stats = repo.stats()
+    assert stats["tombstones"] == 0 and stats["ntotal"] == 2
+    repo.close()
+
+
+def test_legacy_chunk_files_are_migrated(tmp_path):
+    legacy = faiss.IndexFlatIP(DIM)
+    legacy.add(np.stack([_vec(0), _vec(1)]))
+    faiss.write_index(legacy, str(tmp_path / "chunk.index"))
+    (tmp_path / "chunk_ids.json").write_text(json.dumps(["m1_0", "m2_0"]))
+
+    repo = FaissChunkRepository(tmp_path, dimension=DIM)
+    assert [cid for cid, _ in repo._sync_search(_vec(1), 1)] == ["m2_0"]
+    asyncio.run(repo.add_chunks_batch([("m3_0", _vec(2))]))
+    assert repo._chunk_to_id["m3_0"] == 2
+    repo.close()
+
+    # JSON はバイナリマップに置き換わる
+    assert not (tmp_path / "chunk_ids.json").exists()
+    reloaded = FaissChunkRepository(tmp_path, dimension=DIM)
+    assert reloaded._id_to_chunk == {0: "m1_0", 1: "m2_0", 2: "m3_0"}
+    reloaded.close()
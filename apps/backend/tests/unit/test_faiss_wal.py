@@ -0,0 +1,100 @@
+import asyncio
+import shutil
+
+import numpy as np
+
+from domain.memo import Memo
+from infrastructure.persistence.faiss_chunk_repo import FaissChunkRepository
+from infrastructure.persistence.faiss_index_repo import FaissIndexRepository
+from infrastructure.persistence.faiss_wal import OP_ADD, OP_REMOVE, WriteAheadLog
+from vector_helpers import chunk_items, unit_vectors
+
+DIM = 8
+
+
+def _crash(repo):
+    """スナップショットを取らずに終了した状態にする"""
+    repo._snapshots.cancel()
+    repo._io_executor.shutdown(wait=True)
+
+
+def test_wal_round_trip_and_torn_tail(tmp_path):
+    wal = WriteAheadLog(tmp_path / "x.wal", fsync=False)
+    vecs = unit_vectors(3, DIM)
+    wal.append_add(np.arange(3), ["a_0", "b_0", "c_0"], vecs)
+    wal.append_remove([1])
+    with open(wal.path, "ab") as f:
+        f.write(b"\x01\x05\x00")
+
+    entries = list(wal.replay())
+    assert [op for op, *_ in entries] == [OP_ADD, OP_REMOVE]
+    assert entries[0][2] == ["a_0", "b_0", "c_0"]
+    assert np.allclose(entries[0][3], vecs)
+    assert entries[1][1].tolist() == [1]
+    # 壊れた末尾は切り捨てられる
+    assert len(list(WriteAheadLog(wal.path).replay())) == 2
+
+
+def test_chunk_changes_survive_a_crash_before_snapshot(tmp_path):
+    vecs = unit_vectors(10, DIM)
+    repo = FaissChunkRepository(tmp_path, dimension=DIM, snapshot_delay=60)
+
+    async def run():
+        await repo.add_chunks_batch(chunk_items(vecs[:6]))
+        await repo.add_chunks_batch(chunk_items(vecs[6:], 6))
+        await repo.remove_memos(["m2"])
+
+    asyncio.run(run())
+    # 追加のたびにインデックス全体を書き出してはいない
+    assert not (tmp_path / "chunk.index").exists()
+    _crash(repo)
+
+    recovered = FaissChunkRepository(tmp_path, dimension=DIM)
+    assert recovered.stats()["live"] == 9
+    assert recovered._sync_search(vecs[7], 1)[0][0] == "m7_0"
+    assert all(cid != "m2_0" for cid, _ in recovered._sync_search(vecs[2], 9))
+    recovered.close()
+    assert (tmp_path / "chunk.index").exists()
+    assert (tmp_path / "chunk.wal").stat().st_size == 0
+
+
+def test_replay_over_a_newer_snapshot_is_idempotent(tmp_path):
+    vecs = unit_vectors(6, DIM)
+    repo = FaissChunkRepository(tmp_path, dimension=DIM, snapshot_delay=60)
+
+    async def run():
+        await repo.add_chunks_batch(chunk_items(vecs))
+        await repo.replace_memo_chunks("m1", [("m1_0", vecs[0])])
+
+    asyncio.run(run())
+    shutil.copy(tmp_path / "chunk.wal", tmp_path / "wal.bak")
+    repo.close()
+    # スナップショットは書けたが WAL を空にする前に落ちた状況
+    shutil.copy(tmp_path / "wal.bak", tmp_path / "chunk.wal")
+
+    reloaded = FaissChunkRepository(tmp_path, dimension=DIM)
+    assert reloaded.stats()["live"] == 6
+    assert reloaded.index.ntotal == 6
+    assert sorted(reloaded._memo_chunks["m1"]) == [reloaded._chunk_to_id["m1_0"]]
+    reloaded.close()
+
+
+def test_memo_index_snapshots_are_debounced(tmp_path):
+    vecs = unit_vectors(5, DIM)
+    repo = FaissIndexRepository(tmp_path, memo_repo=None, dim=DIM, snapshot_delay=0.05)
+
+    async def run():
+        for i, v in enumerate(vecs):
+            memo = Memo(uuid=f"u{i}", title="", body="", category="", tags=[], created_at=None, embedding=v)
+            await repo.incremental_update([memo])
+        assert not repo.index_path.exists()
+        await asyncio.sleep(0.3)
+
+    asyncio.run(run())
+    assert repo.index_path.exists()
+    assert (tmp_path / "faiss.wal").stat().st_size == 0
+    _crash(repo)
+
+    reloaded = FaissIndexRepository(tmp_path, memo_repo=None, dim=DIM)
+    assert sorted(reloaded.uuid_to_id) == [f"u{i}" for i in range(5)]
+    reloaded.close()
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from infrastructure.services.embedder import EmbedderService
+from infrastructure.services.inference_backends import (
+    OnnxBackend,
+    TorchBackend,
+    check_parity,
+    create_backend,
+)
+
+
+class _FixedBackend:
+    """固定ベクトルにノイズを足して返すバックエンド"""
+    name = "fixed"
+
+    def __init__(self, tag, noise=0.0):
+        self._tag = tag
+        self.noise = noise
+        self.calls = 0
+
+    @property
+    def cache_tag(self):
+        return self._tag
+
+    def dimension(self):
+        return 3
+
+    def encode(self, texts, batch_size=32):
+        self.calls += 1
+        base = np.array([[len(t), 1.0, 2.0] for t in texts], dtype="float32")
+        return base + self.noise
+
+
+def test_check_parity_reports_cosine():
+    report = check_parity(_FixedBackend("a"), _FixedBackend("b", noise=0.01), ["x", "yy"])
+    assert report.n == 2
+    assert report.passed(0.99)
+    assert report.min_cosine <= report.mean_cosine <= 1.0 + 1e-6
+
+    far = check_parity(_FixedBackend("a"), _FixedBackend("b", noise=50.0), ["x", "yy"])
+    assert not far.passed(0.99)
+
+
+def test_embedder_uses_backend_and_separates_cache(tmp_path):
+    backend = _FixedBackend("onnx-int8")
+    svc = EmbedderService("m", cache_dir=tmp_path, backend=backend)
+    vec = svc.encode("hello")
+    assert vec.shape == (3,)
+    assert np.isclose(np.linalg.norm(vec), 1.0)
+    svc.encode("hello")
+    assert backend.calls == 1
+    assert svc._cache_namespace() == "m__onnx-int8"
+
+
+def test_create_backend():
+    assert isinstance(create_backend("torch", "m"), TorchBackend)
+    assert create_backend("torch", "m").spec()["torch_threads"] == 0
+    onnx = create_backend("onnx", "m", onnx_dir="/tmp/x", quantize=False, intra_op_threads=2)
+    assert isinstance(onnx, OnnxBackend)
+    assert onnx.cache_tag == "onnx" and onnx.intra_op_threads == 2
+    with pytest.raises(ValueError):
+        create_backend("onnx", "m")
+    with pytest.raises(ValueError):
+        create_backend("tflite", "m")
@@ -1,51 +1,90 @@
 import pytest
 from pathlib import Path
-from datetime import timedelta, datetime, timezone
+from datetime import timedelta
 
 from fastapi.testclient import TestClient
 
-import interfaces.controllers.common as common
+import app.container as container_module
+import interfaces.controllers.dependencies as deps
 from main import create_app, app
 from infrastructure.persistence.fs_memo_repo import FileSystemMemoRepository
 from infrastructure.persistence.faiss_index_repo import FaissIndexRepository
+from infrastructure.persistence.faiss_chunk_repo import FaissChunkRepository
 from infrastructure.utils.datetime_jst import DateTimeJST
-from interfaces.utils.datetime import DateTimeProvider
 from config import settings
 
+
+class _DummyEmbedder:
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+        self.warmed = False
+
+    def warm_up(self):
+        self.warmed = True
+
+    async def aclose(self):
+        pass
+
+
+class _DummyElastic:
+    def __init__(self, hosts, index_name):
+        self.hosts = hosts
+        self.index_name = index_name
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
 @pytest.fixture(autouse=True)
 def reset_settings(tmp_path, monkeypatch):
     """
-    settings のパスを一時ディレクトリに差し替える
+    settings のパスを一時ディレクトリに差し替え、重いリソースをダミー化する
     """
     monkeypatch.setattr(settings, "memos_root", tmp_path / "memos")
     monkeypatch.setattr(settings, "index_data_root", tmp_path / "index")
+    monkeypatch.setattr(container_module, "EmbedderService", _DummyEmbedder)
+    monkeypatch.setattr(container_module, "ElasticsearchMemoRepository", _DummyElastic)
     return tmp_path
 
+
 @pytest.mark.parametrize("fixture_app", [create_app(), app])
-def test_dependency_overrides_registered(fixture_app):
-    overrides = fixture_app.dependency_overrides
-
-    # 抽象プロバイダがキーになっている
-    assert common.get_memo_repo in overrides
-    assert common.get_index_repo in overrides
-    assert common.get_datetime_provider in overrides
-
-    # 値として正しい具象クラスのインスタンスが返るか
-    memo_repo = overrides[common.get_memo_repo]()
-    assert isinstance(memo_repo, FileSystemMemoRepository)
-    assert memo_repo.root == Path(settings.memos_root)
-
-    index_repo = overrides[common.get_index_repo](memo_repo)
-    assert isinstance(index_repo, FaissIndexRepository)
-    assert index_repo.memo_repo is memo_repo
-    assert index_repo.index_dir == Path(settings.index_data_root)
-
-    dt_provider = overrides[common.get_datetime_provider]()
-    assert isinstance(dt_provider, DateTimeJST)
-    now = dt_provider.now()
-    # JST は UTC+9h であること
-    offset = now.utcoffset()
-    assert offset == timedelta(hours=9)
+def test_container_built_once_in_lifespan(fixture_app):
+    with TestClient(fixture_app) as client:
+        container = client.app.state.container
+
+        # プロバイダはコンテナ上の同一インスタンスを返す
+        memo_repo = deps.get_memo_repo(container)
+        assert isinstance(memo_repo, FileSystemMemoRepository)
+        assert memo_repo is container.memo_repo
+        assert memo_repo.root == Path(settings.memos_root).resolve()
+
+        index_repo = deps.get_faiss_index_repo(container)
+        assert isinstance(index_repo, FaissIndexRepository)
+        assert index_repo.memo_repo is memo_repo
+        assert index_repo.index_dir == Path(settings.index_data_root)
+
+        assert isinstance(deps.get_faiss_chunk_repo(container), FaissChunkRepository)
+        assert deps.get_embedder_service(container) is container.embedder
+
+        dt_provider = deps.get_datetime_provider(container)
+        assert isinstance(dt_provider, DateTimeJST)
+        # JST は UTC+9h であること
+        assert dt_provider.now().utcoffset() == timedelta(hours=9)
+
+    # lifespan 終了時に Executor と ES クライアントが解放される
+    assert container.memo_repo._io_executor._shutdown
+    assert container.faiss_index_repo._io_executor._shutdown
+    assert container.faiss_chunk_repo._io_executor._shutdown
+    assert container.elastic_repo.closed
+
+
+def test_parse_elasticsearch_hosts():
+    parse = container_module.parse_elasticsearch_hosts
+    assert parse("http://a:9200, http://b:9200") == ["http://a:9200", "http://b:9200"]
+    assert parse('["http://a:9200"]') == ["http://a:9200"]
+    assert parse(["http://a:9200"]) == ["http://a:9200"]
+
 
 def test_app_routes_exist():
     client = TestClient(app)
@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from domain.memo import Memo
+from infrastructure.persistence.fs_memo_repo import FileSystemMemoRepository
+from infrastructure.persistence.memo_catalog import MemoCatalog
+from interfaces.repositories.memo_repo import MemoNotFoundError
+
+
+def _write_memo(root, category, uuid, title="t", body="b"):
+    d = root / category
+    d.mkdir(parents=True, exist_ok=True)
+    path = d / f"{uuid}.txt"
+    path.write_text(
+        f"UUID:{uuid}\nTITLE:{title}\nCATEGORY:{category}\nTAGS:\n"
+        f"CREATED_AT:2024-01-01T00:00:00+09:00\nSCORE:0\n---\n{body}",
+        encoding="utf-8",
+    )
+    return path
+
+
+@pytest.fixture
+def repo(tmp_path):
+    r = FileSystemMemoRepository(tmp_path / "memos")
+    yield r
+    r.close()
+
+
+def test_catalog_rescan_put_remove(tmp_path):
+    path = _write_memo(tmp_path, "work", "u1")
+    catalog = MemoCatalog(tmp_path)
+    catalog.rescan()
+
+    entry = catalog.get("u1")
+    assert entry.path == path
+    assert entry.category == "work"
+    assert entry.size == path.stat().st_size
+
+    catalog.remove("u1")
+    assert "u1" not in catalog
+    catalog.put("u1", path)
+    assert "u1" in catalog
+    # 存在しないファイルは登録されない
+    assert catalog.put("u2", tmp_path / "work" / "u2.txt") is None
+    assert "u2" not in catalog
+
+
+def test_catalog_rescan_is_throttled(tmp_path):
+    catalog = MemoCatalog(tmp_path, min_rescan_interval=3600)
+    catalog.rescan()
+    _write_memo(tmp_path, "c", "late")
+    assert catalog.rescan_if_stale() is False
+    assert "late" not in catalog
+
+
+def test_repo_uses_catalog_for_crud(repo):
+    memo = Memo(uuid="u1", title="t", body="b", category="c", tags=["x"],
+                created_at=datetime.fromisoformat("2024-01-01T00:00:00+09:00"))
+
+    async def scenario():
+        await repo.add(memo)
+        assert "u1" in repo._catalog
+        got = await repo.get_by_uuid("u1")
+        assert got.title == "t"
+
+        updated = await repo.update("u1", "t2", "b2")
+        assert updated.title == "t2"
+        assert (await repo.get_by_uuid("u1")).body == "b2"
+
+        assert await repo.delete("u1") is True
+        assert "u1" not in repo._catalog
+        assert await repo.delete("u1") is False
+
+    asyncio.run(scenario())
+
+
+def test_repo_rescans_for_external_changes(repo):
+    repo._catalog.min_rescan_interval = 0
+    _write_memo(repo.root, "ext", "outside", title="external")
+
+    async def scenario():
+        memo = await repo.get_by_uuid("outside")
+        assert memo.title == "external"
+        with pytest.raises(MemoNotFoundError):
+            await repo.get_by_uuid("missing")
+
+    asyncio.run(scenario())
+
+
+def test_repo_get_many_dedupes_and_skips_missing(repo):
+    repo._catalog.min_rescan_interval = 3600
+    for uid in ("a", "b", "c"):
+        _write_memo(repo.root, "c", uid, title=uid)
+    repo._catalog.rescan()
+
+    result = asyncio.run(repo.get_many(["c", "a", "missing", "a", ""]))
+    assert list(result) == ["c", "a"]
+    assert result["a"].title == "a"
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from domain.memo import Memo
+from domain.memo_filter import MemoFilter
+from infrastructure.persistence.faiss_chunk_repo import FaissChunkRepository
+from infrastructure.persistence.faiss_index_repo import FaissIndexRepository
+from infrastructure.persistence.memo_filter_index import MemoFilterIndex
+from infrastructure.persistence.memo_metadata_index import MemoMetadata, MemoMetadataIndex
+from vector_helpers import unit_vectors
+
+DIM = 8
+
+
+def _ts(day):
+    return datetime.fromisoformat(f"2024-01-{day:02d}T00:00:00+09:00")
+
+
+def test_filter_index_bitmaps_and_date_range():
+    index = MemoFilterIndex(capacity=8)
+    for i in range(40):
+        index.upsert(f"m{i}", "work" if i % 2 else "home", ["a"] if i % 3 == 0 else ["b"], _ts(i % 28 + 1).timestamp())
+
+    assert index.select(MemoFilter()) == [f"m{i}" for i in range(40)]
+    assert index.select(MemoFilter(category="work", tags=("a",))) == ["m3", "m9", "m15", "m21", "m27", "m33", "m39"]
+    assert index.select(MemoFilter(created_from=_ts(5), created_to=_ts(6))) == ["m4", "m5", "m32", "m33"]
+    assert index.select(MemoFilter(category="none")) == []
+
+    # 更新で古いカテゴリ・タグ・日時のビットが落ち、削除したスロットは再利用される
+    index.upsert("m3", "home", ["c"], None)
+    index.remove_many(["m9"])
+    assert "m3" not in index.select(MemoFilter(category="work"))
+    assert index.select(MemoFilter(tags=("c",))) == ["m3"]
+    assert "m3" not in index.select(MemoFilter(created_from=_ts(1)))
+    index.upsert("new", "work", ["a"], None)
+    assert index.select(MemoFilter(category="work", tags=("a",)))[0] == "new"
+    assert len(index) == 40
+
+
+def test_metadata_index_rebuilds_filter_from_sqlite(tmp_path):
+    meta = MemoMetadataIndex(tmp_path / "meta.db")
+    meta.upsert(MemoMetadata("a", "t", "work", ["x"], created_ts=_ts(1).timestamp()))
+    meta.upsert(MemoMetadata("b", "t", "home", ["x", "y"], created_ts=_ts(2).timestamp()))
+    meta.close()
+
+    reopened = MemoMetadataIndex(tmp_path / "meta.db")
+    assert reopened.select(MemoFilter(tags=("x", "y"))) == ["b"]
+    assert reopened.select(MemoFilter(created_to=_ts(1))) == ["a"]
+    reopened.close()
+
+
+@pytest.mark.parametrize("exact_max", [4096, 0])
+def test_chunk_search_is_restricted_to_allowed_memos(tmp_path, exact_max):
+    vecs = unit_vectors(30, DIM)
+    repo = FaissChunkRepository(tmp_path, dimension=DIM, filter_exact_max=exact_max)
+    items = [(f"m{i // 3}_{i % 3}", v) for i, v in enumerate(vecs)]
+    asyncio.run(repo.add_chunks_batch(items))
+
+    allowed = ["m2", "m5", "m7"]
+    hits = asyncio.run(repo.search_memos(vecs[0], 5, memo_uuids=allowed))
+    assert sorted(cid.split("_")[0] for cid, _ in hits) == allowed
+    # 対象内ではフィルタなしと同じスコア
+    best = asyncio.run(repo.search_memos(vecs[15], 1, memo_uuids=["m5"]))
+    assert best[0][0] == "m5_0" and best[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert asyncio.run(repo.search_memos(vecs[0], 5, memo_uuids=["missing"])) == []
+    repo.close()
+
+
+@pytest.mark.parametrize("exact_max", [4096, 0])
+def test_memo_index_search_is_restricted_to_allowed_memos(tmp_path, exact_max):
+    vecs = unit_vectors(20, DIM, seed=1)
+    repo = FaissIndexRepository(tmp_path, memo_repo=None, dim=DIM, filter_exact_max=exact_max)
+    memos = [
+        Memo(uuid=f"u{i}", title="", body="", category="", tags=[], created_at=None, embedding=v)
+        for i, v in enumerate(vecs)
+    ]
+    asyncio.run(repo.incremental_update(memos))
+
+    uuids, dists = asyncio.run(repo.search(vecs[4], 3, memo_uuids=["u4", "u9", "u11"]))
+    assert uuids[0] == "u4" and sorted(uuids) == ["u11", "u4", "u9"]
+    assert dists[0] == pytest.approx(0.0, abs=1e-5)
+    repo.close()
@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime
+
+from domain.memo import Memo
+from infrastructure.persistence.fs_memo_repo import FileSystemMemoRepository
+from infrastructure.persistence.memo_metadata_index import MemoMetadata, MemoMetadataIndex
+
+
+def _memo(uuid, category, tags, body="body"):
+    return Memo(uuid=uuid, title=f"title-{uuid}", body=body, category=category, tags=tags,
+                created_at=datetime.fromisoformat("2024-01-01T00:00:00+09:00"))
+
+
+def test_index_upsert_and_queries():
+    index = MemoMetadataIndex()
+    index.upsert(MemoMetadata.from_memo(_memo("a", "work", ["x", " y "])))
+    index.upsert(MemoMetadata.from_memo(_memo("b", "home", ["x"])))
+
+    assert index.count() == 2
+    assert index.categories() == ["home", "work"]
+    assert index.tags() == ["x", "y"]
+    assert index.tag_counts() == {"x": 2, "y": 1}
+
+    # 再登録でタグが置き換わる
+    index.upsert(MemoMetadata.from_memo(_memo("a", "work", ["z"])))
+    assert index.tags() == ["x", "z"]
+
+    meta = index.get("a")
+    assert meta.tags == ["z"]
+    assert meta.body_length == len("body")
+
+    index.remove("a")
+    assert index.categories() == ["home"]
+    assert index.get("a") is None
+
+
+def test_repo_lists_from_index_and_persists(tmp_path):
+    db = tmp_path / "index" / "meta.sqlite3"
+    repo = FileSystemMemoRepository(tmp_path / "memos", metadata_path=db)
+
+    async def scenario():
+        await repo.add(_memo("a", "work", ["x"]))
+        await repo.add(_memo("b", "home", ["y"]))
+        assert sorted(await repo.list_categories()) == ["home", "work"]
+        assert sorted(await repo.list_tags()) == ["x", "y"]
+        await repo.delete("b")
+        assert await repo.list_tags() == ["x"]
+
+    asyncio.run(scenario())
+    repo.close()
+
+    # API 外で追加されたファイルは再起動時の差分同期で反映される
+    ext = tmp_path / "memos" / "ext"
+    ext.mkdir()
+    (ext / "c.txt").write_text(
+        "UUID:c\nTITLE:ext\nCATEGORY:ext\nTAGS:z\nCREATED_AT:2024-01-01T00:00:00\nSCORE:0\n---\nhello",
+        encoding="utf-8",
+    )
+    repo = FileSystemMemoRepository(tmp_path / "memos", metadata_path=db)
+    assert asyncio.run(repo.list_tags()) == ["x", "z"]
+    assert asyncio.run(repo.count()) == 2
+    repo.close()
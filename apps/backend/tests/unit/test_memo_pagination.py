@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from domain.memo import Memo
+from infrastructure.persistence.embedding_store import EmbeddingStore
+from infrastructure.persistence.fs_memo_repo import FileSystemMemoRepository
+from usecases.list_memos import InvalidCursorError, ListMemosUseCase, decode_cursor
+from usecases.rebuild_index import RebuildIndexUseCase
+
+BASE = datetime.fromisoformat("2024-01-01T00:00:00+09:00")
+
+
+@pytest.fixture
+def repo(tmp_path):
+    r = FileSystemMemoRepository(
+        tmp_path / "memos", embedding_store=EmbeddingStore(tmp_path / "emb", dim=2)
+    )
+
+    async def seed():
+        for i in range(5):
+            await r.add(Memo(
+                uuid=f"u{i}", title=f"t{i}", body=f"body{i}", category="c", tags=[],
+                created_at=BASE + timedelta(minutes=4 - i),
+                embedding=np.full(2, i, dtype="float32"),
+            ))
+
+    asyncio.run(seed())
+    yield r
+    r.close()
+
+
+def _collect(repo, **kwargs):
+    async def run():
+        return [batch async for batch in repo.iter_all(**kwargs)]
+    return asyncio.run(run())
+
+
+def test_iter_all_stable_order_and_fields(repo):
+    batches = _collect(repo, batch_size=2, fields=())
+    assert [len(b) for b in batches] == [2, 2, 1]
+    flat = [m for b in batches for m in b]
+    # created_at 昇順
+    assert [m.uuid for m in flat] == ["u4", "u3", "u2", "u1", "u0"]
+    assert all(m.body == "" and m.embedding is None for m in flat)
+
+    full = [m for b in _collect(repo, batch_size=10) for m in b]
+    assert full[0].body == "body4"
+    np.testing.assert_array_equal(full[0].embedding, [4, 4])
+
+
+def test_list_memos_cursor_round_trip(repo):
+    uc = ListMemosUseCase(repo)
+
+    async def run():
+        first, cursor = await uc.execute(3)
+        second, end = await uc.execute(3, cursor)
+        return first, second, end
+
+    first, second, end = asyncio.run(run())
+    assert [m.uuid for m in first] == ["u4", "u3", "u2"]
+    assert [m.uuid for m in second] == ["u1", "u0"]
+    assert end is None
+
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor")
+
+
+def test_rebuild_index_passes_embedding_memmap(repo):
+    class _Index:
+        async def rebuild_from_matrix(self, uuids, matrix):
+            self.uuids, self.matrix = uuids, matrix
+
+    index = _Index()
+    asyncio.run(RebuildIndexUseCase(index, repo).execute())
+    assert index.uuids == ["u0", "u1", "u2", "u3", "u4"]
+    assert isinstance(index.matrix, np.memmap)
+    assert index.matrix.shape == (5, 2)
+
+
+def test_list_page_exact_multiple_has_no_trailing_cursor(repo):
+    async def run():
+        first, after = await repo.list_page(5)
+        return first, after
+
+    first, after = asyncio.run(run())
+    # ちょうど limit 件で尽きたら、空の次ページを指すキーは返さない
+    assert len(first) == 5
+    assert after is None
+    assert [len(b) for b in _collect(repo, batch_size=5)] == [5]
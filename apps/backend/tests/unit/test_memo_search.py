@@ -0,0 +1,75 @@
+import asyncio
+
+import numpy as np
+
+from infrastructure.persistence.faiss_chunk_repo import FaissChunkRepository
+from usecases.hybrid_search import HybridSearchUseCase
+
+DIM = 8
+
+
+def _near(base, n, seed):
+    rng = np.random.default_rng(seed)
+    vecs = base + 0.05 * rng.standard_normal((n, DIM)).astype("float32")
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def _build(tmp_path):
+    query = np.ones(DIM, dtype="float32") / np.sqrt(DIM)
+    repo = FaissChunkRepository(tmp_path, dimension=DIM, memo_oversample=1.0)
+    # 長いメモ 1 件がクエリ付近のチャンクを大量に持つ
+    items = [(f"long_{i}", v) for i, v in enumerate(_near(query, 40, 0))]
+    rng = np.random.default_rng(1)
+    for m in range(5):
+        items += [(f"m{m}_{i}", v) for i, v in enumerate(_near(rng.standard_normal(DIM), 2, m + 2))]
+    asyncio.run(repo.add_chunks_batch(items))
+    return repo, query
+
+
+def test_search_memos_returns_distinct_memos(tmp_path):
+    repo, query = _build(tmp_path)
+    # チャンク単位では長いメモだけで埋まる
+    assert {cid.split("_")[0] for cid, _ in repo._sync_search(query, 3)} == {"long"}
+
+    hits = asyncio.run(repo.search_memos(query, 3))
+    memos = [cid.split("_")[0] for cid, _ in hits]
+    assert len(memos) == 3 and len(set(memos)) == 3
+    assert memos[0] == "long"
+    scores = [s for _, s in hits]
+    assert scores == sorted(scores, reverse=True)
+
+    # メモ数を超える top_k は全件見た時点で打ち切る
+    rows = repo._sync_search_memos_batch(np.stack([query, -query]), 100)
+    assert [len(r) for r in rows] == [6, 6]
+    repo.close()
+
+
+class _FakeElastic:
+    def __init__(self):
+        self.sizes = []
+
+    async def search(self, query, top_k, filters=None):
+        self.sizes.append(top_k)
+        return []
+
+    async def mget(self, uuids):
+        return [None] * len(uuids)
+
+
+class _FakeEmbedder:
+    def __init__(self, vec):
+        self.vec = vec
+
+    async def aencode(self, text):
+        return self.vec
+
+
+def test_hybrid_without_top_k_is_capped(tmp_path):
+    repo, query = _build(tmp_path)
+    elastic = _FakeElastic()
+    uc = HybridSearchUseCase(
+        repo, elastic, _FakeEmbedder(query), memo_repo=None, max_results=4
+    )
+    asyncio.run(uc.execute("q"))
+    assert elastic.sizes == [4]
+    repo.close()
@@ -0,0 +1,42 @@
+import threading
+
+from infrastructure.services.embedder import EmbedderService
+from infrastructure.services.model_registry import ModelRegistry
+
+
+class _CountingRegistry(ModelRegistry):
+    def __init__(self):
+        super().__init__()
+        self.loads = []
+
+    def _load(self, model_name):
+        self.loads.append(model_name)
+        return object()
+
+
+def test_model_loaded_once_per_name():
+    registry = _CountingRegistry()
+    models = []
+
+    def worker():
+        models.append(registry.get("m"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert registry.loads == ["m"]
+    assert all(m is models[0] for m in models)
+    registry.get("other")
+    assert registry.loaded() == ["m", "other"]
+
+
+def test_embedder_defers_model_load_until_used():
+    registry = _CountingRegistry()
+    a = EmbedderService("m", registry=registry)
+    b = EmbedderService("m", registry=registry)
+    assert registry.loads == []
+    assert a.model is b.model
+    assert registry.loads == ["m"]
@@ -0,0 +1,58 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from infrastructure.services.query_batcher import QueryBatcher
+
+
+def _fake_encode(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t)] for t in texts], dtype="float32")
+    return encode
+
+
+def test_concurrent_queries_share_one_batch():
+    calls = []
+    batcher = QueryBatcher(_fake_encode(calls), max_batch_size=8, max_wait_ms=50)
+
+    async def run():
+        vecs = await asyncio.gather(*(batcher.submit("x" * i) for i in range(1, 6)))
+        await batcher.close()
+        return vecs
+
+    vecs = asyncio.run(run())
+    assert [int(v[0]) for v in vecs] == [1, 2, 3, 4, 5]
+    assert calls == [["x", "xx", "xxx", "xxxx", "xxxxx"]]
+    stats = batcher.stats()
+    assert stats["batches"] == 1 and stats["avg_batch_size"] == 5
+
+
+def test_batch_size_cap_splits_batches():
+    calls = []
+    batcher = QueryBatcher(_fake_encode(calls), max_batch_size=2, max_wait_ms=50)
+
+    async def run():
+        await asyncio.gather(*(batcher.submit(str(i)) for i in range(5)))
+        await batcher.close()
+
+    asyncio.run(run())
+    assert [len(c) for c in calls] == [2, 2, 1]
+    assert batcher.stats()["max_batch_size_seen"] == 2
+
+
+def test_encode_error_propagates_to_callers():
+    def boom(texts):
+        raise RuntimeError("model down")
+
+    batcher = QueryBatcher(boom, max_wait_ms=1)
+
+    async def run():
+        try:
+            await batcher.submit("q")
+        finally:
+            await batcher.close()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
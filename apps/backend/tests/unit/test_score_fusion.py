@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from infrastructure.services import fusion_eval, score_fusion
+from infrastructure.services.score_fusion import MINMAX, RRF, ZSCORE, FusionConfig
+from usecases.hybrid_search import HybridSearchUseCase
+
+
+def test_minmax_matches_weighted_sum():
+    sem = [("a", 0.9), ("b", 0.5), ("c", 0.1)]
+    es = [("c", 10.0), ("d", 5.0)]
+    fused = dict(score_fusion.fuse(sem, es, 10, FusionConfig(MINMAX, 0.6, 0.4)))
+    assert fused == pytest.approx({"a": 0.6, "b": 0.3, "c": 0.4, "d": 0.0})
+
+
+def test_zscore_penalizes_missing_side():
+    sem = [("a", 0.9), ("b", 0.8), ("c", 0.1)]
+    es = [("b", 3.0), ("c", 2.0), ("d", 1.0)]
+    fused = dict(score_fusion.fuse(sem, es, 10, FusionConfig(ZSCORE, 0.5, 0.5)))
+    # 全文検索に出てこない a は、全文検索側の最低値として扱われる
+    es_z = (np.array([3.0, 2.0, 1.0]) - 2.0) / np.std([3.0, 2.0, 1.0])
+    sem_z = (np.array([0.9, 0.8, 0.1]) - 0.6) / np.std([0.9, 0.8, 0.1])
+    assert fused["a"] == pytest.approx(0.5 * sem_z[0] + 0.5 * es_z.min())
+    assert max(fused, key=fused.get) == "b"
+
+
+def test_rrf_uses_ranks_only():
+    sem = [("a", 100.0), ("b", 0.2)]
+    es = [("b", 7.0), ("a", 6.9)]
+    fused = score_fusion.fuse(sem, es, 10, FusionConfig(RRF, 1.0, 1.0, rrf_k=60))
+    assert [s for _, s in fused] == pytest.approx([1 / 61 + 1 / 62] * 2)
+
+
+def test_top_k_selection_matches_full_sort():
+    rng = np.random.default_rng(0)
+    sem = [(f"m{i}", float(s)) for i, s in enumerate(rng.random(500))]
+    es = [(f"m{i}", float(s)) for i, s in enumerate(rng.random(300) * 20, 250)]
+    for method in score_fusion.FUSION_METHODS:
+        config = FusionConfig(method)
+        full = score_fusion.fuse(sem, es, 10_000, config)
+        assert score_fusion.fuse(sem, es, 7, config) == full[:7]
+        scores = [s for _, s in full]
+        assert scores == sorted(scores, reverse=True)
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        FusionConfig("max")
+
+
+def test_semantic_scores_are_inner_products():
+    best = HybridSearchUseCase._best_chunks([("u1_0", 0.8), ("u1_3", 0.9), ("u2_0", 0.3)])
+    assert best == {"u1": ("u1_3", 0.9), "u2": ("u2_0", 0.3)}
+
+
+def test_grid_report_prefers_the_informative_side():
+    runs = [
+        fusion_eval.QueryRun(
+            query=f"q{i}",
+            relevant=[f"r{i}"],
+            semantic=[(f"x{i}", 0.9), (f"r{i}", 0.1)],
+            elastic=[(f"r{i}", 9.0), (f"y{i}", 1.0)],
+        )
+        for i in range(5)
+    ]
+    rows = fusion_eval.grid_report(runs, k=1, methods=[MINMAX], semantic_weights=[0.0, 0.5, 1.0])
+    assert rows[0].semantic_weight == 0.0 and rows[0].ndcg == 1.0
+    assert rows[-1].semantic_weight == 1.0 and rows[-1].ndcg == 0.0
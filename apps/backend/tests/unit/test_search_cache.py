@@ -0,0 +1,104 @@
+import asyncio
+
+from domain.memo import Memo
+from domain.memo_filter import MemoFilter
+from infrastructure.services import search_cache
+from infrastructure.services.search_cache import SearchResultCache
+from usecases.delete_memo import DeleteMemoUseCase
+from usecases.hybrid_search import HybridSearchUseCase
+
+
+def _memo(uuid, body="body"):
+    return Memo(uuid=uuid, title="t", body=body, category="c", tags=[], created_at=None)
+
+
+def test_keys_normalize_queries_and_include_conditions():
+    cache = SearchResultCache()
+    f = MemoFilter(category="work", tags=("a",))
+    assert cache.key("hybrid", "  ｆｏｏ   bar ", 10, f) == cache.key("hybrid", "foo bar", 10, MemoFilter("work", ("a",)))
+    assert cache.key("hybrid", "foo", 10, None) != cache.key("semantic", "foo", 10, None)
+    assert cache.key("hybrid", "foo", 10, None) != cache.key("hybrid", "foo", 5, None)
+
+
+def test_lru_ttl_and_byte_limits(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(search_cache.time, "monotonic", lambda: now[0])
+    cache = SearchResultCache(max_entries=2, ttl_s=10)
+    k1, k2, k3 = (cache.key("s", q) for q in ("a", "b", "c"))
+    cache.put(k1, [_memo("1")])
+    cache.put(k2, [_memo("2")])
+    assert cache.get(k1)[0].uuid == "1"
+    cache.put(k3, [_memo("3")])
+    # 最も古く使われた k2 が追い出される
+    assert cache.get(k2) is None and cache.get(k1) is not None
+    assert cache.nbytes > 0
+
+    now[0] += 11
+    assert cache.get(k1) is None
+    stats = cache.cache_stats()
+    assert stats["expired"] == 1 and stats["evicted"] == 1
+    assert stats["hits"] == 2 and 0 < stats["hit_ratio"] < 1
+
+    small = SearchResultCache(max_bytes=2000)
+    small.put(small.key("s", "big"), [_memo("x", body="x" * 5000)])
+    assert len(small) == 0
+
+
+def test_invalidate_discards_entries_and_in_flight_results():
+    cache = SearchResultCache()
+    key = cache.key("s", "q")
+    cache.put(key, [_memo("1")])
+    in_flight = cache.key("s", "other")
+    cache.invalidate()
+    assert cache.get(key) is None
+    assert cache.nbytes == 0 and cache.generation == 1
+    # 無効化前に計算を始めた結果は保存しない
+    cache.put(in_flight, [_memo("2")])
+    assert len(cache) == 0
+
+
+class _Elastic:
+    def __init__(self):
+        self.calls = 0
+
+    async def search(self, query, top_k, filters=None):
+        self.calls += 1
+        return [(_memo("e1"), 2.0)]
+
+
+class _Memos:
+    async def delete(self, uuid):
+        return True
+
+
+def test_hybrid_results_are_cached_until_a_write():
+    cache = SearchResultCache()
+    elastic = _Elastic()
+    uc = HybridSearchUseCase(None, elastic, None, semantic_weight=0.0, elastic_weight=1.0, cache=cache)
+
+    first = asyncio.run(uc.execute("query", top_k=5))
+    second = asyncio.run(uc.execute(" query ", top_k=5))
+    assert [m.uuid for m in first] == [m.uuid for m in second] == ["e1"]
+    assert elastic.calls == 1
+
+    asyncio.run(DeleteMemoUseCase(_Memos(), cache=cache).execute("e1"))
+    asyncio.run(uc.execute("query", top_k=5))
+    assert elastic.calls == 2
+
+
+def test_cached_results_are_isolated_from_callers():
+    cache = SearchResultCache()
+    elastic = _Elastic()
+    uc = HybridSearchUseCase(None, elastic, None, semantic_weight=0.0, elastic_weight=1.0, cache=cache)
+
+    first = asyncio.run(uc.execute("query", top_k=5))
+    first[0].hybrid_score = -1.0
+    first[0].tags.append("mutated")
+    first.clear()
+
+    # 呼び出し側の書き換えはキャッシュに残らず、ヒットごとに別インスタンスが返る
+    second = asyncio.run(uc.execute("query", top_k=5))
+    third = asyncio.run(uc.execute("query", top_k=5))
+    assert elastic.calls == 1
+    assert second[0].hybrid_score != -1.0 and second[0].tags == []
+    assert second[0] is not third[0]
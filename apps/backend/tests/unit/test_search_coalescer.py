@@ -0,0 +1,129 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from domain.memo import Memo
+from infrastructure.persistence.faiss_chunk_repo import FaissChunkRepository
+from infrastructure.persistence.faiss_index_repo import FaissIndexRepository
+from infrastructure.services.search_coalescer import SearchCoalescer
+from vector_helpers import chunk_items, unit_vectors
+
+DIM = 8
+
+
+def test_concurrent_searches_share_one_matrix_search():
+    calls = []
+
+    def search_batch(queries, k, ef_search):
+        calls.append((queries.shape, k, ef_search))
+        return [list(range(int(q[0]), int(q[0]) + k)) for q in queries]
+
+    coalescer = SearchCoalescer(search_batch, max_batch_size=8, max_wait_ms=50)
+
+    async def run():
+        results = await asyncio.gather(*(
+            coalescer.submit(np.full(DIM, i, dtype="float32"), k=i + 1) for i in range(4)
+        ))
+        await coalescer.close()
+        return results
+
+    results = asyncio.run(run())
+    # k は最大値でまとめて検索し、呼び出し元ごとに切り詰める
+    assert calls == [((4, DIM), 4, None)]
+    assert results == [[0], [1, 2], [2, 3, 4], [3, 4, 5, 6]]
+    assert coalescer.stats()["avg_batch_size"] == 4
+
+
+def test_requests_are_grouped_by_ef_search():
+    calls = []
+
+    def search_batch(queries, k, ef_search):
+        calls.append((len(queries), ef_search))
+        return [([ef_search] * k, [0.0] * k) for _ in queries]
+
+    coalescer = SearchCoalescer(search_batch, max_wait_ms=50)
+
+    async def run():
+        results = await asyncio.gather(
+            coalescer.submit(np.zeros(DIM), 2, 16),
+            coalescer.submit(np.zeros(DIM), 1, 64),
+            coalescer.submit(np.zeros(DIM), 2, 16),
+        )
+        await coalescer.close()
+        return results
+
+    results = asyncio.run(run())
+    assert sorted(calls) == [(1, 64), (2, 16)]
+    assert results[1] == ([64], [0.0])
+
+
+def test_search_error_propagates_to_callers():
+    def boom(queries, k, ef_search):
+        raise RuntimeError("index gone")
+
+    coalescer = SearchCoalescer(boom)
+
+    async def run():
+        try:
+            await coalescer.submit(np.zeros(DIM), 1)
+        finally:
+            await coalescer.close()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+
+
+def test_batches_run_concurrently_up_to_max_inflight():
+    first_running = threading.Event()
+    release = threading.Event()
+
+    def search_batch(queries, k, ef_search):
+        if queries[0][0] == 0:
+            first_running.set()
+            # 1 本目が終わらないうちに 2 本目が流れてこなければタイムアウトで失敗する
+            assert release.wait(5)
+        else:
+            release.set()
+        return [[int(q[0])] for q in queries]
+
+    coalescer = SearchCoalescer(search_batch, max_inflight=2)
+
+    async def run():
+        slow = asyncio.ensure_future(coalescer.submit(np.zeros(DIM), 1))
+        while not first_running.is_set():
+            await asyncio.sleep(0.005)
+        fast = await coalescer.submit(np.ones(DIM), 1)
+        results = [await slow, fast]
+        await coalescer.close()
+        return results
+
+    assert asyncio.run(run()) == [[0], [1]]
+    assert coalescer.stats()["batches"] == 2
+
+
+def test_repo_batch_search_matches_single_queries(tmp_path):
+    vecs = unit_vectors(30, DIM)
+    chunks = FaissChunkRepository(tmp_path / "c", dimension=DIM)
+    memos = FaissIndexRepository(tmp_path / "m", memo_repo=None, dim=DIM)
+
+    async def run():
+        await chunks.add_chunks_batch(chunk_items(vecs))
+        await memos.incremental_update([
+            Memo(uuid=f"m{i}", title="", body="", category="", tags=[], created_at=None, embedding=v)
+            for i, v in enumerate(vecs)
+        ])
+        chunk_rows = await chunks.search_batch(vecs[:5], 3)
+        memo_rows = await memos.search_batch(vecs[:5], 3)
+        singles = await asyncio.gather(*(chunks.search(v, 3) for v in vecs[:5]))
+        memo_singles = await asyncio.gather(*(memos.search(v, 3) for v in vecs[:5]))
+        await chunks.aclose()
+        await memos.aclose()
+        return chunk_rows, memo_rows, singles, memo_singles
+
+    chunk_rows, memo_rows, singles, memo_singles = asyncio.run(run())
+    assert [row[0][0] for row in chunk_rows] == [f"m{i}_0" for i in range(5)]
+    assert chunk_rows == singles
+    assert [uuids for uuids, _ in memo_rows] == [uuids for uuids, _ in memo_singles]
+    assert [uuids[0] for uuids, _ in memo_rows] == [f"m{i}" for i in range(5)]
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+
+import faiss
+import numpy as np
+import pytest
+
+from infrastructure.persistence.faiss_chunk_repo import FaissChunkRepository
+from infrastructure.services.search_coalescer import SearchCoalescer
+from infrastructure.services.search_pool import SearchPool, SearchPoolSaturated
+from infrastructure.utils.rw_lock import ReadWriteLock
+
+
+def test_workers_use_the_configured_omp_threads():
+    pool = SearchPool(workers=1, omp_threads=2)
+    assert asyncio.run(pool.run(faiss.omp_get_max_threads)) == 2
+    pool.shutdown()
+
+
+def test_queue_wait_is_reported_separately_from_compute():
+    pool = SearchPool(workers=1, omp_threads=1)
+
+    async def run():
+        await asyncio.gather(*(pool.run(time.sleep, 0.05) for _ in range(3)))
+
+    asyncio.run(run())
+    stats = pool.stats()
+    pool.shutdown()
+    assert stats["completed"] == 3
+    assert stats["compute_ms"]["p50"] >= 40
+    # 1 スレッドなので後続の 2 件は前の実行を待っている
+    assert stats["wait_ms"]["p95"] >= 40
+
+
+def test_rejects_when_saturated():
+    pool = SearchPool(workers=1, omp_threads=1, max_pending=1)
+    gate = threading.Event()
+
+    async def run():
+        first = asyncio.ensure_future(pool.run(gate.wait, 5))
+        await asyncio.sleep(0.01)
+        with pytest.raises(SearchPoolSaturated):
+            await pool.run(time.sleep, 0)
+        coalescer = SearchCoalescer(lambda q, k, ef: [[0]] * len(q), pool=pool)
+        with pytest.raises(SearchPoolSaturated):
+            await coalescer.submit(np.zeros(4), 1)
+        gate.set()
+        await first
+        assert await coalescer.submit(np.zeros(4), 1) == [0]
+        await coalescer.close()
+
+    asyncio.run(run())
+    stats = pool.stats()
+    pool.shutdown()
+    assert stats["rejected"] == 2 and stats["pending"] == 0
+
+
+def test_searches_do_not_wait_for_writers_or_snapshots(tmp_path):
+    vecs = np.eye(4, dtype="float32")
+    repo = FaissChunkRepository(tmp_path, dimension=4)
+
+    async def run():
+        await repo.add_chunks_batch([(f"m{i}_0", v) for i, v in enumerate(vecs)])
+        # WAL の fsync やスナップショットの書き出し中（= 変更用ロックを保持中）でも検索は返る
+        with repo._lock:
+            return await asyncio.wait_for(repo.search(vecs[2], 1), timeout=5)
+
+    assert asyncio.run(run())[0][0] == "m2_0"
+    repo.close()
+
+
+def test_read_write_lock_allows_parallel_readers():
+    lock = ReadWriteLock()
+    both_inside = threading.Barrier(2, timeout=5)
+    order = []
+
+    def reader():
+        with lock.read():
+            both_inside.wait()
+            order.append("read")
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for t in readers:
+        t.start()
+    for t in readers:
+        t.join()
+    with lock.write():
+        order.append("write")
+    assert order == ["read", "read", "write"]
@@ -0,0 +1,23 @@
+"""FAISS まわりのテストで共有するベクトル・チャンクの組み立て"""
+import numpy as np
+
+
+def unit_vectors(n, dim, seed=0):
+    """正規化済みのランダムベクトル (n, dim)"""
+    rng = np.random.default_rng(seed)
+    vecs = rng.standard_normal((n, dim)).astype("float32")
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def clustered_vectors(n, dim, seed=0, centers=20):
+    """centers 個の重心のまわりに散らばる正規化済みベクトル（量子化の学習向け）"""
+    rng = np.random.default_rng(seed)
+    base = rng.standard_normal((centers, dim))
+    vecs = base[rng.integers(0, centers, n)] + 0.3 * rng.standard_normal((n, dim))
+    vecs = vecs.astype("float32")
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def chunk_items(vecs, start=0):
+    """メモ 1 件につきチャンク 1 件の (チャンクID, ベクトル) 列。ID は m{start}_0 から"""
+    return [(f"m{i}_0", v) for i, v in enumerate(vecs, start)]